@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+BACKUP_PATTERN = "lc_tracker_*.db"
+PAGES_PER_STEP = 1024
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+def _integrity_ok(path: Path) -> bool:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("PRAGMA integrity_check").fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+    return bool(row) and row[0] == "ok"
+
+
+class BackupManager:
+    def __init__(
+        self,
+        db_path: Path,
+        backup_dir: Path,
+        keep: int = 2,
+        debounce_seconds: float = 5.0,
+        max_delay_seconds: float = 60.0,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.backup_dir = Path(backup_dir)
+        self.keep = max(1, int(keep))
+        self.debounce_seconds = max(0.0, float(debounce_seconds))
+        self.max_delay_seconds = max(self.debounce_seconds, float(max_delay_seconds))
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._first_dirty_at: Optional[float] = None
+        self._last_dirty_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def schedule(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return
+            if self._first_dirty_at is None:
+                self._first_dirty_at = now
+            self._last_dirty_at = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="lc-tracker-backup", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def pending(self) -> bool:
+        with self._lock:
+            return self._first_dirty_at is not None
+
+    def flush(self) -> Optional[Path]:
+        with self._lock:
+            dirty = self._first_dirty_at is not None
+            self._first_dirty_at = None
+            self._last_dirty_at = None
+        if not dirty:
+            return None
+        return self.run_now()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+        self.flush()
+
+    def _due_at(self) -> Optional[float]:
+        with self._lock:
+            if self._first_dirty_at is None or self._last_dirty_at is None:
+                return None
+            return min(
+                self._last_dirty_at + self.debounce_seconds,
+                self._first_dirty_at + self.max_delay_seconds,
+            )
+
+    def _worker(self) -> None:
+        while True:
+            due_at = self._due_at()
+            if self._closed:
+                return
+            if due_at is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            remaining = due_at - time.monotonic()
+            if remaining > 0:
+                self._wakeup.wait(remaining)
+                self._wakeup.clear()
+                continue
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error):
+                self.schedule()
+                time.sleep(self.debounce_seconds or 1.0)
+
+    def snapshot(self, target_path: Path) -> Path:
+        target_path = Path(target_path)
+        if not self.db_path.exists():
+            raise BackupError(f"Database not found: {self.db_path}")
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=PAGES_PER_STEP)
+        finally:
+            target.close()
+            source.close()
+        return target_path
+
+    def run_now(self) -> Optional[Path]:
+        if not self.db_path.exists():
+            return None
+        with self._run_lock:
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_path = self.backup_dir / f"lc_tracker_{stamp}.db"
+            tmp_path = backup_path.with_suffix(f".{os.getpid()}.tmp")
+            self.snapshot(tmp_path)
+            tmp_path.replace(backup_path)
+            self._prune()
+        return backup_path
+
+    def list_backups(self) -> List[Path]:
+        if not self.backup_dir.exists():
+            return []
+        return sorted(self.backup_dir.glob(BACKUP_PATTERN), key=lambda p: p.name, reverse=True)
+
+    def _prune(self) -> None:
+        for old in self.list_backups()[self.keep :]:
+            old.unlink(missing_ok=True)
+
+    def restore(self, backup_path: Path) -> None:
+        backup_path = Path(backup_path)
+        if not backup_path.exists():
+            raise BackupError(f"Backup not found: {backup_path}")
+        if not _integrity_ok(backup_path):
+            raise BackupError(f"Backup failed integrity check: {backup_path}")
+        with self._run_lock:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            source = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+            target = sqlite3.connect(self.db_path)
+            try:
+                source.backup(target, pages=PAGES_PER_STEP)
+            finally:
+                target.close()
+                source.close()
+        if not _integrity_ok(self.db_path):
+            raise BackupError(f"Restored database failed integrity check: {self.db_path}")
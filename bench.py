@@ -0,0 +1,816 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+IMPORT_BUDGET_MS = 500.0
+READY_BUDGET_MS = 1500.0
+WORDS = (
+    "array", "hash", "two", "pointers", "window", "stack", "queue", "heap", "binary", "search",
+    "tree", "graph", "bfs", "dfs", "union", "find", "trie", "interval", "greedy", "dp",
+    "memo", "bitmask", "prefix", "sum", "monotonic", "topological", "dijkstra", "backtrack", "sort", "merge",
+)
+GRADES = ("again", "hard", "good", "good", "good", "easy")
+
+
+class Case(NamedTuple):
+    name: str
+    fn: Callable[[], object]
+    iterations: int
+    setup: Optional[Callable[[], None]] = None
+    rule: Optional[str] = None
+
+
+def _timed(fn: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": _percentile(ordered, 0.95),
+        "p99_ms": _percentile(ordered, 0.99),
+    }
+
+
+def bench_connections(problems: int, iterations: int) -> None:
+    import db
+
+    db.init_db()
+    for i in range(problems):
+        db.add_attempt(str(i + 1), f"Problem {i + 1}", ["Array", "DP"], "Medium", "notes")
+    problem_id = problems // 2 or 1
+
+    @contextmanager
+    def fresh_connection() -> Iterator[sqlite3.Connection]:
+        database = db.current_database()
+        database.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(database.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def detail_request() -> None:
+        db.pin_connection()
+        try:
+            db.get_problem_detail(problem_id)
+            db.get_attempts(problem_id)
+        finally:
+            db.unpin_connection()
+
+    pooled_connection = db._connection
+    for name, factory in (("connect per query", fresh_connection), ("pooled", pooled_connection)):
+        db._connection = factory
+        try:
+            stats = _summary(_timed(detail_request, iterations))
+        finally:
+            db._connection = pooled_connection
+        print(f"{name:<20} mean {stats['mean_ms']:.3f} ms  p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms")
+    print(f"connections opened by pool: {db.current_database().pool.opened}")
+
+
+def generate_library(
+    problems: int,
+    attempts_per_problem: int = 3,
+    reviews_per_problem: int = 4,
+    tag_count: int = 40,
+    seed: int = 7,
+) -> Dict[str, Any]:
+    import db
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    today = date.today()
+    tag_names = [f"{rng.choice(WORDS)}-{i}" for i in range(tag_count)]
+    profiles = [
+        (
+            f"Problem {n} {' '.join(rng.sample(WORDS, 3))}",
+            rng.sample(tag_names, rng.randint(1, 3)),
+            rng.choice(("Low", "Medium", "Medium", "High")),
+        )
+        for n in range(1, problems + 1)
+    ]
+
+    def records() -> Iterator[tuple]:
+        row_number = 0
+        for _ in range(attempts_per_problem):
+            for n, (title, tags, importance) in enumerate(profiles, start=1):
+                row_number += 1
+                words = " ".join(rng.choices(WORDS, k=12))
+                yield row_number, {
+                    "lc_num": str(n),
+                    "title": title,
+                    "tags": tags,
+                    "importance": importance,
+                    "notes": f"## Idea\n{words}\n\n- time `O(n)`\n- space `O(1)`",
+                    "attempt_at": (today - timedelta(days=rng.randint(0, 720))).isoformat(),
+                }
+
+    db.init_db()
+    imported = db.import_attempts(records())
+
+    review_rows = []
+    problem_updates = []
+    with db._connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, created_at FROM problems")
+        for row in cur.fetchall():
+            start = date.fromisoformat(row["created_at"])
+            span = max(0, (today - start).days)
+            days = sorted(rng.randint(0, span) for _ in range(rng.randint(0, 2 * reviews_per_problem)))
+            count = 0
+            for offset in days:
+                grade = rng.choice(GRADES)
+                count = 0 if grade == "again" else count + (2 if grade == "easy" else 1)
+                review_rows.append((int(row["id"]), (start + timedelta(days=offset)).isoformat(), grade))
+            if days:
+                last = (start + timedelta(days=days[-1])).isoformat()
+                problem_updates.append((count, last, last, int(row["id"])))
+        cur.executemany("INSERT INTO review_logs (problem_id, reviewed_at, grade) VALUES (?, ?, ?)", review_rows)
+        cur.executemany(
+            "UPDATE problems SET review_count = ?, last_review_at = MAX(COALESCE(last_attempt_at, ''), ?), "
+            "last_attempt_at = MAX(COALESCE(last_attempt_at, ''), ?) WHERE id = ?",
+            problem_updates,
+        )
+        db._refresh_schedule(cur)
+        db._bump_data_version(cur)
+        conn.commit()
+    db.check_dashboard_stats(fix=True)
+    db.backup_db(wait=True)
+    return {
+        "problems": problems,
+        "attempts": imported["imported"],
+        "review_logs": len(review_rows),
+        "tags": tag_count,
+        "seed": seed,
+        "generate_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _peak_kb(case: Case) -> float:
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    try:
+        case.fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _run_case(case: Case) -> Dict[str, float]:
+    samples = []
+    for _ in range(case.iterations):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    result = _summary(samples)
+    result["iterations"] = case.iterations
+    result["peak_kb"] = _peak_kb(case)
+    return result
+
+
+def _suite_cases(iterations: int, problems: int, rng: random.Random) -> List[Case]:
+    import db
+    from web_app import app, response_cache
+
+    client = app.test_client()
+    heavy = max(3, iterations // 20)
+    tags = db.get_tags()
+    word = "dijkstra"
+
+    def pick() -> int:
+        return rng.randint(1, problems)
+
+    def latest_attempt_id() -> int:
+        with db._connection() as conn:
+            return int(conn.execute("SELECT MAX(id) FROM attempts").fetchone()[0])
+
+    def new_attempt() -> None:
+        db.add_attempt(str(problems + rng.randint(1, 10 * problems)), "Scratch", [tags[0]], "Low", "scratch")
+        scratch["attempt_id"] = latest_attempt_id()
+        with db._connection() as conn:
+            scratch["problem_id"] = int(
+                conn.execute("SELECT problem_id FROM attempts WHERE id = ?", (scratch["attempt_id"],)).fetchone()[0]
+            )
+
+    def get(url: str) -> Callable[[], object]:
+        def call() -> None:
+            response = client.get(url() if callable(url) else url)
+            assert response.status_code == 200, (url, response.status_code)
+            response.close()
+
+        return call
+
+    def get_encoded(url: str, encoding: str) -> Callable[[], object]:
+        def call() -> None:
+            response = client.get(url, headers={"Accept-Encoding": encoding})
+            assert response.status_code == 200, (url, response.status_code)
+            response.close()
+
+        return call
+
+    def drain_export() -> None:
+        for _ in db.iter_export(["tags", "problems", "problem_tags", "attempts", "review_logs"]):
+            pass
+
+    def first_change_event() -> None:
+        response = client.get("/api/changes/stream", buffered=False)
+        events = iter(response.response)
+        next(events)
+        next(events)
+        response.close()
+
+    db.create_profile("bench")
+
+    def switch_profile() -> None:
+        with db.use_profile("bench"):
+            db.get_tags()
+
+    scratch: Dict[str, int] = {}
+    cold = response_cache.clear
+    first_page, cursor = db.get_problems_page(limit=100)
+
+    def recent() -> int:
+        return max(0, db.get_changes(None)["seq"] - 100)
+
+    cases = [
+        Case("db.get_problems", lambda: db.get_problems(), heavy),
+        Case("db.get_problems search", lambda: db.get_problems(search=word), iterations),
+        Case("db.get_problems tags", lambda: db.get_problems(tags=tags[:2]), heavy),
+        Case("db.get_problems_page", lambda: db.get_problems_page(limit=100), iterations),
+        Case("db.get_problems_page next", lambda: db.get_problems_page(limit=100, cursor=cursor), iterations),
+        Case("db.get_problems_page search", lambda: db.get_problems_page(search=word, sort="relevance"), iterations),
+        Case("db.get_problems_page tags", lambda: db.get_problems_page(tags=tags[:2]), iterations),
+        Case("db.get_problems_page tags all", lambda: db.get_problems_page(tags=tags[:2], tag_match="all"), iterations),
+        Case("db.get_problems_page review_due", lambda: db.get_problems_page(sort="review_due"), iterations),
+        Case("db.get_problem_detail", lambda: db.get_problem_detail(pick()), iterations),
+        Case("db.get_attempts", lambda: db.get_attempts(pick()), iterations),
+        Case("db.get_due_reviews", lambda: db.get_due_reviews(50), iterations),
+        Case("db.get_review_schedule", db.get_review_schedule, iterations),
+        Case("db.get_review_forecast 180d", lambda: db.get_review_forecast(180), iterations),
+        Case("db.get_review_forecast 180d uncached", lambda: db._cached_forecast.__wrapped__(db.DEFAULT_PROFILE, 0, date.today().isoformat(), 180), heavy),
+        Case("db.get_dashboard_summary", db.get_dashboard_summary, iterations),
+        Case("db.get_tags", db.get_tags, iterations),
+        Case("db.get_tag_stats", db.get_tag_stats, iterations),
+        Case("db.get_data_version", db.get_data_version, iterations),
+        Case("db.get_changes 100", lambda: db.get_changes(recent()), iterations),
+        Case(
+            "db.add_attempt",
+            lambda: db.add_attempt(str(pick()), "Updated", tags[:2], "Medium", "more notes"),
+            iterations,
+        ),
+        Case("db.mark_review", lambda: db.mark_review(pick(), "good"), iterations),
+        Case(
+            "db.mark_reviews x25",
+            lambda: db.mark_reviews([{"problem_id": pick(), "grade": rng.choice(GRADES)} for _ in range(25)]),
+            iterations,
+        ),
+        Case("db.snooze_problem", lambda: db.snooze_problem(pick(), date.today().isoformat()), iterations),
+        Case("db.update_attempt", lambda: db.update_attempt(scratch["attempt_id"], "edited"), iterations, new_attempt),
+        Case("db.delete_attempt", lambda: db.delete_attempt(scratch["attempt_id"]), iterations, new_attempt),
+        Case("db.delete_problem", lambda: db.delete_problem(scratch["problem_id"]), heavy, new_attempt),
+        Case("db.backup_db", lambda: db.backup_db(wait=True), heavy),
+        Case("db.iter_export", drain_export, heavy),
+        Case("db.use_profile", switch_profile, iterations),
+        Case("route /", get("/"), iterations, rule="/"),
+        Case("route GET /api/ready", get("/api/ready"), iterations, rule="/api/ready"),
+        Case("route GET /api/tags", get("/api/tags"), iterations, cold, "/api/tags"),
+        Case(
+            "route GET /api/tags other profile",
+            lambda: client.get("/api/tags", headers={"X-LC-Profile": "bench"}).close(),
+            iterations,
+            cold,
+        ),
+        Case("route GET /api/profiles", get("/api/profiles"), iterations, rule="/api/profiles"),
+        Case("route GET /api/tags/stats", get("/api/tags/stats"), iterations, cold, "/api/tags/stats"),
+        Case("route GET /api/problems", get("/api/problems"), iterations, cold, "/api/problems"),
+        Case("route GET /api/problems cached", get("/api/problems"), iterations),
+        Case("route GET /api/problems columns", get("/api/problems?format=columns"), iterations, cold),
+        Case("route GET /api/problems columns 5000", get("/api/problems?format=columns&limit=5000"), heavy, cold),
+        Case("route GET /api/problems gzip", get_encoded("/api/problems?limit=500", "gzip"), iterations, cold),
+        Case("route GET /api/problems search", get(f"/api/problems?search={word}&sort=relevance"), iterations, cold),
+        Case("route GET /api/problems/<id>", get(lambda: f"/api/problems/{pick()}"), iterations, cold, "/api/problems/<int:problem_id>"),
+        Case("route GET /api/reviews", get("/api/reviews?limit=20"), iterations, cold, "/api/reviews"),
+        Case("route GET /api/reviews/schedule", get("/api/reviews/schedule"), iterations, cold, "/api/reviews/schedule"),
+        Case(
+            "route GET /api/reviews/forecast",
+            get("/api/reviews/forecast?days=180"),
+            iterations,
+            cold,
+            "/api/reviews/forecast",
+        ),
+        Case("route GET /api/dashboard", get("/api/dashboard"), iterations, cold, "/api/dashboard"),
+        Case("route GET /api/changes", get(lambda: f"/api/changes?since={recent()}"), iterations, rule="/api/changes"),
+        Case("route GET /api/changes/stream", first_change_event, iterations, rule="/api/changes/stream"),
+        Case("route GET /api/export", get("/api/export?format=csv&tables=problems"), heavy, rule="/api/export"),
+        Case("route GET /api/_metrics", get("/api/_metrics"), iterations, rule="/api/_metrics"),
+        Case(
+            "route POST /api/_metrics/profile",
+            lambda: client.post("/api/_metrics/profile", json={"enabled": False}),
+            iterations,
+            rule="/api/_metrics/profile",
+        ),
+        Case(
+            "route POST /api/tags",
+            lambda: client.post("/api/tags", json={"name": f"bench-{rng.random()}"}),
+            iterations,
+            rule="/api/tags",
+        ),
+        Case(
+            "route POST /api/tags/rename",
+            lambda: client.post("/api/tags/rename", json={"old": "no-such-tag", "new": "still-none"}),
+            iterations,
+            rule="/api/tags/rename",
+        ),
+        Case(
+            "route POST /api/attempts",
+            lambda: client.post(
+                "/api/attempts",
+                json={"lc_num": str(pick()), "title": "Updated", "tags": tags[:2], "importance": "High", "notes": "x"},
+            ),
+            iterations,
+            rule="/api/attempts",
+        ),
+        Case(
+            "route POST /api/import",
+            lambda: client.post(
+                "/api/import?format=jsonl",
+                data=json.dumps({"lc_num": str(pick()), "title": "Imported", "notes": "y"}),
+            ),
+            iterations,
+            rule="/api/import",
+        ),
+        Case(
+            "route POST /api/reviews/<id>",
+            lambda: client.post(f"/api/reviews/{pick()}", json={"grade": "good"}),
+            iterations,
+            rule="/api/reviews/<int:problem_id>",
+        ),
+        Case(
+            "route POST /api/reviews/batch",
+            lambda: client.post(
+                "/api/reviews/batch",
+                json={"reviews": [{"problem_id": pick(), "grade": rng.choice(GRADES)} for _ in range(25)]},
+            ),
+            iterations,
+            rule="/api/reviews/batch",
+        ),
+        Case(
+            "route POST /api/reviews/<id>/snooze",
+            lambda: client.post(f"/api/reviews/{pick()}/snooze", json={"until": date.today().isoformat()}),
+            iterations,
+            rule="/api/reviews/<int:problem_id>/snooze",
+        ),
+        Case(
+            "route PATCH /api/attempts/<id>",
+            lambda: client.patch(f"/api/attempts/{scratch['attempt_id']}", json={"notes": "patched"}),
+            iterations,
+            new_attempt,
+            "/api/attempts/<int:attempt_id>",
+        ),
+        Case(
+            "route DELETE /api/problems/<id>",
+            lambda: client.delete(f"/api/problems/{scratch['problem_id']}"),
+            heavy,
+            new_attempt,
+            "/api/problems/<int:problem_id>",
+        ),
+    ]
+    routes = {rule.rule for rule in app.url_map.iter_rules()}
+    return [case for case in cases if case.rule is None or case.rule in routes]
+
+
+def _uncovered_routes(cases: List[Case]) -> List[str]:
+    from web_app import app
+
+    covered = {case.rule for case in cases if case.rule}
+    return sorted(
+        {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != "static"} - covered
+    )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def bench_suite(
+    problems: int,
+    iterations: int,
+    attempts_per_problem: int,
+    reviews_per_problem: int,
+    only: Optional[str],
+    output: Optional[Path],
+    seed: int,
+) -> None:
+    library = generate_library(problems, attempts_per_problem, reviews_per_problem, seed=seed)
+    print(
+        f"library: {library['problems']} problems, {library['attempts']} attempts, "
+        f"{library['review_logs']} review logs ({library['generate_seconds']} s)"
+    )
+    cases = _suite_cases(iterations, problems, random.Random(seed))
+    uncovered = _uncovered_routes(cases)
+    if only:
+        cases = [case for case in cases if only in case.name]
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>9}")
+    for case in cases:
+        stats = _run_case(case)
+        results[case.name] = stats
+        print(
+            f"{case.name:<40} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+            f"{stats['p99_ms']:>9.3f} {stats['peak_kb']:>9.1f}"
+        )
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"max RSS: {max_rss_kb / 1024:.1f} MB")
+    for rule in uncovered:
+        print(f"warning: no benchmark case for route {rule}", file=sys.stderr)
+    if output:
+        document = {
+            "meta": {
+                **library,
+                "iterations": iterations,
+                "max_rss_kb": max_rss_kb,
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "revision": _git_revision(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": results,
+        }
+        output.write_text(json.dumps(document, indent=2, sort_keys=True))
+        print(f"results written to {output}")
+
+
+def bench_compare(baseline: Path, current: Path, metric: str, threshold: float) -> int:
+    old = json.loads(baseline.read_text())
+    new = json.loads(current.read_text())
+    print(f"baseline {old['meta'].get('revision')} ({old['meta']['problems']} problems) -> "
+          f"current {new['meta'].get('revision')} ({new['meta']['problems']} problems), metric {metric}")
+    regressions = 0
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        before = old["results"][name][metric]
+        after = new["results"][name][metric]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<40} {before:>9.3f} -> {after:>9.3f} ms  {change:+7.1f}%{flag}")
+    for name in sorted(set(new["results"]) - set(old["results"])):
+        print(f"{name:<40} new")
+    return 1 if regressions else 0
+
+
+LOAD_READS = (
+    "/api/problems?limit=50",
+    "/api/problems/{id}",
+    "/api/reviews",
+    "/api/reviews/schedule",
+    "/api/dashboard",
+)
+
+
+def _load_request(conn: http.client.HTTPConnection, rng: random.Random, problems: int, write_ratio: float) -> str:
+    problem_id = rng.randint(1, problems)
+    if rng.random() < write_ratio:
+        kind = "write"
+        if rng.random() < 0.7:
+            body = {"grade": rng.choice(GRADES)}
+            path = f"/api/reviews/{problem_id}"
+        else:
+            body = {
+                "lc_num": str(problem_id),
+                "title": f"Problem {problem_id}",
+                "tags": ["Array"],
+                "importance": "Medium",
+                "notes": " ".join(rng.choices(WORDS, k=8)),
+            }
+            path = "/api/attempts"
+        conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    else:
+        kind = "read"
+        conn.request("GET", rng.choice(LOAD_READS).format(id=problem_id))
+    response = conn.getresponse()
+    response.read()
+    if response.status >= 500:
+        raise RuntimeError(f"HTTP {response.status}")
+    return kind
+
+
+def _load_client(port: int, seconds: float, problems: int, write_ratio: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    samples: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = 0
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            kind = _load_request(conn, rng, problems, write_ratio)
+        except (OSError, RuntimeError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            continue
+        samples[kind].append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return {"samples": samples, "errors": errors}
+
+
+def _load_clients(
+    port: int, clients: int, seconds: float, problems: int, write_ratio: float, seed: int
+) -> Dict[str, Any]:
+    with ThreadPoolExecutor(clients) as pool:
+        futures = [
+            pool.submit(_load_client, port, seconds, problems, write_ratio, seed + index) for index in range(clients)
+        ]
+        results = [future.result() for future in futures]
+    return {
+        "samples": {kind: [ms for result in results for ms in result["samples"][kind]] for kind in ("read", "write")},
+        "errors": sum(result["errors"] for result in results),
+    }
+
+
+def _wait_until_ready(port: int, server: subprocess.Popen, timeout: float = 60.0, interval: float = 0.2) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/ready")
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(interval)
+    raise RuntimeError("server did not become ready")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import web_app\n"
+    "print((time.perf_counter() - started) * 1000, 'markdown' in sys.modules)\n"
+)
+
+
+def _time_to_ready(root: Path, env: Dict[str, str]) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "web_app.py"],
+        cwd=root,
+        env={**env, "LC_TRACKER_BIND": f"127.0.0.1:{port}"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_until_ready(port, server, timeout=30.0, interval=0.005)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def bench_startup(problems: int, runs: int, import_budget_ms: float, ready_budget_ms: float) -> int:
+    root = Path(__file__).resolve().parent
+    env = {key: value for key, value in os.environ.items() if key != "LC_TRACKER_DEBUG"}
+    imports = []
+    eager_markdown = False
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=root, env=env, capture_output=True, text=True, check=True
+        ).stdout.split()
+        imports.append(float(output[0]))
+        eager_markdown = eager_markdown or output[1] == "True"
+    first_ready = _time_to_ready(root, env)
+    generate_library(problems)
+    ready = [_time_to_ready(root, env) for _ in range(runs)]
+    import_ms = statistics.median(imports)
+    ready_ms = statistics.median(ready)
+    print(f"import web_app      median {import_ms:8.1f} ms  (budget {import_budget_ms:.0f} ms)")
+    print(f"first start         {first_ready:15.1f} ms  (creates the schema)")
+    print(f"ready, {problems} problems median {ready_ms:8.1f} ms  (budget {ready_budget_ms:.0f} ms)")
+    failures = []
+    if eager_markdown:
+        failures.append("markdown is imported at startup")
+    if import_ms > import_budget_ms:
+        failures.append(f"import took {import_ms:.1f} ms (budget {import_budget_ms:.0f} ms)")
+    if ready_ms > ready_budget_ms:
+        failures.append(f"readiness took {ready_ms:.1f} ms (budget {ready_budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def bench_load(
+    problems: int,
+    worker_counts: List[int],
+    threads: int,
+    clients: int,
+    client_processes: int,
+    seconds: float,
+    write_ratio: float,
+    output: Optional[Path],
+    seed: int,
+) -> None:
+    library = generate_library(problems, seed=seed)
+    print(f"library: {library['problems']} problems, {library['attempts']} attempts ({library['generate_seconds']} s)")
+    print(f"{clients} clients in {client_processes} processes, {write_ratio:.0%} writes, {seconds:g} s per run")
+    print(f"{'workers':>7} {'req/s':>9} {'read p50':>9} {'read p95':>9} {'write p50':>9} {'write p95':>9} {'errors':>7}")
+    root = Path(__file__).resolve().parent
+    results = {}
+    for workers in worker_counts:
+        port = _free_port()
+        env = dict(
+            os.environ,
+            LC_TRACKER_BIND=f"127.0.0.1:{port}",
+            LC_TRACKER_WORKERS=str(workers),
+            LC_TRACKER_THREADS=str(threads),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", str(root / "gunicorn.conf.py"), "wsgi:app"],
+            cwd=root,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_until_ready(port, server)
+            per_process = [
+                clients // client_processes + (index < clients % client_processes) for index in range(client_processes)
+            ]
+            with ProcessPoolExecutor(client_processes) as pool:
+                futures = [
+                    pool.submit(_load_clients, port, count, seconds, problems, write_ratio, seed + 1000 * index)
+                    for index, count in enumerate(per_process)
+                    if count
+                ]
+                runs = [future.result() for future in futures]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        reads = sorted(ms for run in runs for ms in run["samples"]["read"])
+        writes = sorted(ms for run in runs for ms in run["samples"]["write"])
+        errors = sum(run["errors"] for run in runs)
+        stats = {
+            "requests_per_second": (len(reads) + len(writes)) / seconds,
+            "read_p50_ms": _percentile(reads, 0.5) if reads else 0.0,
+            "read_p95_ms": _percentile(reads, 0.95) if reads else 0.0,
+            "write_p50_ms": _percentile(writes, 0.5) if writes else 0.0,
+            "write_p95_ms": _percentile(writes, 0.95) if writes else 0.0,
+            "errors": errors,
+        }
+        results[str(workers)] = stats
+        print(
+            f"{workers:>7} {stats['requests_per_second']:>9.1f} {stats['read_p50_ms']:>9.2f} {stats['read_p95_ms']:>9.2f} "
+            f"{stats['write_p50_ms']:>9.2f} {stats['write_p95_ms']:>9.2f} {errors:>7}"
+        )
+    if output:
+        document = {
+            "meta": {
+                **library,
+                "threads": threads,
+                "clients": clients,
+                "seconds": seconds,
+                "write_ratio": write_ratio,
+                "cpus": os.cpu_count(),
+                "revision": _git_revision(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": results,
+        }
+        output.write_text(json.dumps(document, indent=2, sort_keys=True))
+        print(f"results written to {output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LeetCode tracker benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conn_parser = sub.add_parser("connections", help="per-request connection overhead")
+    conn_parser.add_argument("--problems", type=int, default=500)
+    conn_parser.add_argument("--iterations", type=int, default=2000)
+    suite_parser = sub.add_parser("suite", help="time every db function and route on a synthetic library")
+    suite_parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    suite_parser.add_argument("--problems", type=int, help="overrides --scale")
+    suite_parser.add_argument("--attempts", type=int, default=3, help="attempts per problem")
+    suite_parser.add_argument("--reviews", type=int, default=4, help="average review logs per problem")
+    suite_parser.add_argument("--iterations", type=int, default=100)
+    suite_parser.add_argument("--only", help="run cases whose name contains this text")
+    suite_parser.add_argument("--seed", type=int, default=7)
+    suite_parser.add_argument("--json", type=Path, dest="output", help="write machine-readable results here")
+    load_parser = sub.add_parser("load", help="mixed read/write HTTP load against the production server")
+    load_parser.add_argument("--problems", type=int, default=2000)
+    load_parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to compare")
+    load_parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    load_parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive clients")
+    load_parser.add_argument("--client-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    load_parser.add_argument("--seconds", type=float, default=10.0, help="duration of each run")
+    load_parser.add_argument("--write-ratio", type=float, default=0.2)
+    load_parser.add_argument("--seed", type=int, default=7)
+    load_parser.add_argument("--json", type=Path, dest="output", help="write machine-readable results here")
+    startup_parser = sub.add_parser("startup", help="import time and time to readiness, checked against budgets")
+    startup_parser.add_argument("--problems", type=int, default=2000)
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    startup_parser.add_argument("--ready-budget-ms", type=float, default=READY_BUDGET_MS)
+    compare_parser = sub.add_parser("compare", help="compare two suite --json results")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--metric", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"), default="p95_ms")
+    compare_parser.add_argument("--threshold", type=float, default=20.0, help="percent slowdown that fails")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        raise SystemExit(bench_compare(args.baseline, args.current, args.metric, args.threshold))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LC_TRACKER_DATA_DIR"] = str(Path(tmp))
+        os.environ.setdefault("LC_TRACKER_BACKUP_DEBOUNCE", "3600")
+        if args.command == "connections":
+            bench_connections(args.problems, args.iterations)
+        elif args.command == "startup":
+            status = bench_startup(args.problems, args.runs, args.import_budget_ms, args.ready_budget_ms)
+            if status:
+                raise SystemExit(status)
+        elif args.command == "load":
+            bench_load(
+                args.problems,
+                [int(count) for count in args.workers.split(",") if count.strip()],
+                args.threads,
+                args.clients,
+                max(1, args.client_processes),
+                args.seconds,
+                args.write_ratio,
+                args.output,
+                args.seed,
+            )
+        elif args.command == "suite":
+            bench_suite(
+                args.problems or SCALES[args.scale],
+                args.iterations,
+                args.attempts,
+                args.reviews,
+                args.only,
+                args.output,
+                args.seed,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Callable, Hashable, Optional, Tuple
+
+from flask import Response, make_response, request
+
+from wire import accepted_encoding, compress_response
+
+CachedBody = Tuple[bytes, int, str, Optional[str]]
+APP_DIR = Path(__file__).resolve().parent
+BUILD_SOURCES = ("*.py", "static/**/*", "templates/**/*")
+
+
+@lru_cache(maxsize=None)
+def build_version() -> str:
+    digest = hashlib.sha1()
+    for pattern in BUILD_SOURCES:
+        for path in sorted(APP_DIR.glob(pattern)):
+            if path.is_file():
+                digest.update(path.relative_to(APP_DIR).as_posix().encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CachedBody] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def versioned_get(cache: ResponseCache, version: Callable[[], Hashable]):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            encoding = accepted_encoding()
+            key = (
+                build_version(),
+                request.path,
+                request.query_string,
+                request.headers.get("Accept", ""),
+                encoding,
+                version(),
+                date.today().isoformat(),
+            )
+            etag = hashlib.sha1(repr(key).encode()).hexdigest()
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                cached = cache.get(key)
+                if cached is not None:
+                    body, status, mimetype, content_encoding = cached
+                    response = Response(body, status=status, mimetype=mimetype)
+                    if content_encoding:
+                        response.headers["Content-Encoding"] = content_encoding
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    compress_response(response, encoding)
+                    cache.put(
+                        key,
+                        (
+                            response.get_data(),
+                            response.status_code,
+                            response.mimetype,
+                            response.headers.get("Content-Encoding"),
+                        ),
+                    )
+            response.set_etag(etag)
+            response.vary.update(("Accept", "Accept-Encoding"))
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+CHANGE_TABLE = "change_log"
+CHANGE_ENTITIES = ("problem", "tag")
+RESET_ENTITY = "reset"
+DEFAULT_CHANGE_LIMIT = 500
+MAX_CHANGE_LIMIT = 5000
+LOG_BATCH = 500
+NEXT_SEQ = f"(SELECT COALESCE(MAX(seq), 0) FROM {CHANGE_TABLE})"
+UPSERT_SEQ = "ON CONFLICT (entity, entity_id) DO UPDATE SET seq = excluded.seq"
+
+
+def _log_sql(entity: str, entity_id: str) -> str:
+    return (
+        f"INSERT INTO {CHANGE_TABLE} (seq, entity, entity_id) VALUES ({NEXT_SEQ} + 1, '{entity}', {entity_id}) "
+        f"{UPSERT_SEQ};"
+    )
+
+
+def _log_tagged_sql(tag_id: str) -> str:
+    return (
+        f"INSERT INTO {CHANGE_TABLE} (seq, entity, entity_id) "
+        f"SELECT {NEXT_SEQ} + ROW_NUMBER() OVER (ORDER BY problem_id), 'problem', problem_id "
+        f"FROM problem_tags WHERE tag_id = {tag_id} {UPSERT_SEQ};"
+    )
+
+
+_TRIGGERS = {
+    "problems_change_insert": ("AFTER INSERT ON problems", _log_sql("problem", "new.id")),
+    "problems_change_update": ("AFTER UPDATE ON problems", _log_sql("problem", "new.id")),
+    "problems_change_delete": ("AFTER DELETE ON problems", _log_sql("problem", "old.id")),
+    "attempts_change_insert": ("AFTER INSERT ON attempts", _log_sql("problem", "new.problem_id")),
+    "attempts_change_update": (
+        "AFTER UPDATE OF notes, attempt_at, problem_id ON attempts",
+        _log_sql("problem", "new.problem_id") + " " + _log_sql("problem", "old.problem_id"),
+    ),
+    "attempts_change_delete": ("AFTER DELETE ON attempts", _log_sql("problem", "old.problem_id")),
+    "problem_tags_change_insert": ("AFTER INSERT ON problem_tags", _log_sql("problem", "new.problem_id")),
+    "problem_tags_change_delete": ("AFTER DELETE ON problem_tags", _log_sql("problem", "old.problem_id")),
+    "tags_change_insert": ("AFTER INSERT ON tags", _log_sql("tag", "new.id")),
+    "tags_change_update": (
+        "AFTER UPDATE OF name ON tags",
+        _log_sql("tag", "new.id") + " " + _log_tagged_sql("new.id"),
+    ),
+    "tags_change_delete": ("AFTER DELETE ON tags", _log_sql("tag", "old.id")),
+}
+
+
+def _trigger_sql(name: str, event: str, body: str) -> str:
+    return (
+        f"CREATE TRIGGER {name} {event} "
+        f"WHEN (SELECT suspended FROM change_state WHERE id = 1) = 0 "
+        f"BEGIN {body} END"
+    )
+
+
+def create_change_log(cur: sqlite3.Cursor) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CHANGE_TABLE,))
+    created = cur.fetchone() is None
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+            seq INTEGER PRIMARY KEY,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            UNIQUE (entity, entity_id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            suspended INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute("INSERT OR IGNORE INTO change_state (id, suspended) VALUES (1, 0)")
+    cur.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    existing = {row[0]: row[1] for row in cur.fetchall()}
+    for name, (event, body) in _TRIGGERS.items():
+        sql = _trigger_sql(name, event, body)
+        if existing.get(name) == sql:
+            continue
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(sql)
+    return created
+
+
+def log_changes(cur: sqlite3.Cursor, entity: str, entity_ids: Iterable[int]) -> None:
+    ids: List[int] = sorted({int(entity_id) for entity_id in entity_ids})
+    for start in range(0, len(ids), LOG_BATCH):
+        batch = ids[start : start + LOG_BATCH]
+        seq = latest_change(cur)
+        cur.executemany(
+            f"INSERT INTO {CHANGE_TABLE} (seq, entity, entity_id) VALUES (?, ?, ?) {UPSERT_SEQ}",
+            [(seq + offset, entity, entity_id) for offset, entity_id in enumerate(batch, 1)],
+        )
+
+
+def suspend_change_log(cur: sqlite3.Cursor) -> None:
+    cur.execute("UPDATE change_state SET suspended = 1 WHERE id = 1")
+
+
+def resume_change_log(cur: sqlite3.Cursor, problem_ids: Iterable[int], tag_ids: Iterable[int] = ()) -> None:
+    log_changes(cur, "problem", problem_ids)
+    log_changes(cur, "tag", tag_ids)
+    cur.execute("UPDATE change_state SET suspended = 0 WHERE id = 1")
+
+
+def latest_change(cur: sqlite3.Cursor) -> int:
+    cur.execute(f"SELECT MAX(seq) FROM {CHANGE_TABLE}")
+    return int(cur.fetchone()[0] or 0)
+
+
+def mark_reset(cur: sqlite3.Cursor, floor: int = 0) -> int:
+    seq = max(int(floor), latest_change(cur)) + 1
+    cur.execute(
+        f"INSERT INTO {CHANGE_TABLE} (seq, entity, entity_id) VALUES (?, ?, 0) {UPSERT_SEQ}",
+        (seq, RESET_ENTITY),
+    )
+    return seq
+
+
+def read_changes(cur: sqlite3.Cursor, since: Optional[int], limit: int = DEFAULT_CHANGE_LIMIT) -> Dict[str, Any]:
+    latest = latest_change(cur)
+    changes: Dict[str, Any] = {"seq": latest, "more": False, "reset": False}
+    changes.update({entity: [] for entity in CHANGE_ENTITIES})
+    if since is None or since > latest:
+        changes["reset"] = True
+        return changes
+    cur.execute(f"SELECT seq FROM {CHANGE_TABLE} WHERE entity = ? AND entity_id = 0", (RESET_ENTITY,))
+    row = cur.fetchone()
+    if row is not None and int(row[0]) > since:
+        changes["reset"] = True
+        return changes
+    if since == latest:
+        return changes
+    limit = max(1, min(int(limit), MAX_CHANGE_LIMIT))
+    cur.execute(
+        f"SELECT seq, entity, entity_id FROM {CHANGE_TABLE} WHERE seq > ? ORDER BY seq LIMIT ?",
+        (since, limit + 1),
+    )
+    rows = cur.fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        changes["more"] = True
+        changes["seq"] = int(rows[-1][0])
+    for _, entity, entity_id in rows:
+        if entity in changes:
+            changes[entity].append(int(entity_id))
+    return changes
+
+
+class ChangeSignal:
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self) -> None:
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation: int, timeout: float) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self.generation != generation, timeout)
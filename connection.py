@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from metrics import instrument
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+STARTUP_PRAGMAS: Tuple[str, ...] = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+)
+LOCKED_ERRORS = ("database is locked", "database table is locked", "database is busy")
+
+
+def is_locked_error(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and str(exc).lower().startswith(LOCKED_ERRORS)
+
+
+def retry_locked(attempts: int = 5, base_delay: float = 0.05) -> Callable[[F], F]:
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            attempt = 0
+            while True:
+                try:
+                    return fn(*args, **kwargs)
+                except sqlite3.OperationalError as exc:
+                    attempt += 1
+                    if attempt >= attempts or not is_locked_error(exc):
+                        raise
+                    time.sleep(base_delay * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_path: Path,
+        max_idle: int = 8,
+        cached_statements: int = 256,
+        pragmas: Tuple[str, ...] = STARTUP_PRAGMAS,
+        factory: type = sqlite3.Connection,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.max_idle = max(0, int(max_idle))
+        self.cached_statements = int(cached_statements)
+        self.pragmas = pragmas
+        self.factory = factory
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self.opened = 0
+
+    @instrument("connect")
+    def _open(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=self.factory,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def open(self) -> sqlite3.Connection:
+        return self._open()
+
+    def _held(self) -> Tuple[Optional[sqlite3.Connection], int]:
+        return getattr(self._local, "conn", None), getattr(self._local, "depth", 0)
+
+    def acquire(self) -> sqlite3.Connection:
+        conn, depth = self._held()
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+            self._local.conn = conn
+        self._local.depth = depth + 1
+        return conn
+
+    def release(self) -> None:
+        conn, depth = self._held()
+        if conn is None:
+            return
+        if depth > 1:
+            self._local.depth = depth - 1
+            return
+        self._local.conn = None
+        self._local.depth = 0
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release()
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        conn = self._open()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_idle(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            self._closed = True
+        self.close_idle()
@@ -1,15 +1,109 @@
 from __future__ import annotations
 
-import shutil
+import atexit
+import base64
+import contextvars
+import json
+import os
 import sqlite3
+import threading
+import time
 from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from backup import BackupManager
+from changes import (
+    DEFAULT_CHANGE_LIMIT,
+    ChangeSignal,
+    create_change_log,
+    latest_change,
+    mark_reset,
+    read_changes,
+    resume_change_log,
+    suspend_change_log,
+)
+from connection import ConnectionPool
+from export import Batch, iter_batches
+from metrics import connection_factory, instrument
+from migrations import Migration, latest_version, pending_migrations, run_migrations, schema_version
+from notes import render_key, render_notes
+from profiles import (
+    DEFAULT_MAX_OPEN,
+    ROOT_PROFILE,
+    ProfileRegistry,
+    UnknownProfileError,
+    normalize_profile_name,
+    profile_exists,
+    profile_paths,
+    profile_root,
+)
+from profiles import list_profiles as _list_profile_dirs
+from schedule import (
+    DUE_SOON_DAYS,
+    FORECAST_DAYS,
+    IMPORTANCE_ALIASES,
+    MAX_FORECAST_DAYS,
+    create_schedule_state,
+    due_summary,
+    refresh_next_due,
+    review_forecast,
+    schedule_is_current,
+)
+from schedulers import Scheduler, create_scheduler, create_scheduler_tables, replay_states, save_params
+from search import (
+    RANK_EXPRESSION,
+    SEARCH_TABLE,
+    SNIPPET_EXPRESSION,
+    create_search_index,
+    fts_query,
+    rebuild_search_index,
+    resume_search_triggers,
+    suspend_search_triggers,
+)
+from stats import (
+    bump_counter,
+    check_stats,
+    create_stats_tables,
+    forget_problem,
+    read_counters,
+    read_rollup,
+    rebuild_stats,
+    record_attempt,
+    record_importance,
+    record_review,
+    refresh_attempt_periods,
+)
+from summary import check_problem_summary, create_problem_summary, rebuild_problem_summary, refresh_problem_summary
+from tags import (
+    check_tag_index,
+    create_tag_index,
+    ensure_tag,
+    normalize_tag_name,
+    read_tag_stats,
+    rebuild_tag_index,
+    refresh_tag_index,
+    tag_filter,
+    tagged_problem_ids,
+    top_tags,
+)
+from tags import rename_tag as _rename_tag_path
+from writer import WriteQueue, writes
 
 BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "data"
-DB_PATH = DATA_DIR / "lc_tracker.db"
-BACKUP_DIR = DATA_DIR / "backups"
+DATA_DIR = Path(os.environ.get("LC_TRACKER_DATA_DIR", BASE_DIR / "data"))
+DEFAULT_PROFILE = normalize_profile_name(os.environ.get("LC_TRACKER_DEFAULT_PROFILE") or ROOT_PROFILE)
+MAX_OPEN_PROFILES = int(os.environ.get("LC_TRACKER_MAX_PROFILES", str(DEFAULT_MAX_OPEN)))
+BACKUP_KEEP = int(os.environ.get("LC_TRACKER_BACKUP_KEEP", "2"))
+BACKUP_DEBOUNCE_SECONDS = float(os.environ.get("LC_TRACKER_BACKUP_DEBOUNCE", "5"))
+BACKUP_MAX_DELAY_SECONDS = float(os.environ.get("LC_TRACKER_BACKUP_MAX_DELAY", "60"))
+WRITE_RETRIES = int(os.environ.get("LC_TRACKER_WRITE_RETRIES", "5"))
+WRITE_RETRY_DELAY_SECONDS = float(os.environ.get("LC_TRACKER_WRITE_RETRY_DELAY", "0.05"))
+WRITE_WINDOW_SECONDS = float(os.environ.get("LC_TRACKER_WRITE_WINDOW_MS", "0")) / 1000
+WRITE_MAX_BATCH = int(os.environ.get("LC_TRACKER_WRITE_MAX_BATCH", "64"))
+SCHEDULER_NAME = os.environ.get("LC_TRACKER_SCHEDULER", "intervals").strip().lower() or "intervals"
 
 DEFAULT_TAGS = [
     "Array",
@@ -24,34 +118,283 @@ DEFAULT_TAGS = [
     "Binary Search",
 ]
 
-IMPORTANCE_INTERVALS = {
-    "Low": [4, 8, 15, 30, 60, 120, 180],
-    "Medium": [2, 4, 7, 15, 30, 60, 90],
-    "High": [1, 2, 4, 7, 15, 30, 60],
+PROBLEM_SORTS = {
+    "last_attempt": ("COALESCE({p}last_attempt_at, {p}created_at)", "DESC"),
+    "created": ("{p}created_at", "DESC"),
+    "importance": ("CASE {p}frequency WHEN 'High' THEN 2 WHEN 'Low' THEN 0 ELSE 1 END", "DESC"),
+    "review_count": ("{p}review_count", "DESC"),
+    "lc_num": ("CAST({p}lc_num AS INTEGER)", "ASC"),
+    "review_due": ("COALESCE({p}next_due_at, '9999-12-31')", "ASC"),
 }
+PROBLEM_COLUMNS = """
+    p.id,
+    p.lc_num,
+    p.title,
+    p.frequency,
+    p.created_at,
+    p.last_attempt_at,
+    p.last_review_at,
+    p.snooze_until,
+    p.review_count,
+    p.next_due_at,
+    p.tag_names AS tags,
+    p.attempt_count
+"""
+DAY_ORDINAL = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+COMPACT_PROBLEM_COLUMNS = f"""
+    p.id,
+    p.lc_num,
+    p.title,
+    p.frequency,
+    {DAY_ORDINAL.format("p.created_at")} AS created_at,
+    {DAY_ORDINAL.format("p.last_attempt_at")} AS last_attempt_at,
+    {DAY_ORDINAL.format("p.last_review_at")} AS last_review_at,
+    {DAY_ORDINAL.format("p.snooze_until")} AS snooze_until,
+    p.review_count,
+    p.tag_ids AS tags,
+    p.attempt_count
+"""
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_COMPACT_PAGE_SIZE = 5000
+REVIEW_GRADES = ("again", "hard", "good", "easy")
+IMPORT_BATCH_SIZE = 1000
+ROW_FETCH_BATCH = 500
+MAX_REPORTED_ERRORS = 1000
 
 
 def _normalize_importance(value: str | None) -> str:
     if not value:
         return "Medium"
-    lowered = value.strip().lower()
-    if lowered in {"high", "critical", "crit"}:
-        return "High"
-    if lowered in {"low"}:
-        return "Low"
-    return "Medium"
+    return IMPORTANCE_ALIASES.get(value.strip().lower(), "Medium")
 
 
-def _connect() -> sqlite3.Connection:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _parse_day(value: str | None) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return None
 
 
-def init_db() -> None:
-    conn = _connect()
-    cur = conn.cursor()
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Database:
+    def __init__(self, name: str, db_path: Path, backup_dir: Path) -> None:
+        self.name = name
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, factory=connection_factory())
+        self.scheduler: Scheduler = create_scheduler(SCHEDULER_NAME)
+        self.backups = BackupManager(
+            db_path,
+            backup_dir,
+            keep=BACKUP_KEEP,
+            debounce_seconds=BACKUP_DEBOUNCE_SECONDS,
+            max_delay_seconds=BACKUP_MAX_DELAY_SECONDS,
+        )
+        self.changes = ChangeSignal()
+        self.writer = WriteQueue(
+            self.pool.open,
+            window_seconds=WRITE_WINDOW_SECONDS,
+            max_batch=WRITE_MAX_BATCH,
+            before_commit=_bump_data_version,
+            after_commit=self._after_write,
+            retries=WRITE_RETRIES,
+            retry_delay=WRITE_RETRY_DELAY_SECONDS,
+        )
+        self.ready = False
+        self.ready_lock = threading.Lock()
+
+    @instrument("backup")
+    def backup(self, wait: bool = False) -> Optional[Path]:
+        if wait:
+            return self.backups.flush() or self.backups.run_now()
+        self.backups.schedule()
+        return None
+
+    def _after_write(self) -> None:
+        self.backup()
+        self.changes.notify()
+
+    def close(self) -> None:
+        self.writer.close()
+        self.backups.close()
+        self.pool.close_all()
+
+
+def _open_database(name: str) -> Database:
+    if name != DEFAULT_PROFILE and not profile_exists(DATA_DIR, name):
+        raise UnknownProfileError(f"Unknown profile: {name}")
+    return Database(name, *profile_paths(DATA_DIR, name))
+
+
+_profiles: ProfileRegistry[Database] = ProfileRegistry(
+    _open_database,
+    Database.close,
+    max_open=MAX_OPEN_PROFILES,
+    pinned=(DEFAULT_PROFILE,),
+)
+atexit.register(_profiles.close_all)
+_current: contextvars.ContextVar[Optional[Database]] = contextvars.ContextVar("lc_tracker_database", default=None)
+
+
+def current_database() -> Database:
+    database = _current.get()
+    return database if database is not None else _profiles.get(DEFAULT_PROFILE)
+
+
+def open_profile(name: Optional[str] = None) -> Database:
+    return _profiles.get(DEFAULT_PROFILE if name is None else normalize_profile_name(name), hold=True)
+
+
+def close_profile(database: Database) -> None:
+    _profiles.release(database.name)
+
+
+def bind_profile(database: Database) -> contextvars.Token:
+    return _current.set(database)
+
+
+def unbind_profile(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def use_profile(name: Optional[str] = None) -> Iterator[Database]:
+    database = open_profile(name)
+    token = bind_profile(database)
+    try:
+        yield database
+    finally:
+        unbind_profile(token)
+        close_profile(database)
+
+
+class _ProfileStream:
+    def __init__(self, chunks: Iterable[Any]) -> None:
+        self.database = open_profile(current_database().name)
+        self.context = contextvars.copy_context()
+        self.context.run(bind_profile, self.database)
+        self.chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self) -> "_ProfileStream":
+        return self
+
+    def __next__(self) -> Any:
+        return self.context.run(next, self.chunks)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            self.context.run(close)
+        close_profile(self.database)
+
+
+def stream_in_profile(chunks: Iterable[Any]) -> Iterator[Any]:
+    return _ProfileStream(chunks)
+
+
+def list_profiles() -> List[str]:
+    names = _list_profile_dirs(DATA_DIR)
+    return names if DEFAULT_PROFILE in names else [*names, DEFAULT_PROFILE]
+
+
+def open_profile_names() -> List[str]:
+    return _profiles.names()
+
+
+def create_profile(name: str) -> Database:
+    name = normalize_profile_name(name)
+    profile_root(DATA_DIR, name).mkdir(parents=True, exist_ok=True)
+    with use_profile(name) as database:
+        init_db()
+    return database
+
+
+def ensure_ready() -> Database:
+    database = current_database()
+    if not database.ready:
+        with database.ready_lock:
+            if not database.ready:
+                init_db()
+    return database
+
+
+def _current_writer() -> WriteQueue:
+    return current_database().writer
+
+
+_writes = writes(_current_writer)
+
+
+def get_scheduler() -> Scheduler:
+    return current_database().scheduler
+
+
+def _load_scheduler(cur: sqlite3.Cursor) -> Scheduler:
+    database = current_database()
+    database.scheduler = create_scheduler(SCHEDULER_NAME, cur)
+    return database.scheduler
+
+
+def _refresh_schedule(cur: sqlite3.Cursor, problem_ids: Optional[Iterable[int]] = None) -> None:
+    ids = None if problem_ids is None else list(problem_ids)
+    scheduler = get_scheduler()
+    if scheduler.stateful:
+        replay_states(cur, scheduler, _normalize_importance, ids)
+    refresh_next_due(cur, ids, scheduler)
+    if ids is None:
+        rebuild_tag_index(cur)
+    else:
+        refresh_tag_index(cur, ids)
+
+
+def _bump_data_version(cur: sqlite3.Cursor) -> None:
+    cur.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+
+def get_data_version() -> int:
+    with _connection() as conn:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    return int(row["version"]) if row else 0
+
+
+def _connection() -> ContextManager[sqlite3.Connection]:
+    return current_database().pool.connection()
+
+
+def pin_connection() -> None:
+    current_database().pool.acquire()
+
+
+def unpin_connection() -> None:
+    current_database().pool.release()
+
+
+def close_connections() -> None:
+    for database in _profiles.handles():
+        database.pool.close_all()
+
+
+def close_profiles() -> None:
+    _profiles.close_open()
+
+
+def _create_base_tables(cur: sqlite3.Cursor) -> None:
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS tags (
@@ -73,6 +416,7 @@ def init_db() -> None:
             last_review_at TEXT,
             snooze_until TEXT,
             review_count INTEGER NOT NULL DEFAULT 0,
+            next_due_at TEXT,
             FOREIGN KEY (tag_id) REFERENCES tags (id)
         )
         """
@@ -95,6 +439,8 @@ def init_db() -> None:
             problem_id INTEGER NOT NULL,
             attempt_at TEXT NOT NULL,
             notes TEXT NOT NULL,
+            notes_html TEXT,
+            notes_render_key TEXT,
             FOREIGN KEY (problem_id) REFERENCES problems (id)
         )
         """
@@ -110,85 +456,215 @@ def init_db() -> None:
         )
         """
     )
-    conn.commit()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
 
+def _add_problem_columns(cur: sqlite3.Cursor) -> None:
     cur.execute("PRAGMA table_info(problems)")
     columns = {row["name"] for row in cur.fetchall()}
     if "snooze_until" not in columns:
         cur.execute("ALTER TABLE problems ADD COLUMN snooze_until TEXT")
-        conn.commit()
+    if "next_due_at" not in columns:
+        cur.execute("ALTER TABLE problems ADD COLUMN next_due_at TEXT")
+
+
+def _add_rendered_note_columns(cur: sqlite3.Cursor) -> None:
+    cur.execute("PRAGMA table_info(attempts)")
+    columns = {row["name"] for row in cur.fetchall()}
+    if "notes_html" not in columns:
+        cur.execute("ALTER TABLE attempts ADD COLUMN notes_html TEXT")
+        cur.execute("ALTER TABLE attempts ADD COLUMN notes_render_key TEXT")
+
 
+def _create_problem_indexes(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_problems_next_due ON problems (next_due_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_problems_forecast ON problems (frequency, review_count, next_due_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_problems_last_attempt ON problems (last_attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_problems_last_review ON problems (last_review_at)")
+    for sort_key, (expression, _) in PROBLEM_SORTS.items():
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_problems_sort_{sort_key} "
+            f"ON problems ({expression.format(p='')}, id)"
+        )
+
+
+def _create_history_indexes(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attempts_problem_at ON attempts (problem_id, attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attempts_attempt_at ON attempts (attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_review_logs_problem_at ON review_logs (problem_id, reviewed_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_review_logs_reviewed_at ON review_logs (reviewed_at)")
+    cur.execute("DROP INDEX IF EXISTS idx_attempts_problem")
+    cur.execute("DROP INDEX IF EXISTS idx_review_logs_problem")
+
+
+def _fix_critical_importance(cur: sqlite3.Cursor) -> None:
     cur.execute("UPDATE problems SET frequency = 'High' WHERE frequency = 'Critical'")
-    conn.commit()
 
+
+def _create_default_tags(cur: sqlite3.Cursor) -> None:
     for tag in DEFAULT_TAGS:
-        cur.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
+        ensure_tag(cur, tag)
+
+
+MIGRATIONS = (
+    Migration(1, "base tables", _create_base_tables),
+    Migration(2, "snooze and due date columns", _add_problem_columns),
+    Migration(3, "rendered note columns", _add_rendered_note_columns),
+    Migration(4, "scheduler tables", create_scheduler_tables),
+    Migration(5, "problem indexes", _create_problem_indexes),
+    Migration(6, "search index", create_search_index),
+    Migration(7, "change log", create_change_log),
+    Migration(8, "dashboard stats", lambda cur: create_stats_tables(cur, _normalize_importance)),
+    Migration(9, "tag hierarchy", create_tag_index),
+    Migration(10, "problem summary columns", create_problem_summary),
+    Migration(11, "history indexes", _create_history_indexes),
+    Migration(12, "rename Critical importance to High", _fix_critical_importance),
+    Migration(13, "default tags", _create_default_tags),
+)
+
+
+def init_db() -> None:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            current = not pending_migrations(cur, MIGRATIONS) and schedule_is_current(cur, _load_scheduler(cur))
+        finally:
+            conn.rollback()
+    if not current:
+        migrate()
+    current_database().ready = True
+
+
+def migrate(dry_run: bool = False) -> List[Dict[str, Any]]:
+    return _migrate(dry_run)
+
+
+@writes(_current_writer, dirty=False, transaction=False)
+def _migrate(cur: sqlite3.Cursor, dry_run: bool) -> List[Dict[str, Any]]:
+    conn = cur.connection
+    steps = run_migrations(conn, MIGRATIONS, dry_run)
+    if dry_run:
+        return steps
+    rescheduled = create_schedule_state(cur, _load_scheduler(cur), _normalize_importance)
+    if rescheduled:
+        rebuild_tag_index(cur)
+    if steps or rescheduled:
+        _bump_data_version(cur)
     conn.commit()
+    return steps
 
-    conn.close()
 
+def get_readiness() -> Dict[str, Any]:
+    with _connection() as conn:
+        version = schema_version(conn.cursor())
+    latest = latest_version(MIGRATIONS)
+    return {"ready": version == latest, "schema_version": version, "latest": latest}
 
-def backup_db(keep: int = 2) -> None:
-    if not DB_PATH.exists():
-        return
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = BACKUP_DIR / f"lc_tracker_{stamp}.db"
-    shutil.copy2(DB_PATH, backup_path)
 
-    backups = sorted(BACKUP_DIR.glob("lc_tracker_*.db"), key=lambda p: p.stat().st_mtime, reverse=True)
-    for old in backups[keep:]:
-        old.unlink(missing_ok=True)
+def get_schema_plan() -> Dict[str, Any]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        return {
+            "version": schema_version(cur),
+            "latest": latest_version(MIGRATIONS),
+            "pending": [
+                {"version": migration.version, "name": migration.name}
+                for migration in pending_migrations(cur, MIGRATIONS)
+            ],
+        }
 
 
-def _get_or_create_tag(conn: sqlite3.Connection, name: str) -> Optional[int]:
-    tag = name.strip()
-    if not tag:
-        return None
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-    row = cur.fetchone()
-    if row:
-        return int(row[0])
-    cur.execute("INSERT INTO tags (name) VALUES (?)", (tag,))
-    return int(cur.lastrowid)
+def backup_db(wait: bool = False) -> Optional[Path]:
+    return current_database().backup(wait)
+
+
+def list_backups() -> List[Path]:
+    return current_database().backups.list_backups()
+
+
+def export_snapshot(target_path: Path) -> Path:
+    return current_database().backups.snapshot(target_path)
+
+
+def iter_export(tables: Iterable[str]) -> Iterator[Batch]:
+    with current_database().pool.dedicated() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            yield from iter_batches(cur, list(tables))
+        finally:
+            conn.rollback()
+
+
+def restore_backup(backup_path: Path) -> None:
+    _restore_backup(Path(backup_path))
+
+
+@writes(_current_writer, dirty=False, transaction=False)
+def _restore_backup(cur: sqlite3.Cursor, backup_path: Path) -> None:
+    database = current_database()
+    try:
+        previous_version = get_data_version()
+    except sqlite3.OperationalError:
+        previous_version = 0
+    try:
+        previous_change = latest_change(cur)
+    except sqlite3.OperationalError:
+        previous_change = 0
+    database.backups.restore(backup_path)
+    init_db()
+    cur.execute(
+        "UPDATE data_version SET version = MAX(version, ?) + 1 WHERE id = 1",
+        (previous_version,),
+    )
+    mark_reset(cur, previous_change)
+    cur.connection.commit()
+    database.changes.notify()
 
 
 def get_tags() -> List[str]:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM tags ORDER BY name COLLATE NOCASE")
-    rows = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM tags ORDER BY name COLLATE NOCASE")
+        return [r[0] for r in cur.fetchall()]
 
 
-def add_tag(name: str) -> None:
-    conn = _connect()
-    _get_or_create_tag(conn, name)
-    conn.commit()
-    conn.close()
-    backup_db()
+def get_tag_stats(related: int = 5) -> List[Dict[str, Any]]:
+    with _connection() as conn:
+        return read_tag_stats(conn.cursor(), date.today().isoformat(), related)
 
 
-def rename_tag(old: str, new: str) -> bool:
-    old = old.strip()
-    new = new.strip()
-    if not old or not new or old == new:
-        return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM tags WHERE name = ?", (new,))
-    if cur.fetchone():
-        conn.close()
+def get_tag_names(tag_ids: Iterable[int]) -> Dict[int, str]:
+    with _connection() as conn:
+        rows = conn.execute(
+            "SELECT id, name FROM tags WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(tag_ids)),),
+        ).fetchall()
+    return {int(row["id"]): row["name"] for row in rows}
+
+
+@_writes
+def add_tag(cur: sqlite3.Cursor, name: str) -> None:
+    ensure_tag(cur, name)
+
+
+@_writes
+def rename_tag(cur: sqlite3.Cursor, old: str, new: str) -> bool:
+    moved = _rename_tag_path(cur, old, new)
+    if moved is None:
         return False
-    cur.execute("UPDATE tags SET name = ? WHERE name = ?", (new, old))
-    updated = cur.rowcount > 0
-    conn.commit()
-    conn.close()
-    if updated:
-        backup_db()
-    return updated
+    refresh_tag_index(cur, moved)
+    refresh_problem_summary(cur, tagged_problem_ids(cur, new))
+    return True
 
 
 def add_attempt(
@@ -199,14 +675,33 @@ def add_attempt(
     notes: str,
     attempt_at: Optional[str] = None,
 ) -> None:
-    attempt_at = attempt_at or date.today().isoformat()
-    frequency = _normalize_importance(frequency)
+    notes = notes.strip()
+    _write_attempt(
+        lc_num.strip(),
+        title.strip(),
+        [normalize_tag_name(t) for t in tag_names if t and normalize_tag_name(t)],
+        _normalize_importance(frequency),
+        notes,
+        render_notes(notes),
+        render_key(notes),
+        attempt_at or date.today().isoformat(),
+    )
 
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM problems WHERE lc_num = ?", (lc_num.strip(),))
+
+@_writes
+def _write_attempt(
+    cur: sqlite3.Cursor,
+    lc_num: str,
+    title: str,
+    cleaned_tags: List[str],
+    frequency: str,
+    notes: str,
+    notes_html: str,
+    notes_key: str,
+    attempt_at: str,
+) -> None:
+    cur.execute("SELECT id, frequency FROM problems WHERE lc_num = ?", (lc_num,))
     row = cur.fetchone()
-    cleaned_tags = [t.strip() for t in tag_names if t and t.strip()]
     tag_id = None
     if row:
         problem_id = int(row["id"])
@@ -216,22 +711,25 @@ def add_attempt(
             SET title = ?, tag_id = ?, frequency = ?, last_attempt_at = ?, last_review_at = ?, snooze_until = NULL
             WHERE id = ?
             """,
-            (title.strip(), tag_id, frequency, attempt_at, attempt_at, problem_id),
+            (title, tag_id, frequency, attempt_at, attempt_at, problem_id),
         )
+        record_importance(cur, _normalize_importance(row["frequency"]), frequency)
     else:
         cur.execute(
             """
             INSERT INTO problems (lc_num, title, tag_id, frequency, created_at, last_attempt_at, last_review_at, snooze_until)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (lc_num.strip(), title.strip(), tag_id, frequency, attempt_at, attempt_at, attempt_at, None),
+            (lc_num, title, tag_id, frequency, attempt_at, attempt_at, attempt_at, None),
         )
         problem_id = int(cur.lastrowid)
+        bump_counter(cur, "problems", 1)
+        record_importance(cur, None, frequency)
 
     if cleaned_tags:
         cur.execute("DELETE FROM problem_tags WHERE problem_id = ?", (problem_id,))
         for tag in cleaned_tags:
-            tag_id = _get_or_create_tag(conn, tag)
+            tag_id = ensure_tag(cur, tag)
             if tag_id is not None:
                 cur.execute(
                     "INSERT OR IGNORE INTO problem_tags (problem_id, tag_id) VALUES (?, ?)",
@@ -239,187 +737,556 @@ def add_attempt(
                 )
 
     cur.execute(
-        "INSERT INTO attempts (problem_id, attempt_at, notes) VALUES (?, ?, ?)",
-        (problem_id, attempt_at, notes.strip()),
+        """
+        INSERT INTO attempts (problem_id, attempt_at, notes, notes_html, notes_render_key)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (problem_id, attempt_at, notes, notes_html, notes_key),
     )
+    record_attempt(cur, problem_id, attempt_at, 1)
+    refresh_problem_summary(cur, [problem_id])
+    _refresh_schedule(cur, [problem_id])
+
+
+def _clean_import_record(record: Dict[str, Any]) -> Tuple[str, str, List[str], str, str, str]:
+    lc_num = str(record.get("lc_num") or "").strip()
+    title = str(record.get("title") or "").strip()
+    notes = str(record.get("notes") or "").strip()
+    if not lc_num or not title or not notes:
+        raise ValueError("Missing required fields")
+    attempt_at = str(record.get("attempt_at") or "").strip() or date.today().isoformat()
+    if _parse_day(attempt_at) is None:
+        raise ValueError(f"Invalid attempt_at: {attempt_at}")
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise ValueError(f"Invalid tags: {tags!r}")
+    cleaned_tags = [normalize_tag_name(t) for t in tags if normalize_tag_name(t)]
+    importance = record.get("importance")
+    if importance is None:
+        importance = record.get("frequency")
+    if importance is not None and not isinstance(importance, str):
+        raise ValueError(f"Invalid importance: {importance!r}")
+    frequency = _normalize_importance(importance)
+    return lc_num, title, cleaned_tags, frequency, notes, attempt_at
+
+
+def import_attempts(records: Iterable[Tuple[int, Union[Dict[str, Any], Exception]]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    errors: List[Dict[str, Any]] = []
+    error_count = 0
+    rows = []
+    for row_number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            rows.append(_clean_import_record(record))
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "error": str(exc)})
+    problems_created = _write_import(rows) if rows else 0
+    elapsed = time.perf_counter() - started
+    return {
+        "imported": len(rows),
+        "problems_created": problems_created,
+        "error_count": error_count,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(rows) / elapsed, 1) if elapsed > 0 else None,
+    }
 
-    conn.commit()
-    conn.close()
-    backup_db()
 
+@_writes
+def _write_import(cur: sqlite3.Cursor, rows: List[Tuple[str, str, List[str], str, str, str]]) -> int:
+    initial_importance: Dict[str, Optional[str]] = {}
+    final_importance: Dict[str, str] = {}
+    touched_ids: set[int] = set()
+
+    suspend_search_triggers(cur)
+    suspend_change_log(cur)
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM tags")
+    last_tag_id = int(cur.fetchone()[0])
+    cur.execute("SELECT id, name FROM tags")
+    tag_ids = {row["name"]: int(row["id"]) for row in cur.fetchall()}
+
+    for batch in _batched(rows, IMPORT_BATCH_SIZE):
+        lc_nums = sorted({row[0] for row in batch})
+        placeholders = ", ".join(["?"] * len(lc_nums))
+        cur.execute(f"SELECT lc_num, frequency FROM problems WHERE lc_num IN ({placeholders})", lc_nums)
+        existing = {row["lc_num"]: _normalize_importance(row["frequency"]) for row in cur.fetchall()}
+        for lc_num in lc_nums:
+            initial_importance.setdefault(lc_num, existing.get(lc_num))
+
+        cur.executemany(
+            """
+            INSERT INTO problems (lc_num, title, tag_id, frequency, created_at, last_attempt_at, last_review_at, snooze_until)
+            VALUES (?, ?, NULL, ?, ?, ?, ?, NULL)
+            ON CONFLICT (lc_num) DO UPDATE SET
+                title = excluded.title,
+                frequency = excluded.frequency,
+                created_at = MIN(created_at, excluded.created_at),
+                last_attempt_at = MAX(COALESCE(last_attempt_at, ''), excluded.last_attempt_at),
+                last_review_at = MAX(COALESCE(last_review_at, ''), excluded.last_review_at),
+                snooze_until = NULL
+            """,
+            [
+                (lc_num, title, frequency, attempt_at, attempt_at, attempt_at)
+                for lc_num, title, _, frequency, _, attempt_at in batch
+            ],
+        )
+        cur.execute(f"SELECT id, lc_num FROM problems WHERE lc_num IN ({placeholders})", lc_nums)
+        problem_ids = {row["lc_num"]: int(row["id"]) for row in cur.fetchall()}
+
+        latest_tags: Dict[int, List[str]] = {}
+        for lc_num, _, tags, frequency, _, _ in batch:
+            final_importance[lc_num] = frequency
+            if tags:
+                latest_tags[problem_ids[lc_num]] = tags
+        missing = sorted({tag for tags in latest_tags.values() for tag in tags} - tag_ids.keys())
+        for tag in missing:
+            tag_ids[tag] = ensure_tag(cur, tag)
+        cur.executemany(
+            "DELETE FROM problem_tags WHERE problem_id = ?",
+            [(problem_id,) for problem_id in latest_tags],
+        )
+        cur.executemany(
+            "INSERT OR IGNORE INTO problem_tags (problem_id, tag_id) VALUES (?, ?)",
+            [(problem_id, tag_ids[tag]) for problem_id, tags in latest_tags.items() for tag in tags],
+        )
 
-def mark_review(problem_id: int, grade: str = "good") -> None:
-    today = date.today().isoformat()
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT review_count FROM problems WHERE id = ?", (int(problem_id),))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return
-    current = int(row["review_count"] or 0)
-    grade = (grade or "good").strip().lower()
+        cur.executemany(
+            """
+            INSERT INTO attempts (problem_id, attempt_at, notes)
+            VALUES (?, ?, ?)
+            """,
+            [(problem_ids[lc_num], attempt_at, notes) for lc_num, _, _, _, notes, attempt_at in batch],
+        )
+        touched_ids.update(problem_ids.values())
+
+    created = sum(1 for value in initial_importance.values() if value is None)
+    bump_counter(cur, "attempts", len(rows))
+    bump_counter(cur, "problems", created)
+    for lc_num, final in final_importance.items():
+        record_importance(cur, initial_importance.get(lc_num), final)
+    refresh_attempt_periods(cur, {row[5] for row in rows})
+    refresh_problem_summary(cur, touched_ids)
+    _refresh_schedule(cur, touched_ids)
+    resume_search_triggers(cur, touched_ids)
+    cur.execute("SELECT id FROM tags WHERE id > ?", (last_tag_id,))
+    resume_change_log(cur, touched_ids, [int(row[0]) for row in cur.fetchall()])
+    return created
+
+
+def _review_count_after(current: int, grade: str) -> int:
     if grade == "again":
-        new_count = 0
-    elif grade == "easy":
-        new_count = current + 2
-    else:
-        new_count = current + 1
+        return 0
+    if grade == "easy":
+        return current + 2
+    return current + 1
+
+
+def _apply_review(cur: sqlite3.Cursor, problem_id: int, current: int, grade: str, reviewed_at: str) -> int:
+    new_count = _review_count_after(current, grade)
     cur.execute(
         """
         UPDATE problems
-        SET last_review_at = ?, review_count = ?, snooze_until = NULL
+        SET last_review_at = MAX(COALESCE(last_review_at, ''), ?), review_count = ?, snooze_until = NULL
         WHERE id = ?
         """,
-        (today, new_count, int(problem_id)),
+        (reviewed_at, new_count, problem_id),
     )
     cur.execute(
         "INSERT INTO review_logs (problem_id, reviewed_at, grade) VALUES (?, ?, ?)",
-        (int(problem_id), today, grade),
+        (problem_id, reviewed_at, grade),
     )
-    conn.commit()
-    conn.close()
-    backup_db()
+    record_review(cur, problem_id, reviewed_at, new_count - current)
+    return new_count
+
+
+def mark_review(problem_id: int, grade: str = "good") -> None:
+    _write_review(int(problem_id), (grade or "good").strip().lower(), date.today().isoformat())
+
 
+@_writes
+def _write_review(cur: sqlite3.Cursor, problem_id: int, grade: str, reviewed_at: str) -> None:
+    cur.execute("SELECT review_count FROM problems WHERE id = ?", (problem_id,))
+    row = cur.fetchone()
+    if not row:
+        return
+    _apply_review(cur, problem_id, int(row["review_count"] or 0), grade, reviewed_at)
+    _refresh_schedule(cur, [problem_id])
+
+
+def _clean_review(review: Dict[str, Any], today: str) -> Tuple[int, str, str]:
+    try:
+        problem_id = int(review.get("problem_id"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid problem_id: {review.get('problem_id')!r}") from None
+    grade = str(review.get("grade") or "good").strip().lower()
+    if grade not in REVIEW_GRADES:
+        raise ValueError(f"Invalid grade for problem {problem_id}: {grade}")
+    reviewed_at = str(review.get("reviewed_at") or "").strip() or today
+    if _parse_day(reviewed_at) is None or reviewed_at > today:
+        raise ValueError(f"Invalid reviewed_at for problem {problem_id}: {reviewed_at}")
+    return problem_id, grade, reviewed_at
+
+
+def mark_reviews(reviews: Iterable[Dict[str, Any]]) -> int:
+    today = date.today().isoformat()
+    cleaned = sorted(
+        (_clean_review(review, today) for review in reviews),
+        key=lambda review: review[2],
+    )
+    if not cleaned:
+        return 0
+    _write_reviews(cleaned)
+    return len(cleaned)
 
-def snooze_problem(problem_id: int, until: str) -> None:
-    conn = _connect()
-    cur = conn.cursor()
+
+@_writes
+def _write_reviews(cur: sqlite3.Cursor, cleaned: List[Tuple[int, str, str]]) -> None:
+    problem_ids = sorted({problem_id for problem_id, _, _ in cleaned})
     cur.execute(
-        "UPDATE problems SET snooze_until = ? WHERE id = ?",
-        (until, int(problem_id)),
+        f"SELECT id, review_count FROM problems WHERE id IN ({', '.join(['?'] * len(problem_ids))})",
+        problem_ids,
     )
-    conn.commit()
-    conn.close()
-    backup_db()
+    counts = {int(row["id"]): int(row["review_count"] or 0) for row in cur.fetchall()}
+    missing = [problem_id for problem_id in problem_ids if problem_id not in counts]
+    if missing:
+        raise ValueError(f"Unknown problem ids: {', '.join(str(problem_id) for problem_id in missing)}")
+    for problem_id, grade, reviewed_at in cleaned:
+        counts[problem_id] = _apply_review(cur, problem_id, counts[problem_id], grade, reviewed_at)
+    _refresh_schedule(cur, problem_ids)
 
 
-def get_problems(search: str = "", tags: List[str] | None = None) -> List[sqlite3.Row]:
-    conn = _connect()
-    cur = conn.cursor()
-    query = """
+@_writes
+def snooze_problem(cur: sqlite3.Cursor, problem_id: int, until: str) -> None:
+    cur.execute(
+        "UPDATE problems SET snooze_until = ? WHERE id = ?",
+        (until, int(problem_id)),
+    )
+    refresh_next_due(cur, [int(problem_id)], get_scheduler())
+    refresh_tag_index(cur, [int(problem_id)])
+
+
+def get_problems(search: str = "", tags: List[str] | None = None, tag_match: str = "any") -> List[sqlite3.Row]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        query = """
+            SELECT
+                p.id,
+                p.lc_num,
+                p.title,
+                p.frequency,
+                p.created_at,
+                p.last_attempt_at,
+                p.last_review_at,
+                p.snooze_until,
+                p.review_count,
+                p.tag_names AS tags,
+                p.attempt_count
+            FROM problems p
+        """
+        params: List[Any] = []
+        conditions: List[str] = []
+        match = fts_query(search)
+        if match:
+            conditions.append(f"p.id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)")
+            params.append(match)
+        tag_condition, tag_params = tag_filter(tags or [], tag_match)
+        if tag_condition:
+            conditions.append(tag_condition)
+            params.extend(tag_params)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY p.last_attempt_at DESC"
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def _encode_cursor(sort: str, value: Any, problem_id: int) -> str:
+    raw = json.dumps([sort, value, problem_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, problem_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort or not isinstance(problem_id, int):
+        raise ValueError("Cursor does not match sort")
+    return value, problem_id
+
+
+def get_problems_page(
+    search: str = "",
+    tags: List[str] | None = None,
+    sort: str = "last_attempt",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    tag_match: str = "any",
+    compact: bool = False,
+) -> Tuple[List[sqlite3.Row], Optional[str]]:
+    match = fts_query(search)
+    if sort == "relevance" and not match:
+        sort = "last_attempt"
+    if sort == "relevance":
+        expression, direction = RANK_EXPRESSION, "ASC"
+    elif sort in PROBLEM_SORTS:
+        template, direction = PROBLEM_SORTS[sort]
+        expression = template.format(p="p.")
+    else:
+        raise ValueError(f"Unknown sort: {sort}")
+    limit = max(1, min(int(limit), MAX_COMPACT_PAGE_SIZE if compact else MAX_PAGE_SIZE))
+    query = f"""
         SELECT
-            p.id,
-            p.lc_num,
-            p.title,
-            p.frequency,
-            p.created_at,
-            p.last_attempt_at,
-            p.last_review_at,
-            p.snooze_until,
-            p.review_count,
-            GROUP_CONCAT(DISTINCT t.name) AS tags,
-            COUNT(DISTINCT a.id) AS attempt_count
+            {COMPACT_PROBLEM_COLUMNS if compact else PROBLEM_COLUMNS},
+            {SNIPPET_EXPRESSION if match else "NULL"} AS snippet,
+            {expression} AS sort_value
         FROM problems p
-        LEFT JOIN problem_tags pt ON p.id = pt.problem_id
-        LEFT JOIN tags t ON pt.tag_id = t.id
-        LEFT JOIN attempts a ON p.id = a.problem_id
     """
-    params: List[str] = []
+    params: List[Any] = []
     conditions: List[str] = []
-    if search.strip():
-        like = f"%{search.strip()}%"
-        conditions.append("(p.lc_num LIKE ? OR p.title LIKE ? OR t.name LIKE ?)")
-        params.extend([like, like, like])
-    if tags:
-        tag_values = [t for t in tags if t and t != "All"]
-        if tag_values:
-            placeholders = ", ".join(["?"] * len(tag_values))
-            conditions.append(
-                "EXISTS (SELECT 1 FROM problem_tags pt2 "
-                "JOIN tags t2 ON pt2.tag_id = t2.id "
-                f"WHERE pt2.problem_id = p.id AND t2.name IN ({placeholders}))"
-            )
-            params.extend(tag_values)
+    if match:
+        query += f" JOIN {SEARCH_TABLE} ON {SEARCH_TABLE}.rowid = p.id"
+        conditions.append(f"{SEARCH_TABLE} MATCH ?")
+        params.append(match)
+    tag_condition, tag_params = tag_filter(tags or [], tag_match)
+    if tag_condition:
+        conditions.append(tag_condition)
+        params.extend(tag_params)
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort)
+        comparison = "<" if direction == "DESC" else ">"
+        conditions.append(
+            f"{expression} {comparison}= ? AND ({expression} {comparison} ? OR p.id {comparison} ?)"
+        )
+        params.extend([value, value, last_id])
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
-    query += " GROUP BY p.id ORDER BY p.last_attempt_at DESC"
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    conn.close()
+    query += f" ORDER BY {expression} {direction}, p.id {direction} LIMIT ?"
+    params.append(limit + 1)
+
+    with _connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, last["sort_value"], int(last["id"]))
+    return rows, next_cursor
+
+
+def get_changes(since: Optional[int], limit: int = DEFAULT_CHANGE_LIMIT) -> Dict[str, Any]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            changes = read_changes(cur, since, limit)
+            problems = _rows_by_id(cur, f"SELECT {PROBLEM_COLUMNS} FROM problems p", "p.id", changes["problem"])
+            tags = _rows_by_id(cur, "SELECT id, name, parent_id FROM tags", "id", changes["tag"])
+        finally:
+            conn.rollback()
+    return {
+        "seq": changes["seq"],
+        "more": changes["more"],
+        "reset": changes["reset"],
+        "problems": [problems[problem_id] for problem_id in changes["problem"] if problem_id in problems],
+        "tags": [tags[tag_id] for tag_id in changes["tag"] if tag_id in tags],
+        "deleted": {
+            "problems": [problem_id for problem_id in changes["problem"] if problem_id not in problems],
+            "tags": [tag_id for tag_id in changes["tag"] if tag_id not in tags],
+        },
+    }
+
+
+def _rows_by_id(cur: sqlite3.Cursor, select: str, column: str, ids: List[int]) -> Dict[int, sqlite3.Row]:
+    rows: Dict[int, sqlite3.Row] = {}
+    for batch in _batched(ids, ROW_FETCH_BATCH):
+        cur.execute(f"{select} WHERE {column} IN ({', '.join(['?'] * len(batch))})", batch)
+        rows.update((int(row["id"]), row) for row in cur.fetchall())
     return rows
 
 
+def change_generation() -> int:
+    return current_database().changes.generation
+
+
+def wait_for_changes(generation: int, timeout: float) -> bool:
+    return current_database().changes.wait(generation, timeout)
+
+
+@_writes
+def rebuild_search(cur: sqlite3.Cursor) -> int:
+    return rebuild_search_index(cur)
+
+
 def get_problem_detail(problem_id: int) -> Optional[sqlite3.Row]:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            p.id,
-            p.lc_num,
-            p.title,
-            p.frequency,
-            p.created_at,
-            p.last_attempt_at,
-            p.last_review_at,
-            p.snooze_until,
-            p.review_count,
-            GROUP_CONCAT(DISTINCT t.name) AS tags
-        FROM problems p
-        LEFT JOIN problem_tags pt ON p.id = pt.problem_id
-        LEFT JOIN tags t ON pt.tag_id = t.id
-        WHERE p.id = ?
-        GROUP BY p.id
-        """,
-        (int(problem_id),),
-    )
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                p.id,
+                p.lc_num,
+                p.title,
+                p.frequency,
+                p.created_at,
+                p.last_attempt_at,
+                p.last_review_at,
+                p.snooze_until,
+                p.review_count,
+                p.tag_names AS tags
+            FROM problems p
+            WHERE p.id = ?
+            """,
+            (int(problem_id),),
+        )
+        return cur.fetchone()
 
 
 def get_attempts(problem_id: int) -> List[sqlite3.Row]:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT id, attempt_at, notes
-        FROM attempts
-        WHERE problem_id = ?
-        ORDER BY attempt_at DESC
-        """,
-        (int(problem_id),),
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, attempt_at, notes, notes_html, notes_render_key
+            FROM attempts
+            WHERE problem_id = ?
+            ORDER BY attempt_at DESC
+            """,
+            (int(problem_id),),
+        )
+        return cur.fetchall()
+
+
+def store_rendered_notes(rendered: List[Tuple[int, str, str]]) -> None:
+    if rendered:
+        _write_rendered_notes.submit(rendered)
+
+
+@writes(_current_writer, dirty=False)
+def _write_rendered_notes(cur: sqlite3.Cursor, rendered: List[Tuple[int, str, str]]) -> None:
+    cur.executemany(
+        "UPDATE attempts SET notes_html = ?, notes_render_key = ? WHERE id = ?",
+        [(notes_html, key, attempt_id) for attempt_id, notes_html, key in rendered],
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+
+
+@_writes
+def _write_rerendered_notes(cur: sqlite3.Cursor, rendered: List[Tuple[str, str, int, str]]) -> int:
+    cur.executemany(
+        "UPDATE attempts SET notes_html = ?, notes_render_key = ? WHERE id = ? AND notes = ?",
+        rendered,
+    )
+    return cur.rowcount
+
+
+def rerender_notes(force: bool = False, batch_size: int = 500) -> int:
+    rendered = 0
+    last_id = 0
+    with _connection() as conn:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                """
+                SELECT id, notes, notes_render_key
+                FROM attempts
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = int(rows[-1]["id"])
+            updates = []
+            for row in rows:
+                key = render_key(row["notes"])
+                if force or row["notes_render_key"] != key:
+                    updates.append((render_notes(row["notes"]), key, int(row["id"]), row["notes"]))
+            if updates:
+                rendered += _write_rerendered_notes(updates)
+    return rendered
 
 
 def get_due_reviews(limit: int = 3) -> List[sqlite3.Row]:
-    problems = get_problems()
-    today = date.today()
-    due: List[tuple[sqlite3.Row, date]] = []
-
-    for row in problems:
-        snooze_until = row["snooze_until"]
-        if snooze_until:
-            try:
-                snooze_date = datetime.strptime(snooze_until, "%Y-%m-%d").date()
-            except ValueError:
-                snooze_date = None
-            if snooze_date and snooze_date > today:
-                continue
-        base_date_str = row["last_review_at"] or row["last_attempt_at"] or row["created_at"]
-        try:
-            base_date = datetime.strptime(base_date_str, "%Y-%m-%d").date()
-        except ValueError:
-            base_date = today
+    limit = max(1, min(limit, 5))
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                p.id,
+                p.lc_num,
+                p.title,
+                p.frequency,
+                p.created_at,
+                p.last_attempt_at,
+                p.last_review_at,
+                p.snooze_until,
+                p.review_count,
+                p.next_due_at,
+                p.tag_names AS tags,
+                p.attempt_count
+            FROM problems p
+            WHERE p.next_due_at <= ?
+            ORDER BY p.next_due_at, p.id
+            LIMIT ?
+            """,
+            (date.today().isoformat(), limit),
+        )
+        return cur.fetchall()
 
-        importance = _normalize_importance(row["frequency"])
-        intervals = IMPORTANCE_INTERVALS.get(importance, IMPORTANCE_INTERVALS["Medium"])
-        stage = min(int(row["review_count"]), len(intervals) - 1)
-        required_days = intervals[stage]
-        delta_days = (today - base_date).days
 
-        if delta_days >= required_days:
-            due.append((row, base_date))
+@_writes
+def rebuild_scheduler_state(cur: sqlite3.Cursor) -> int:
+    _refresh_schedule(cur)
+    cur.execute("SELECT COUNT(*) FROM scheduler_state")
+    return int(cur.fetchone()[0]) if get_scheduler().stateful else 0
+
+
+def optimize_scheduler(max_seconds: float = 10.0, apply: bool = True, seed: Optional[int] = None) -> Dict[str, Any]:
+    import optimizer
+
+    with _connection() as conn:
+        current = create_scheduler("fsrs", conn.cursor()).params
+    with current_database().pool.dedicated() as conn:
+        result = optimizer.optimize(conn.cursor(), current, max_seconds, seed)
+    result["applied"] = False
+    if apply and result["improved"]:
+        _save_scheduler_params("fsrs", result["params"], result["events"], result["loss_after"])
+        result["applied"] = True
+    return result
+
+
+@_writes
+def _save_scheduler_params(cur: sqlite3.Cursor, name: str, params: List[float], events: int, loss: float) -> None:
+    save_params(cur, name, params, events, loss)
+    if SCHEDULER_NAME == name and create_schedule_state(cur, _load_scheduler(cur), _normalize_importance):
+        rebuild_tag_index(cur)
+
+
+def get_review_schedule(soon_days: int = DUE_SOON_DAYS) -> Dict[str, Any]:
+    with _connection() as conn:
+        return due_summary(conn.cursor(), date.today(), max(1, soon_days))
+
+
+@lru_cache(maxsize=16)
+def _cached_forecast(profile: str, version: int, today: str, days: int) -> Dict[str, Any]:
+    with _connection() as conn:
+        return review_forecast(conn.cursor(), date.fromisoformat(today), days, _normalize_importance, get_scheduler())
 
-    due.sort(key=lambda item: item[1])
-    limit = max(1, min(limit, 5))
-    if due:
-        return [row for row, _ in due[:limit]]
-    return []
+
+def get_review_forecast(days: int = FORECAST_DAYS) -> Dict[str, Any]:
+    days = max(1, min(int(days), MAX_FORECAST_DAYS))
+    return _cached_forecast(current_database().name, get_data_version(), date.today().isoformat(), days)
 
 
 def _build_daily_trends(cur: sqlite3.Cursor, days: int) -> dict:
@@ -428,33 +1295,12 @@ def _build_daily_trends(cur: sqlite3.Cursor, days: int) -> dict:
     keys = [start + timedelta(days=i) for i in range(days)]
     date_keys = [value.isoformat() for value in keys]
     labels = [value.strftime("%m-%d") for value in keys]
-
-    cur.execute(
-        """
-        SELECT attempt_at AS day, COUNT(DISTINCT problem_id) AS count
-        FROM attempts
-        WHERE attempt_at >= ? AND attempt_at <= ?
-        GROUP BY attempt_at
-        """,
-        (start.isoformat(), today.isoformat()),
-    )
-    attempt_counts = {row["day"]: int(row["count"] or 0) for row in cur.fetchall()}
-
-    cur.execute(
-        """
-        SELECT reviewed_at AS day, COUNT(DISTINCT problem_id) AS count
-        FROM review_logs
-        WHERE reviewed_at >= ? AND reviewed_at <= ?
-        GROUP BY reviewed_at
-        """,
-        (start.isoformat(), today.isoformat()),
-    )
-    review_counts = {row["day"]: int(row["count"] or 0) for row in cur.fetchall()}
+    rollup = read_rollup(cur, "day", start.isoformat(), today.isoformat())
 
     return {
         "labels": labels,
-        "attempts": [attempt_counts.get(key, 0) for key in date_keys],
-        "reviews": [review_counts.get(key, 0) for key in date_keys],
+        "attempts": [int(rollup[key]["attempt_problems"]) if key in rollup else 0 for key in date_keys],
+        "reviews": [int(rollup[key]["review_problems"]) if key in rollup else 0 for key in date_keys],
     }
 
 
@@ -479,118 +1325,44 @@ def _build_monthly_trends(cur: sqlite3.Cursor, months: int) -> dict:
             month = 1
             year += 1
 
-    start_date = date(start_year, start_month, 1).isoformat()
-    today_date = today.isoformat()
-
-    cur.execute(
-        """
-        SELECT strftime('%Y-%m', attempt_at) AS month, COUNT(DISTINCT problem_id) AS count
-        FROM attempts
-        WHERE attempt_at >= ? AND attempt_at <= ?
-        GROUP BY month
-        """,
-        (start_date, today_date),
-    )
-    attempt_counts = {row["month"]: int(row["count"] or 0) for row in cur.fetchall()}
-
-    cur.execute(
-        """
-        SELECT strftime('%Y-%m', reviewed_at) AS month, COUNT(DISTINCT problem_id) AS count
-        FROM review_logs
-        WHERE reviewed_at >= ? AND reviewed_at <= ?
-        GROUP BY month
-        """,
-        (start_date, today_date),
-    )
-    review_counts = {row["month"]: int(row["count"] or 0) for row in cur.fetchall()}
+    rollup = read_rollup(cur, "month", month_keys[0], month_keys[-1])
 
     return {
         "labels": labels,
-        "attempts": [attempt_counts.get(key, 0) for key in month_keys],
-        "reviews": [review_counts.get(key, 0) for key in month_keys],
+        "attempts": [int(rollup[key]["attempt_problems"]) if key in rollup else 0 for key in month_keys],
+        "reviews": [int(rollup[key]["review_problems"]) if key in rollup else 0 for key in month_keys],
     }
 
 
 def get_dashboard_summary() -> dict:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) AS count FROM problems")
-    total_problems = int(cur.fetchone()["count"] or 0)
-    cur.execute("SELECT COUNT(*) AS count FROM attempts")
-    total_attempts = int(cur.fetchone()["count"] or 0)
-    cur.execute("SELECT COALESCE(SUM(review_count), 0) AS count FROM problems")
-    total_reviews = int(cur.fetchone()["count"] or 0)
-    cur.execute("SELECT MAX(attempt_at) AS value FROM attempts")
-    last_attempt_at = cur.fetchone()["value"]
-    cur.execute("SELECT MAX(last_review_at) AS value FROM problems")
-    last_review_at = cur.fetchone()["value"]
-    cur.execute("SELECT COUNT(*) AS count FROM attempts WHERE attempt_at >= date('now', '-30 day')")
-    attempts_30d = int(cur.fetchone()["count"] or 0)
-    cur.execute("SELECT COUNT(DISTINCT attempt_at) AS count FROM attempts WHERE attempt_at >= date('now', '-30 day')")
-    active_days_30d = int(cur.fetchone()["count"] or 0)
-    cur.execute("SELECT COUNT(*) AS count FROM problems WHERE last_attempt_at >= date('now', '-30 day')")
-    touched_30d = int(cur.fetchone()["count"] or 0)
-
-    cur.execute("SELECT frequency, COUNT(*) AS count FROM problems GROUP BY frequency")
-    importance_counts = {"Low": 0, "Medium": 0, "High": 0}
-    for row in cur.fetchall():
-        importance = _normalize_importance(row["frequency"])
-        importance_counts[importance] = importance_counts.get(importance, 0) + int(row["count"] or 0)
-
-    cur.execute(
-        """
-        SELECT t.name AS name, COUNT(DISTINCT pt.problem_id) AS count
-        FROM tags t
-        JOIN problem_tags pt ON t.id = pt.tag_id
-        GROUP BY t.id
-        ORDER BY count DESC, t.name COLLATE NOCASE ASC
-        LIMIT 5
-        """
-    )
-    top_tags = [{"name": row["name"], "count": int(row["count"] or 0)} for row in cur.fetchall()]
-
-    cur.execute(
-        """
-        SELECT frequency, created_at, last_attempt_at, last_review_at, review_count, snooze_until
-        FROM problems
-        """
-    )
-    problem_rows = cur.fetchall()
-    trends = {
-        "week": _build_daily_trends(cur, 7),
-        "month": _build_daily_trends(cur, 30),
-        "year": _build_monthly_trends(cur, 12),
-    }
-    conn.close()
-
     today = date.today()
-    due_now = 0
-    due_soon = 0
-    for row in problem_rows:
-        snooze_until = row["snooze_until"]
-        if snooze_until:
-            try:
-                snooze_date = datetime.strptime(snooze_until, "%Y-%m-%d").date()
-            except ValueError:
-                snooze_date = None
-            if snooze_date and snooze_date > today:
-                continue
-        base_date_str = row["last_review_at"] or row["last_attempt_at"] or row["created_at"]
-        try:
-            base_date = datetime.strptime(base_date_str, "%Y-%m-%d").date()
-        except (TypeError, ValueError):
-            continue
-        importance = _normalize_importance(row["frequency"])
-        intervals = IMPORTANCE_INTERVALS.get(importance, IMPORTANCE_INTERVALS["Medium"])
-        stage = min(int(row["review_count"] or 0), len(intervals) - 1)
-        required_days = intervals[stage]
-        delta_days = (today - base_date).days
-        if delta_days >= required_days:
-            due_now += 1
-        else:
-            remaining = required_days - delta_days
-            if remaining <= 7:
-                due_soon += 1
+    window_start = (today - timedelta(days=30)).isoformat()
+    with _connection() as conn:
+        cur = conn.cursor()
+        counters = read_counters(cur)
+        total_problems = counters.get("problems", 0)
+        total_attempts = counters.get("attempts", 0)
+        total_reviews = counters.get("reviews", 0)
+        cur.execute("SELECT MAX(attempt_at) AS value FROM attempts")
+        last_attempt_at = cur.fetchone()["value"]
+        cur.execute("SELECT MAX(last_review_at) AS value FROM problems")
+        last_review_at = cur.fetchone()["value"]
+        recent = read_rollup(cur, "day", window_start, "9999-12-31")
+        attempts_30d = sum(int(row["attempts"]) for row in recent.values())
+        active_days_30d = sum(1 for row in recent.values() if row["attempts"])
+        cur.execute("SELECT COUNT(*) AS count FROM problems WHERE last_attempt_at >= ?", (window_start,))
+        touched_30d = int(cur.fetchone()["count"] or 0)
+
+        importance_counts = {level: counters.get(f"importance:{level}", 0) for level in ("Low", "Medium", "High")}
+
+        popular_tags = top_tags(cur)
+
+        due = due_summary(cur, today)
+        trends = {
+            "week": _build_daily_trends(cur, 7),
+            "month": _build_daily_trends(cur, 30),
+            "year": _build_monthly_trends(cur, 12),
+        }
 
     coverage_percent = int(round((touched_30d / total_problems) * 100)) if total_problems else 0
 
@@ -600,7 +1372,7 @@ def get_dashboard_summary() -> dict:
             "attempts": total_attempts,
             "reviews": total_reviews,
         },
-        "due": {"now": due_now, "soon": due_soon},
+        "due": {"now": due["now"], "soon": due["soon"]},
         "activity": {
             "last_attempt_at": last_attempt_at,
             "last_review_at": last_review_at,
@@ -613,39 +1385,67 @@ def get_dashboard_summary() -> dict:
             },
         },
         "importance": importance_counts,
-        "top_tags": top_tags,
+        "top_tags": popular_tags,
         "trends": trends,
     }
 
 
+def _check_dashboard_stats(cur: sqlite3.Cursor) -> List[str]:
+    return check_stats(cur, _normalize_importance) + check_tag_index(cur) + check_problem_summary(cur)
+
+
+def check_dashboard_stats(fix: bool = False) -> List[str]:
+    if fix:
+        return _repair_dashboard_stats()
+    with _connection() as conn:
+        return _check_dashboard_stats(conn.cursor())
+
+
+@_writes
+def _repair_dashboard_stats(cur: sqlite3.Cursor) -> List[str]:
+    problems = _check_dashboard_stats(cur)
+    if problems:
+        rebuild_stats(cur, _normalize_importance)
+        rebuild_tag_index(cur)
+        rebuild_problem_summary(cur)
+    return problems
+
+
 def update_attempt(attempt_id: int, notes: str) -> None:
-    conn = _connect()
-    cur = conn.cursor()
+    notes = notes.strip()
+    _write_attempt_notes(int(attempt_id), notes, render_notes(notes), render_key(notes))
+
+
+@_writes
+def _write_attempt_notes(cur: sqlite3.Cursor, attempt_id: int, notes: str, notes_html: str, notes_key: str) -> None:
     cur.execute(
-        "UPDATE attempts SET notes = ? WHERE id = ?",
-        (notes.strip(), int(attempt_id)),
+        "UPDATE attempts SET notes = ?, notes_html = ?, notes_render_key = ? WHERE id = ?",
+        (notes, notes_html, notes_key, attempt_id),
     )
-    conn.commit()
-    conn.close()
-    backup_db()
 
 
-def delete_attempt(attempt_id: int) -> None:
-    conn = _connect()
-    cur = conn.cursor()
+@_writes
+def delete_attempt(cur: sqlite3.Cursor, attempt_id: int) -> None:
+    cur.execute("SELECT problem_id, attempt_at FROM attempts WHERE id = ?", (int(attempt_id),))
+    row = cur.fetchone()
+    if not row:
+        return
     cur.execute("DELETE FROM attempts WHERE id = ?", (int(attempt_id),))
-    conn.commit()
-    conn.close()
-    backup_db()
+    record_attempt(cur, int(row["problem_id"]), row["attempt_at"], -1)
+    refresh_problem_summary(cur, [int(row["problem_id"])])
+    _refresh_schedule(cur, [int(row["problem_id"])])
 
 
-def delete_problem(problem_id: int) -> None:
-    conn = _connect()
-    cur = conn.cursor()
+@_writes
+def delete_problem(cur: sqlite3.Cursor, problem_id: int) -> None:
+    cur.execute("SELECT frequency, review_count FROM problems WHERE id = ?", (int(problem_id),))
+    row = cur.fetchone()
+    if not row:
+        return
+    forget_problem(cur, int(problem_id), _normalize_importance(row["frequency"]), int(row["review_count"] or 0))
     cur.execute("DELETE FROM problem_tags WHERE problem_id = ?", (int(problem_id),))
     cur.execute("DELETE FROM attempts WHERE problem_id = ?", (int(problem_id),))
     cur.execute("DELETE FROM review_logs WHERE problem_id = ?", (int(problem_id),))
+    cur.execute("DELETE FROM scheduler_state WHERE problem_id = ?", (int(problem_id),))
     cur.execute("DELETE FROM problems WHERE id = ?", (int(problem_id),))
-    conn.commit()
-    conn.close()
-    backup_db()
+    refresh_tag_index(cur, [int(problem_id)])
\ No newline at end of file
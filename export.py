@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+EXPORT_FORMATS = ("jsonl", "csv", "sqlite")
+EXPORT_TABLES: Dict[str, Tuple[str, ...]] = {
+    "tags": ("id", "name"),
+    "problems": (
+        "id",
+        "lc_num",
+        "title",
+        "frequency",
+        "created_at",
+        "last_attempt_at",
+        "last_review_at",
+        "snooze_until",
+        "review_count",
+        "next_due_at",
+    ),
+    "problem_tags": ("problem_id", "tag_id"),
+    "attempts": ("id", "problem_id", "attempt_at", "notes"),
+    "review_logs": ("id", "problem_id", "reviewed_at", "grade"),
+}
+EXPORT_MIMETYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "sqlite": "application/vnd.sqlite3",
+}
+FETCH_SIZE = 500
+FILE_CHUNK_SIZE = 64 * 1024
+
+Batch = Tuple[str, List[sqlite3.Row]]
+
+
+def resolve_tables(names: Iterable[str]) -> List[str]:
+    tables = [name.strip() for name in names if name and name.strip()]
+    unknown = [name for name in tables if name not in EXPORT_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown table: {', '.join(unknown)}")
+    return tables or list(EXPORT_TABLES)
+
+
+def iter_batches(cur: sqlite3.Cursor, tables: Sequence[str], fetch_size: int = FETCH_SIZE) -> Iterator[Batch]:
+    for table in tables:
+        columns = EXPORT_TABLES[table]
+        order = "id" if "id" in columns else ", ".join(columns)
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}")
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield table, rows
+
+
+def jsonl_chunks(batches: Iterable[Batch]) -> Iterator[str]:
+    for table, rows in batches:
+        columns = EXPORT_TABLES[table]
+        yield "".join(
+            json.dumps({"table": table, "row": dict(zip(columns, row))}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def csv_chunks(table: str, batches: Iterable[Batch]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_TABLES[table])
+    for batch_table, rows in batches:
+        if batch_table != table:
+            raise ValueError("CSV export holds a single table")
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def file_chunks(path: Path, chunk_size: int = FILE_CHUNK_SIZE) -> Iterator[bytes]:
+    with Path(path).open("rb") as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+
+bind = os.environ.get("LC_TRACKER_BIND", "127.0.0.1:5123")
+workers = int(os.environ.get("LC_TRACKER_WORKERS", min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get("LC_TRACKER_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("LC_TRACKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get("LC_TRACKER_ACCESS_LOG") or None
+
+
+def post_fork(server, worker):
+    from web_app import profiler
+
+    if os.environ.get("LC_TRACKER_PROFILE", "").strip().lower() in {"1", "true", "yes", "on"}:
+        profiler.start()
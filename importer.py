@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import csv
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple, Union
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+_TAG_SPLIT_RE = re.compile(r"[,;|]")
+
+ImportRecord = Tuple[int, Union[Dict[str, Any], Exception]]
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    if mimetype in {"text/csv", "application/csv"}:
+        return "csv"
+    if mimetype in {"application/jsonl", "application/x-ndjson", "application/json", "application/x-jsonlines"}:
+        return "jsonl"
+    return None
+
+
+def _split_tags(value: Any) -> Any:
+    if isinstance(value, str):
+        return [tag for tag in _TAG_SPLIT_RE.split(value) if tag.strip()]
+    return value
+
+
+def _iter_csv(stream: TextIO) -> Iterator[ImportRecord]:
+    reader = csv.DictReader(stream)
+    for row_number, row in enumerate(reader, start=1):
+        record: Dict[str, Any] = {(key or "").strip().lower(): value for key, value in row.items()}
+        record["tags"] = _split_tags(record.get("tags"))
+        yield row_number, record
+
+
+def _iter_jsonl(stream: TextIO) -> Iterator[ImportRecord]:
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, ValueError(f"Invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(record, dict):
+            yield row_number, ValueError("Expected a JSON object")
+            continue
+        record["tags"] = _split_tags(record.get("tags"))
+        yield row_number, record
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[ImportRecord]:
+    if fmt == "csv":
+        return _iter_csv(stream)
+    if fmt == "jsonl":
+        return _iter_jsonl(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+ENABLED = os.environ.get("LC_TRACKER_METRICS", "").strip().lower() in {"1", "true", "yes", "on"}
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SLOWEST_QUERIES = 50
+MAX_STATEMENTS = 500
+SERVER_TIMING_PHASES = ("connect", "db", "markdown", "json", "backup")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_lock = threading.Lock()
+_routes: Dict[str, Dict[str, Any]] = {}
+_statements: Dict[str, List[float]] = {}
+_slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+_sequence = 0
+
+
+class _Request:
+    __slots__ = ("started", "phases", "queries")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.queries: List[List[Any]] = []
+
+
+_request: contextvars.ContextVar[Optional[_Request]] = contextvars.ContextVar("lc_tracker_metrics", default=None)
+
+
+def _current() -> Optional[_Request]:
+    return _request.get()
+
+
+def instrument(phase: str) -> Callable[[F], F]:
+    def decorator(fn: F) -> F:
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            state = _current()
+            if state is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                state.phases[phase] = state.phases.get(phase, 0.0) + time.perf_counter() - start
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _normalize_sql(sql: str) -> str:
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _record: Optional[List[Any]] = None
+
+    def _timed(self, sql: str, call: Callable[[], Any]) -> Any:
+        state = _current()
+        if state is None:
+            return call()
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self._record = [sql, time.perf_counter() - start, max(self.rowcount, 0)]
+            state.queries.append(self._record)
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        return self._timed(sql, lambda: super(InstrumentedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "InstrumentedCursor":
+        return self._timed(sql, lambda: super(InstrumentedCursor, self).executemany(sql, seq_of_parameters))
+
+    def executescript(self, sql_script: str) -> "InstrumentedCursor":
+        return self._timed(sql_script, lambda: super(InstrumentedCursor, self).executescript(sql_script))
+
+    def _fetched(self, start: float, rows: int) -> None:
+        if self._record is not None:
+            self._record[1] += time.perf_counter() - start
+            self._record[2] += rows
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: int = -1) -> List[Any]:
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size < 0 else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory: Any = InstrumentedCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> Any:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> Any:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> Any:
+        return self.cursor().executescript(sql_script)
+
+
+def connection_factory() -> type:
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+def begin_request() -> None:
+    _request.set(_Request())
+
+
+def end_request(route: str) -> Optional[Dict[str, float]]:
+    global _sequence
+    state = _current()
+    if state is None:
+        return None
+    _request.set(None)
+    timings = {name: seconds * 1000 for name, seconds in state.phases.items()}
+    timings["db"] = sum(query[1] for query in state.queries) * 1000
+    timings["total"] = (time.perf_counter() - state.started) * 1000
+    with _lock:
+        stats = _routes.setdefault(
+            route,
+            {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "queries": 0, "buckets": [0] * (len(BUCKETS_MS) + 1)},
+        )
+        stats["count"] += 1
+        stats["total_ms"] += timings["total"]
+        stats["max_ms"] = max(stats["max_ms"], timings["total"])
+        stats["queries"] += len(state.queries)
+        stats["buckets"][bisect.bisect_left(BUCKETS_MS, timings["total"])] += 1
+        for sql, seconds, rows in state.queries:
+            text = _normalize_sql(sql)
+            statement = _statements.get(text)
+            if statement is None:
+                if len(_statements) >= MAX_STATEMENTS:
+                    statement = [0, 0.0, 0, 0.0]
+                else:
+                    statement = _statements[text] = [0, 0.0, 0, 0.0]
+            statement[0] += 1
+            statement[1] += seconds * 1000
+            statement[2] += rows
+            statement[3] = max(statement[3], seconds * 1000)
+            _sequence += 1
+            entry = (seconds, _sequence, {"sql": text, "ms": seconds * 1000, "rows": rows, "route": route})
+            if len(_slowest) < SLOWEST_QUERIES:
+                heapq.heappush(_slowest, entry)
+            elif seconds > _slowest[0][0]:
+                heapq.heapreplace(_slowest, entry)
+    timings["queries"] = len(state.queries)
+    return timings
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    parts = []
+    for phase in SERVER_TIMING_PHASES:
+        if phase in timings:
+            desc = f';desc="{int(timings["queries"])} queries"' if phase == "db" else ""
+            parts.append(f"{phase};dur={timings[phase]:.3f}{desc}")
+    parts.append(f"total;dur={timings['total']:.3f}")
+    return ", ".join(parts)
+
+
+def snapshot(statement_limit: int = 25) -> Dict[str, Any]:
+    with _lock:
+        routes = {
+            route: {
+                "count": stats["count"],
+                "mean_ms": stats["total_ms"] / stats["count"],
+                "max_ms": stats["max_ms"],
+                "queries_per_request": stats["queries"] / stats["count"],
+                "histogram": [
+                    {"le_ms": bound, "count": count}
+                    for bound, count in zip(list(BUCKETS_MS) + [None], stats["buckets"])
+                ],
+            }
+            for route, stats in sorted(_routes.items())
+        }
+        statements = sorted(_statements.items(), key=lambda item: item[1][1], reverse=True)[:statement_limit]
+        slowest = [entry[2] for entry in sorted(_slowest, reverse=True)]
+    return {
+        "enabled": ENABLED,
+        "routes": routes,
+        "slowest_queries": slowest,
+        "statements": [
+            {"sql": sql, "count": count, "total_ms": total, "rows": rows, "max_ms": worst}
+            for sql, (count, total, rows, worst) in statements
+        ],
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _routes.clear()
+        _statements.clear()
+        _slowest.clear()
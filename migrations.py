@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Cursor], Any]
+
+
+def schema_version(cur: sqlite3.Cursor) -> int:
+    cur.execute("PRAGMA user_version")
+    return int(cur.fetchone()[0])
+
+
+def latest_version(migrations: Sequence[Migration]) -> int:
+    versions = [migration.version for migration in migrations]
+    if versions != sorted(set(versions)) or (versions and versions[0] < 1):
+        raise ValueError("Migration versions must be positive and strictly increasing")
+    return versions[-1] if versions else 0
+
+
+def pending_migrations(cur: sqlite3.Cursor, migrations: Sequence[Migration]) -> List[Migration]:
+    latest = latest_version(migrations)
+    current = schema_version(cur)
+    if current > latest:
+        raise RuntimeError(f"Database schema version {current} is newer than this code supports ({latest})")
+    return [migration for migration in migrations if migration.version > current]
+
+
+def _step(migration: Migration, seconds: float) -> Dict[str, Any]:
+    return {"version": migration.version, "name": migration.name, "seconds": round(seconds, 4)}
+
+
+def run_migrations(
+    conn: sqlite3.Connection,
+    migrations: Sequence[Migration],
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    cur = conn.cursor()
+    pending = pending_migrations(cur, migrations)
+    steps: List[Dict[str, Any]] = []
+    if not pending:
+        return steps
+    if dry_run:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for migration in pending_migrations(cur, migrations):
+                started = time.perf_counter()
+                migration.apply(cur)
+                steps.append(_step(migration, time.perf_counter() - started))
+        finally:
+            conn.rollback()
+        return steps
+    for migration in pending:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(cur) >= migration.version:
+                conn.rollback()
+                continue
+            started = time.perf_counter()
+            migration.apply(cur)
+            cur.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        steps.append(_step(migration, time.perf_counter() - started))
+    return steps
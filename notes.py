@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from metrics import instrument
+
+if TYPE_CHECKING:
+    import markdown
+
+MARKDOWN_EXTENSIONS = ("extra", "sane_lists")
+
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def renderer_version() -> str:
+    import markdown
+
+    return hashlib.sha1(f"{markdown.__version__}|{','.join(MARKDOWN_EXTENSIONS)}".encode()).hexdigest()[:12]
+
+
+def _renderer() -> "markdown.Markdown":
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        import markdown
+
+        renderer = _local.renderer = markdown.Markdown(extensions=list(MARKDOWN_EXTENSIONS))
+    return renderer
+
+
+def render_key(notes: str) -> str:
+    digest = hashlib.sha1(notes.encode("utf-8")).hexdigest()
+    return f"{renderer_version()}:{digest}"
+
+
+@lru_cache(maxsize=512)
+@instrument("markdown")
+def render_notes(notes: str) -> str:
+    return _renderer().reset().convert(notes)
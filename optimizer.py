@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import random
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from schedulers import FSRS_BOUNDS, FSRS_DECAY, FSRS_FACTOR, FSRSScheduler, iter_problem_events
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAX_STEPS = 64
+MIN_PRETRAIN_SAMPLES = 16
+BATCH_SIZE = 4096
+DEFAULT_MAX_SECONDS = 10.0
+MAX_ITERATIONS = 2000
+LEARNING_RATE = 0.02
+PERTURBATION = 0.05
+EPSILON = 1e-6
+
+
+class History:
+    def __init__(self, ratings: Any, elapsed: Any, lengths: Any, events: int) -> None:
+        self.ratings = ratings
+        self.elapsed = elapsed
+        self.lengths = lengths
+        self.events = events
+
+    @property
+    def sequences(self) -> int:
+        return int(self.lengths.shape[0])
+
+    @property
+    def reviews(self) -> int:
+        return int((self.lengths - 1).sum()) if self.sequences else 0
+
+    def subset(self, rows: Any) -> "History":
+        lengths = self.lengths[rows]
+        steps = int(lengths.max()) if len(lengths) else 0
+        return History(self.ratings[rows, :steps], self.elapsed[rows, :steps], lengths, self.events)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("The scheduler optimizer needs numpy; install it with `pip install numpy`.")
+
+
+def load_history(cur: sqlite3.Cursor, max_steps: int = MAX_STEPS) -> History:
+    _require_numpy()
+    sequences: List[Tuple[List[int], List[int]]] = []
+    events = 0
+    for _, problem_events in iter_problem_events(cur):
+        events += len(problem_events)
+        ratings: List[int] = []
+        elapsed: List[int] = []
+        last_day: Optional[int] = None
+        for day, rating in problem_events:
+            if day == last_day:
+                continue
+            elapsed.append(0 if last_day is None else day - last_day)
+            ratings.append(rating)
+            last_day = day
+            if len(ratings) >= max_steps:
+                break
+        if len(ratings) >= 2:
+            sequences.append((ratings, elapsed))
+    steps = max((len(ratings) for ratings, _ in sequences), default=0)
+    rating_matrix = np.full((len(sequences), steps), 3, dtype=np.int8)
+    elapsed_matrix = np.zeros((len(sequences), steps), dtype=np.float64)
+    lengths = np.zeros(len(sequences), dtype=np.int64)
+    for row, (ratings, elapsed) in enumerate(sequences):
+        rating_matrix[row, : len(ratings)] = ratings
+        elapsed_matrix[row, : len(elapsed)] = elapsed
+        lengths[row] = len(ratings)
+    return History(rating_matrix, elapsed_matrix, lengths, events)
+
+
+def _log_loss(recall: Any, recalled: Any) -> Any:
+    recall = np.clip(recall, EPSILON, 1 - EPSILON)
+    return -(recalled * np.log(recall) + (1 - recalled) * np.log(1 - recall))
+
+
+def fsrs_loss(history: History, w: Sequence[float]) -> float:
+    if not history.reviews:
+        return 0.0
+    w = np.asarray(w, dtype=np.float64)
+    ratings = history.ratings
+    first = ratings[:, 0].astype(np.int64)
+    stability = w[first - 1]
+    initial_good = min(10.0, max(1.0, w[4]))
+    difficulty = np.clip(w[4] - (first - 3) * w[5], 1.0, 10.0)
+    total = 0.0
+    for step in range(1, ratings.shape[1]):
+        active = history.lengths > step
+        if not active.any():
+            break
+        rating = ratings[:, step]
+        elapsed = history.elapsed[:, step]
+        recall = (1 + FSRS_FACTOR * elapsed / stability) ** FSRS_DECAY
+        total += float(_log_loss(recall, rating > 1)[active].sum())
+        success = stability * (
+            1
+            + math.exp(w[8])
+            * (11 - difficulty)
+            * stability ** -w[9]
+            * (np.exp((1 - recall) * w[10]) - 1)
+            * np.where(rating == 2, w[15], np.where(rating == 4, w[16], 1.0))
+        )
+        failure = np.minimum(
+            w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * np.exp((1 - recall) * w[14]),
+            stability,
+        )
+        next_stability = np.maximum(0.01, np.where(rating == 1, failure, success))
+        next_difficulty = np.clip(w[7] * initial_good + (1 - w[7]) * (difficulty - w[6] * (rating - 3)), 1.0, 10.0)
+        stability = np.where(active, next_stability, stability)
+        difficulty = np.where(active, next_difficulty, difficulty)
+    return total / history.reviews
+
+
+def pretrain_initial_stability(history: History, w: Sequence[float]) -> List[float]:
+    w = list(w)
+    if not history.sequences:
+        return w
+    first = history.ratings[:, 0]
+    elapsed = history.elapsed[:, 1]
+    recalled = (history.ratings[:, 1] > 1).astype(np.float64)
+    grid = np.geomspace(FSRS_BOUNDS[0][0], FSRS_BOUNDS[0][1], 400)
+    for rating in range(1, 5):
+        selected = first == rating
+        if int(selected.sum()) < MIN_PRETRAIN_SAMPLES:
+            continue
+        days, inverse = np.unique(elapsed[selected], return_inverse=True)
+        successes = np.bincount(inverse, weights=recalled[selected], minlength=len(days))
+        counts = np.bincount(inverse, minlength=len(days)).astype(np.float64)
+        recall = np.clip((1 + FSRS_FACTOR * days[None, :] / grid[:, None]) ** FSRS_DECAY, EPSILON, 1 - EPSILON)
+        loss = -(successes * np.log(recall) + (counts - successes) * np.log(1 - recall)).sum(axis=1)
+        w[rating - 1] = float(grid[int(np.argmin(loss))])
+    w[:4] = [float(value) for value in np.maximum.accumulate(np.asarray(w[:4]))]
+    return w
+
+
+def _to_unit(w: Any, lower: Any, upper: Any) -> Any:
+    return (w - lower) / (upper - lower)
+
+
+def _from_unit(x: Any, lower: Any, upper: Any) -> Any:
+    return lower + np.clip(x, 0.0, 1.0) * (upper - lower)
+
+
+def fit_fsrs(
+    history: History,
+    initial: Optional[Sequence[float]] = None,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    _require_numpy()
+    started = time.perf_counter()
+    current = list(initial or FSRSScheduler.default_params)
+    baseline = fsrs_loss(history, current)
+    result: Dict[str, Any] = {
+        "events": history.events,
+        "sequences": history.sequences,
+        "reviews": history.reviews,
+        "loss_before": baseline,
+        "loss_after": baseline,
+        "params": current,
+        "iterations": 0,
+        "improved": False,
+    }
+    if not history.reviews:
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    rng = np.random.default_rng(seed)
+    lower = np.array([bound[0] for bound in FSRS_BOUNDS])
+    upper = np.array([bound[1] for bound in FSRS_BOUNDS])
+    w = np.clip(np.asarray(pretrain_initial_stability(history, current), dtype=np.float64), lower, upper)
+    trainable = np.arange(4, len(w))
+    x = _to_unit(w, lower, upper)
+    first_moment = np.zeros(len(trainable))
+    second_moment = np.zeros(len(trainable))
+    batch_size = min(BATCH_SIZE, history.sequences)
+    deadline = started + max_seconds
+    iteration = 0
+    while iteration < MAX_ITERATIONS and time.perf_counter() < deadline:
+        iteration += 1
+        batch = history.subset(rng.choice(history.sequences, batch_size, replace=False))
+        delta = rng.choice((-1.0, 1.0), len(trainable))
+        step = PERTURBATION / iteration ** 0.101
+        plus, minus = x.copy(), x.copy()
+        plus[trainable] += step * delta
+        minus[trainable] -= step * delta
+        plus_loss = fsrs_loss(batch, _from_unit(plus, lower, upper))
+        minus_loss = fsrs_loss(batch, _from_unit(minus, lower, upper))
+        gradient = (plus_loss - minus_loss) / (2 * step) * delta
+        first_moment = 0.9 * first_moment + 0.1 * gradient
+        second_moment = 0.999 * second_moment + 0.001 * gradient ** 2
+        corrected_first = first_moment / (1 - 0.9 ** iteration)
+        corrected_second = second_moment / (1 - 0.999 ** iteration)
+        x[trainable] = np.clip(
+            x[trainable] - LEARNING_RATE * corrected_first / (np.sqrt(corrected_second) + 1e-8), 0.0, 1.0
+        )
+
+    fitted = [float(value) for value in _from_unit(x, lower, upper)]
+    loss = fsrs_loss(history, fitted)
+    result["iterations"] = iteration
+    if loss < baseline:
+        result.update({"loss_after": loss, "params": fitted, "improved": True})
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def optimize(
+    cur: sqlite3.Cursor,
+    initial: Optional[Sequence[float]] = None,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    history = load_history(cur)
+    loaded = time.perf_counter() - started
+    seed = random.randrange(2**32) if seed is None else seed
+    result = fit_fsrs(history, initial, max(0.0, max_seconds - loaded), seed)
+    result["load_seconds"] = round(loaded, 3)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 64
+MAX_STACKS = 5000
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter[str] = Counter()
+        self._self: Counter[str] = Counter()
+        self._total: Counter[str] = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        with self._lock:
+            if self.running:
+                return
+            if interval:
+                self.interval = max(0.001, float(interval))
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="lc-tracker-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+        self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self._self.clear()
+            self._total.clear()
+            self.samples = 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    labels: List[str] = []
+                    while frame is not None and len(labels) < MAX_DEPTH:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    if not labels:
+                        continue
+                    self.samples += 1
+                    self._self[labels[0]] += 1
+                    for label in set(labels):
+                        self._total[label] += 1
+                    stack = ";".join(reversed(labels))
+                    if stack in self._stacks or len(self._stacks) < MAX_STACKS:
+                        self._stacks[stack] += 1
+
+    def report(self, limit: int = 25) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000,
+                "samples": self.samples,
+                "self": [{"frame": label, "samples": count} for label, count in self._self.most_common(limit)],
+                "cumulative": [{"frame": label, "samples": count} for label, count in self._total.most_common(limit)],
+                "stacks": [{"stack": stack, "samples": count} for stack, count in self._stacks.most_common(limit)],
+            }
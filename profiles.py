@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, List, Tuple, TypeVar
+
+ROOT_PROFILE = "default"
+PROFILES_DIRNAME = "profiles"
+DB_FILENAME = "lc_tracker.db"
+BACKUP_DIRNAME = "backups"
+PROFILE_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+DEFAULT_MAX_OPEN = 8
+
+H = TypeVar("H")
+
+
+class UnknownProfileError(LookupError):
+    pass
+
+
+def normalize_profile_name(name: str) -> str:
+    normalized = (name or "").strip().lower()
+    if not PROFILE_NAME.fullmatch(normalized):
+        raise ValueError(f"Invalid profile name: {name!r}")
+    return normalized
+
+
+def profile_root(data_dir: Path, name: str) -> Path:
+    return data_dir if name == ROOT_PROFILE else data_dir / PROFILES_DIRNAME / name
+
+
+def profile_paths(data_dir: Path, name: str) -> Tuple[Path, Path]:
+    root = profile_root(data_dir, name)
+    return root / DB_FILENAME, root / BACKUP_DIRNAME
+
+
+def profile_exists(data_dir: Path, name: str) -> bool:
+    return name == ROOT_PROFILE or profile_root(data_dir, name).is_dir()
+
+
+def list_profiles(data_dir: Path) -> List[str]:
+    base = data_dir / PROFILES_DIRNAME
+    names = sorted(p.name for p in base.iterdir() if p.is_dir() and PROFILE_NAME.fullmatch(p.name)) if base.is_dir() else []
+    return [ROOT_PROFILE] + [name for name in names if name != ROOT_PROFILE]
+
+
+class ProfileRegistry(Generic[H]):
+    def __init__(
+        self,
+        open_handle: Callable[[str], H],
+        close_handle: Callable[[H], None],
+        max_open: int = DEFAULT_MAX_OPEN,
+        pinned: Iterable[str] = (),
+    ) -> None:
+        self.open_handle = open_handle
+        self.close_handle = close_handle
+        self.max_open = max(1, int(max_open))
+        self.pinned = frozenset(pinned)
+        self._handles: OrderedDict[str, H] = OrderedDict()
+        self._users: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closer = self._new_closer()
+        self.opened = 0
+        self.evicted = 0
+
+    def get(self, name: str, hold: bool = False) -> H:
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is None:
+                handle = self._handles[name] = self.open_handle(name)
+                self.opened += 1
+            self._handles.move_to_end(name)
+            if hold:
+                self._users[name] = self._users.get(name, 0) + 1
+            evicted = self._evict()
+        self._close_later(evicted)
+        return handle
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            users = self._users.get(name, 0) - 1
+            if users > 0:
+                self._users[name] = users
+            else:
+                self._users.pop(name, None)
+            evicted = self._evict()
+        self._close_later(evicted)
+
+    def _new_closer(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="lc-tracker-profile-close")
+
+    def _close_later(self, handles: List[H]) -> None:
+        for handle in handles:
+            self._closer.submit(self.close_handle, handle)
+
+    def _evict(self) -> List[H]:
+        evicted = []
+        for name in list(self._handles):
+            if len(self._handles) <= self.max_open:
+                break
+            if name in self.pinned or self._users.get(name):
+                continue
+            evicted.append(self._handles.pop(name))
+            self.evicted += 1
+        return evicted
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._handles)
+
+    def handles(self) -> List[H]:
+        with self._lock:
+            return list(self._handles.values())
+
+    def close_open(self) -> None:
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+            self._users.clear()
+            closer, self._closer = self._closer, self._new_closer()
+        closer.shutdown(wait=True)
+        for handle in handles:
+            self.close_handle(handle)
+
+    def close_all(self) -> None:
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+            self._users.clear()
+        self._closer.shutdown(wait=True)
+        for handle in handles:
+            self.close_handle(handle)
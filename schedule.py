@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from schedulers import GOOD, MemoryState, Scheduler, StatefulScheduler, day_number, replay_states
+
+IMPORTANCE_INTERVALS = {
+    "Low": [4, 8, 15, 30, 60, 120, 180],
+    "Medium": [2, 4, 7, 15, 30, 60, 90],
+    "High": [1, 2, 4, 7, 15, 30, 60],
+}
+IMPORTANCE_ALIASES = {"high": "High", "critical": "High", "crit": "High", "low": "Low"}
+DUE_SOON_DAYS = 7
+FORECAST_DAYS = 30
+MAX_FORECAST_DAYS = 180
+REFRESH_BATCH = 500
+
+
+def _interval_sql(intervals: List[int]) -> str:
+    stage = f"MAX(0, MIN(COALESCE(review_count, 0), {len(intervals) - 1}))"
+    branches = " ".join(f"WHEN {index} THEN {days}" for index, days in enumerate(intervals))
+    return f"CASE {stage} {branches} END"
+
+
+def _importance_sql() -> str:
+    exact = " ".join(
+        f"WHEN '{level}' THEN {_interval_sql(intervals)}" for level, intervals in IMPORTANCE_INTERVALS.items()
+    )
+    aliases = " ".join(
+        f"WHEN '{alias}' THEN {_interval_sql(IMPORTANCE_INTERVALS[level])}"
+        for alias, level in IMPORTANCE_ALIASES.items()
+    )
+    fallback = _interval_sql(IMPORTANCE_INTERVALS["Medium"])
+    return (
+        f"CASE frequency {exact} ELSE "
+        f"CASE lower(trim(COALESCE(frequency, ''))) {aliases} ELSE {fallback} END END"
+    )
+
+
+_BASE_SQL = "COALESCE(NULLIF(last_review_at, ''), NULLIF(last_attempt_at, ''), NULLIF(created_at, ''))"
+_DUE_SQL = f"date({_BASE_SQL}, '+' || ({_importance_sql()}) || ' days')"
+_STATE_DUE_SQL = (
+    "(SELECT date(s.last_review_at, '+' || s.interval_days || ' days') "
+    "FROM scheduler_state s WHERE s.problem_id = problems.id)"
+)
+NEXT_DUE_SQL = f"MAX(COALESCE(date(snooze_until), ''), {_DUE_SQL})"
+STATEFUL_NEXT_DUE_SQL = f"MAX(COALESCE(date(snooze_until), ''), COALESCE({_STATE_DUE_SQL}, {_DUE_SQL}))"
+RULE_VERSION = hashlib.sha1(NEXT_DUE_SQL.encode()).hexdigest()[:12]
+
+
+def next_due_sql(scheduler: Optional[Scheduler] = None) -> str:
+    return STATEFUL_NEXT_DUE_SQL if scheduler is not None and scheduler.stateful else NEXT_DUE_SQL
+
+
+def rule_version(scheduler: Optional[Scheduler] = None) -> str:
+    if scheduler is None or not scheduler.stateful:
+        return RULE_VERSION
+    return hashlib.sha1(f"{STATEFUL_NEXT_DUE_SQL}:{scheduler.signature}".encode()).hexdigest()[:12]
+
+
+def create_schedule_state(
+    cur: sqlite3.Cursor,
+    scheduler: Scheduler,
+    normalize: Callable[[Optional[str]], str],
+) -> bool:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schedule_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rule_version TEXT NOT NULL
+        )
+        """
+    )
+    if schedule_is_current(cur, scheduler):
+        return False
+    if scheduler.stateful:
+        replay_states(cur, scheduler, normalize)
+    refresh_next_due(cur, scheduler=scheduler)
+    cur.execute(
+        """
+        INSERT INTO schedule_state (id, rule_version) VALUES (1, ?)
+        ON CONFLICT (id) DO UPDATE SET rule_version = excluded.rule_version
+        """,
+        (rule_version(scheduler),),
+    )
+    return True
+
+
+def schedule_is_current(cur: sqlite3.Cursor, scheduler: Scheduler) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schedule_state'")
+    if cur.fetchone() is None:
+        return False
+    cur.execute("SELECT rule_version FROM schedule_state WHERE id = 1")
+    row = cur.fetchone()
+    return row is not None and row[0] == rule_version(scheduler)
+
+
+def refresh_next_due(
+    cur: sqlite3.Cursor,
+    problem_ids: Optional[Iterable[int]] = None,
+    scheduler: Optional[Scheduler] = None,
+) -> int:
+    expression = next_due_sql(scheduler)
+    if problem_ids is None:
+        cur.execute(f"UPDATE problems SET next_due_at = {expression} WHERE next_due_at IS NOT {expression}")
+        return cur.rowcount
+    ids = sorted({int(problem_id) for problem_id in problem_ids})
+    updated = 0
+    for start in range(0, len(ids), REFRESH_BATCH):
+        cur.execute(
+            f"UPDATE problems SET next_due_at = {expression} WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids[start : start + REFRESH_BATCH]),),
+        )
+        updated += cur.rowcount
+    return updated
+
+
+def due_summary(cur: sqlite3.Cursor, today: date, soon_days: int = DUE_SOON_DAYS) -> Dict[str, Any]:
+    today_str = today.isoformat()
+    soon_str = (today + timedelta(days=soon_days)).isoformat()
+    cur.execute(
+        """
+        SELECT next_due_at, COUNT(*)
+        FROM problems
+        WHERE next_due_at IS NOT NULL
+        GROUP BY next_due_at
+        ORDER BY next_due_at
+        """
+    )
+    histogram = [{"date": day, "count": int(count)} for day, count in cur.fetchall()]
+    overdue = sum(entry["count"] for entry in histogram if entry["date"] < today_str)
+    due_today = sum(entry["count"] for entry in histogram if entry["date"] == today_str)
+    cur.execute(
+        "SELECT COUNT(*) FROM problems WHERE next_due_at > ? AND next_due_at <= ? AND snooze_until > ?",
+        (today_str, soon_str, today_str),
+    )
+    snoozed_soon = int(cur.fetchone()[0])
+    due_soon = sum(entry["count"] for entry in histogram if today_str < entry["date"] <= soon_str) - snoozed_soon
+    return {
+        "today": today_str,
+        "now": overdue + due_today,
+        "overdue": overdue,
+        "soon": due_soon,
+        "soon_days": soon_days,
+        "histogram": histogram,
+    }
+
+
+def _trajectory(intervals: List[int], stage: int, first_offset: int, days: int) -> List[int]:
+    offsets = []
+    offset = first_offset
+    last_stage = len(intervals) - 1
+    while offset < days:
+        offsets.append(offset)
+        stage = min(stage + 1, last_stage)
+        offset += intervals[stage]
+    return offsets
+
+
+def _state_trajectory(
+    scheduler: StatefulScheduler,
+    state: MemoryState,
+    last_day: int,
+    importance: str,
+    first_offset: int,
+    today_number: int,
+    days: int,
+) -> List[int]:
+    offsets = []
+    offset = first_offset
+    while offset < days:
+        offsets.append(offset)
+        day = today_number + offset
+        state = scheduler.review(state, GOOD, max(0, day - last_day), importance)
+        last_day = day
+        offset += max(1, state.interval)
+    return offsets
+
+
+def _stateful_trajectories(
+    cur: sqlite3.Cursor,
+    scheduler: StatefulScheduler,
+    today: date,
+    days: int,
+    normalize: Callable[[Optional[str]], str],
+    params: Dict[str, str],
+) -> Dict[int, Tuple[str, List[int]]]:
+    today_number = day_number(today)
+    trajectories: Dict[int, Tuple[str, List[int]]] = {}
+    cur.execute(
+        """
+        SELECT p.id, p.frequency, MAX(p.next_due_at, :today) AS due,
+               s.stability, s.difficulty, s.reps, s.lapses, s.interval_days,
+               CAST(julianday(s.last_review_at) AS INTEGER)
+        FROM problems p
+        LEFT JOIN scheduler_state s ON s.problem_id = p.id
+        WHERE p.next_due_at <= :end
+        """,
+        params,
+    )
+    for problem_id, frequency, due, stability, difficulty, reps, lapses, interval, last_day in cur.fetchall():
+        importance = normalize(frequency)
+        first_offset = (date.fromisoformat(due) - today).days
+        if stability is None:
+            state = scheduler.initial(GOOD, importance)
+            first_day = today_number + first_offset
+            next_offset = first_offset + state.interval
+            offsets = [first_offset] + _state_trajectory(
+                scheduler, state, first_day, importance, next_offset, today_number, days
+            )
+        else:
+            state = MemoryState(stability, difficulty, reps, lapses, interval)
+            offsets = _state_trajectory(scheduler, state, last_day, importance, first_offset, today_number, days)
+        trajectories[int(problem_id)] = (importance, offsets)
+    return trajectories
+
+
+def _stateful_forecast(
+    cur: sqlite3.Cursor,
+    scheduler: StatefulScheduler,
+    today: date,
+    days: int,
+    normalize: Callable[[Optional[str]], str],
+    params: Dict[str, str],
+    tag_names: Dict[int, str],
+) -> Tuple[List[int], Dict[str, List[int]], Dict[str, List[int]]]:
+    total = [0] * days
+    by_importance = {level: [0] * days for level in IMPORTANCE_INTERVALS}
+    by_tag: Dict[str, List[int]] = {}
+    trajectories = _stateful_trajectories(cur, scheduler, today, days, normalize, params)
+    for importance, offsets in trajectories.values():
+        series = by_importance[importance]
+        for offset in offsets:
+            total[offset] += 1
+            series[offset] += 1
+    cur.execute(
+        """
+        SELECT pt.problem_id, pt.tag_id
+        FROM problem_tags pt
+        JOIN problems p ON p.id = pt.problem_id
+        WHERE p.next_due_at <= :end
+        """,
+        params,
+    )
+    for problem_id, tag_id in cur.fetchall():
+        offsets = trajectories[int(problem_id)][1]
+        if not offsets:
+            continue
+        series = by_tag.setdefault(tag_names[tag_id], [0] * days)
+        for offset in offsets:
+            series[offset] += 1
+    return total, by_importance, by_tag
+
+
+def review_forecast(
+    cur: sqlite3.Cursor,
+    today: date,
+    days: int,
+    normalize: Callable[[Optional[str]], str],
+    scheduler: Optional[Scheduler] = None,
+) -> Dict[str, Any]:
+    params = {"today": today.isoformat(), "end": (today + timedelta(days=days - 1)).isoformat()}
+    cur.execute("SELECT id, name FROM tags")
+    tag_names = dict(cur.fetchall())
+    if scheduler is not None and scheduler.stateful:
+        total, by_importance, by_tag = _stateful_forecast(cur, scheduler, today, days, normalize, params, tag_names)
+        return _forecast_payload(today, days, total, by_importance, by_tag)
+    trajectories: Dict[Tuple[str, int, str], List[int]] = {}
+
+    def simulate(frequency: Optional[str], review_count: Optional[int], due: str) -> Tuple[str, List[int]]:
+        key = (frequency or "", int(review_count or 0), due)
+        if key not in trajectories:
+            importance = normalize(frequency)
+            intervals = IMPORTANCE_INTERVALS[importance]
+            stage = max(0, min(key[1], len(intervals) - 1))
+            first_offset = (date.fromisoformat(due) - today).days
+            trajectories[key] = [importance] + _trajectory(intervals, stage, first_offset, days)
+        entry = trajectories[key]
+        return entry[0], entry[1:]
+
+    total = [0] * days
+    by_importance = {level: [0] * days for level in IMPORTANCE_INTERVALS}
+    cur.execute(
+        """
+        SELECT frequency, review_count, :today, COUNT(*)
+        FROM problems
+        WHERE next_due_at <= :today
+        GROUP BY frequency, review_count
+        UNION ALL
+        SELECT frequency, review_count, next_due_at, COUNT(*)
+        FROM problems
+        WHERE next_due_at > :today AND next_due_at <= :end
+        GROUP BY frequency, review_count, next_due_at
+        """,
+        params,
+    )
+    for frequency, review_count, due, count in cur.fetchall():
+        importance, offsets = simulate(frequency, review_count, due)
+        series = by_importance[importance]
+        for offset in offsets:
+            total[offset] += count
+            series[offset] += count
+
+    by_tag: Dict[str, List[int]] = {}
+    cur.execute(
+        """
+        SELECT pt.tag_id, p.frequency, p.review_count, MAX(p.next_due_at, :today) AS due, COUNT(*)
+        FROM problem_tags pt
+        JOIN problems p ON p.id = pt.problem_id
+        WHERE p.next_due_at <= :end
+        GROUP BY pt.tag_id, p.frequency, p.review_count, due
+        """,
+        params,
+    )
+    for tag_id, frequency, review_count, due, count in cur.fetchall():
+        series = by_tag.setdefault(tag_names[tag_id], [0] * days)
+        for offset in simulate(frequency, review_count, due)[1]:
+            series[offset] += count
+    return _forecast_payload(today, days, total, by_importance, by_tag)
+
+
+def _forecast_payload(
+    today: date,
+    days: int,
+    total: List[int],
+    by_importance: Dict[str, List[int]],
+    by_tag: Dict[str, List[int]],
+) -> Dict[str, Any]:
+    return {
+        "start": today.isoformat(),
+        "days": days,
+        "grade": "good",
+        "dates": [(today + timedelta(days=offset)).isoformat() for offset in range(days)],
+        "total": total,
+        "by_importance": by_importance,
+        "by_tag": dict(sorted(by_tag.items(), key=lambda item: (-sum(item[1]), item[0].lower()))),
+    }
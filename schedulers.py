@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+GRADE_RATINGS = {"again": 1, "hard": 2, "good": 3, "easy": 4}
+GOOD = GRADE_RATINGS["good"]
+EVENT_FETCH_SIZE = 2000
+JULIAN_DAY_OFFSET = 1721424
+MAX_INTERVAL_DAYS = 3650
+
+RATING_SQL = "CASE lower(grade) WHEN 'again' THEN 1 WHEN 'hard' THEN 2 WHEN 'easy' THEN 4 ELSE 3 END"
+
+Normalizer = Callable[[Optional[str]], str]
+Event = Tuple[int, int]
+
+
+class MemoryState(NamedTuple):
+    stability: float
+    difficulty: float
+    reps: int
+    lapses: int
+    interval: int
+
+
+class Scheduler:
+    name = ""
+    stateful = False
+    default_params: Tuple[float, ...] = ()
+
+    def __init__(self, params: Optional[Sequence[float]] = None) -> None:
+        self.params = tuple(float(value) for value in params) if params else self.default_params
+
+    @property
+    def signature(self) -> str:
+        return hashlib.sha1(json.dumps([self.name, list(self.params)]).encode()).hexdigest()[:12]
+
+
+class IntervalScheduler(Scheduler):
+    name = "intervals"
+
+
+class StatefulScheduler(Scheduler, ABC):
+    stateful = True
+
+    @abstractmethod
+    def initial(self, rating: int, importance: str) -> MemoryState:
+        ...
+
+    @abstractmethod
+    def review(self, state: MemoryState, rating: int, elapsed_days: int, importance: str) -> MemoryState:
+        ...
+
+    def replay(self, events: Iterable[Event], importance: str) -> Optional[Tuple[MemoryState, int]]:
+        state: Optional[MemoryState] = None
+        last_day = 0
+        for day, rating in events:
+            if state is None:
+                state = self.initial(rating, importance)
+            else:
+                state = self.review(state, rating, max(0, day - last_day), importance)
+            last_day = day
+        return None if state is None else (state, last_day)
+
+
+class SM2Scheduler(StatefulScheduler):
+    name = "sm2"
+    default_params = (2.5, 1.0, 6.0, 1.3)
+    QUALITY = {1: 1, 2: 3, 3: 4, 4: 5}
+    IMPORTANCE_MODIFIERS = {"High": 0.5, "Medium": 1.0, "Low": 2.0}
+
+    def _state(self, interval: float, ease: float, reps: int, lapses: int, importance: str) -> MemoryState:
+        interval = min(float(MAX_INTERVAL_DAYS), interval)
+        scaled = max(1, min(MAX_INTERVAL_DAYS, int(round(interval * self.IMPORTANCE_MODIFIERS.get(importance, 1.0)))))
+        return MemoryState(interval, ease, reps, lapses, scaled)
+
+    def initial(self, rating: int, importance: str) -> MemoryState:
+        initial_ease, first_interval, _, _ = self.params
+        return self._state(first_interval, initial_ease, 1 if rating > 1 else 0, 0 if rating > 1 else 1, importance)
+
+    def review(self, state: MemoryState, rating: int, elapsed_days: int, importance: str) -> MemoryState:
+        _, first_interval, second_interval, min_ease = self.params
+        quality = self.QUALITY[rating]
+        ease = max(min_ease, state.difficulty + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        if quality < 3:
+            return self._state(first_interval, ease, 0, state.lapses + 1, importance)
+        reps = state.reps + 1
+        if reps == 1:
+            interval = first_interval
+        elif reps == 2:
+            interval = second_interval
+        else:
+            interval = state.stability * ease
+        return self._state(interval, ease, reps, state.lapses, importance)
+
+
+FSRS_DECAY = -0.5
+FSRS_FACTOR = 0.9 ** (1 / FSRS_DECAY) - 1
+FSRS_BOUNDS = (
+    (0.1, 100.0), (0.1, 100.0), (0.1, 100.0), (0.1, 100.0),
+    (1.0, 10.0), (0.1, 5.0), (0.1, 5.0), (0.0, 0.8),
+    (0.0, 6.0), (0.0, 0.8), (0.01, 5.0), (0.1, 5.0),
+    (0.01, 0.5), (0.01, 0.9), (0.01, 4.0), (0.0, 1.0), (1.0, 6.0),
+)
+
+
+class FSRSScheduler(StatefulScheduler):
+    name = "fsrs"
+    default_params = (
+        0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+        0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+    )
+    RETENTION = {"High": 0.95, "Medium": 0.9, "Low": 0.85}
+
+    def _initial_difficulty(self, rating: int) -> float:
+        w = self.params
+        return min(10.0, max(1.0, w[4] - (rating - 3) * w[5]))
+
+    def _interval(self, stability: float, importance: str) -> int:
+        retention = self.RETENTION.get(importance, 0.9)
+        days = stability / FSRS_FACTOR * (retention ** (1 / FSRS_DECAY) - 1)
+        return max(1, min(MAX_INTERVAL_DAYS, int(round(days))))
+
+    def initial(self, rating: int, importance: str) -> MemoryState:
+        stability = self.params[rating - 1]
+        return MemoryState(
+            stability,
+            self._initial_difficulty(rating),
+            1,
+            1 if rating == 1 else 0,
+            self._interval(stability, importance),
+        )
+
+    def review(self, state: MemoryState, rating: int, elapsed_days: int, importance: str) -> MemoryState:
+        w = self.params
+        stability, difficulty = state.stability, state.difficulty
+        retrievability = (1 + FSRS_FACTOR * elapsed_days / stability) ** FSRS_DECAY
+        next_difficulty = difficulty - w[6] * (rating - 3)
+        next_difficulty = w[7] * self._initial_difficulty(3) + (1 - w[7]) * next_difficulty
+        next_difficulty = min(10.0, max(1.0, next_difficulty))
+        lapses = state.lapses
+        if rating == 1:
+            next_stability = (
+                w[11]
+                * difficulty ** -w[12]
+                * ((stability + 1) ** w[13] - 1)
+                * math.exp((1 - retrievability) * w[14])
+            )
+            next_stability = min(next_stability, stability)
+            lapses += 1
+        else:
+            modifier = w[15] if rating == 2 else w[16] if rating == 4 else 1.0
+            next_stability = stability * (
+                1
+                + math.exp(w[8])
+                * (11 - difficulty)
+                * stability ** -w[9]
+                * (math.exp((1 - retrievability) * w[10]) - 1)
+                * modifier
+            )
+        next_stability = max(0.01, next_stability)
+        return MemoryState(
+            next_stability,
+            next_difficulty,
+            state.reps + 1,
+            lapses,
+            self._interval(next_stability, importance),
+        )
+
+
+def day_number(day: date) -> int:
+    return day.toordinal() + JULIAN_DAY_OFFSET
+
+
+def day_to_iso(day_number: int) -> str:
+    return date.fromordinal(day_number - JULIAN_DAY_OFFSET).isoformat()
+
+
+SCHEDULERS = {cls.name: cls for cls in (IntervalScheduler, SM2Scheduler, FSRSScheduler)}
+
+
+def create_scheduler_tables(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_state (
+            problem_id INTEGER PRIMARY KEY,
+            stability REAL NOT NULL,
+            difficulty REAL NOT NULL,
+            reps INTEGER NOT NULL,
+            lapses INTEGER NOT NULL,
+            interval_days INTEGER NOT NULL,
+            last_review_at TEXT NOT NULL,
+            FOREIGN KEY (problem_id) REFERENCES problems (id) ON DELETE CASCADE
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_params (
+            name TEXT PRIMARY KEY,
+            params TEXT NOT NULL,
+            fitted_at TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            loss REAL
+        )
+        """
+    )
+
+
+def create_scheduler(name: str, cur: Optional[sqlite3.Cursor] = None) -> Scheduler:
+    cls = SCHEDULERS.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown scheduler: {name} (choose from {', '.join(SCHEDULERS)})")
+    params = None
+    if cur is not None and cls.default_params:
+        cur.execute("SELECT params FROM scheduler_params WHERE name = ?", (name,))
+        row = cur.fetchone()
+        if row is not None:
+            params = json.loads(row[0])
+            if len(params) != len(cls.default_params):
+                params = None
+    return cls(params)
+
+
+def save_params(cur: sqlite3.Cursor, name: str, params: Sequence[float], events: int, loss: Optional[float]) -> None:
+    cur.execute(
+        """
+        INSERT INTO scheduler_params (name, params, fitted_at, events, loss)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            params = excluded.params,
+            fitted_at = excluded.fitted_at,
+            events = excluded.events,
+            loss = excluded.loss
+        """,
+        (name, json.dumps([round(value, 6) for value in params]), date.today().isoformat(), events, loss),
+    )
+
+
+def iter_problem_events(
+    cur: sqlite3.Cursor,
+    problem_ids: Optional[Sequence[int]] = None,
+    fetch_size: int = EVENT_FETCH_SIZE,
+) -> Iterator[Tuple[int, List[Event]]]:
+    attempt_filter = review_filter = ""
+    if problem_ids is not None:
+        id_list = ", ".join(str(int(problem_id)) for problem_id in problem_ids)
+        attempt_filter = f"WHERE problem_id IN ({id_list})"
+        review_filter = f"WHERE problem_id IN ({id_list})"
+    cur.execute(
+        f"""
+        SELECT problem_id, CAST(julianday(day) AS INTEGER) AS day_number, rating
+        FROM (
+            SELECT problem_id, attempt_at AS day, 0 AS kind, id, {GOOD} AS rating FROM attempts {attempt_filter}
+            UNION ALL
+            SELECT problem_id, reviewed_at, 1, id, {RATING_SQL} FROM review_logs {review_filter}
+        )
+        WHERE day_number IS NOT NULL
+        ORDER BY problem_id, day, kind, id
+        """
+    )
+    current: Optional[int] = None
+    events: List[Event] = []
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            break
+        for problem_id, day_number, rating in rows:
+            if problem_id != current:
+                if current is not None:
+                    yield current, events
+                current, events = problem_id, []
+            events.append((day_number, rating))
+    if current is not None:
+        yield current, events
+
+
+def replay_states(
+    cur: sqlite3.Cursor,
+    scheduler: StatefulScheduler,
+    normalize: Normalizer,
+    problem_ids: Optional[Iterable[int]] = None,
+) -> int:
+    ids = None if problem_ids is None else sorted({int(problem_id) for problem_id in problem_ids})
+    if ids is None:
+        cur.execute("DELETE FROM scheduler_state")
+        cur.execute("SELECT id, frequency FROM problems")
+    else:
+        if not ids:
+            return 0
+        id_list = ", ".join(str(problem_id) for problem_id in ids)
+        cur.execute(f"DELETE FROM scheduler_state WHERE problem_id IN ({id_list})")
+        cur.execute(f"SELECT id, frequency FROM problems WHERE id IN ({id_list})")
+    importance = {int(row[0]): normalize(row[1]) for row in cur.fetchall()}
+    rows = []
+    for problem_id, events in iter_problem_events(cur.connection.cursor(), ids):
+        if problem_id not in importance:
+            continue
+        replayed = scheduler.replay(events, importance[problem_id])
+        if replayed is None:
+            continue
+        state, last_day = replayed
+        rows.append(
+            (
+                problem_id,
+                state.stability,
+                state.difficulty,
+                state.reps,
+                state.lapses,
+                state.interval,
+                day_to_iso(last_day),
+            )
+        )
+    cur.executemany(
+        """
+        INSERT INTO scheduler_state
+            (problem_id, stability, difficulty, reps, lapses, interval_days, last_review_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    return len(rows)
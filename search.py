@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from typing import Iterable, List, Optional
+
+SEARCH_TABLE = "problem_search"
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+RANK_EXPRESSION = f"bm25({SEARCH_TABLE}, 10.0, 5.0, 3.0, 1.0)"
+SNIPPET_EXPRESSION = f"snippet({SEARCH_TABLE}, -1, char(2), char(3), '…', 16)"
+REFRESH_BATCH = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _insert_sql(ids: str) -> str:
+    return f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, lc_num, title, tags, notes)
+        SELECT
+            p.id,
+            p.lc_num,
+            p.title,
+            COALESCE((
+                SELECT GROUP_CONCAT(t.name, ' ')
+                FROM problem_tags pt
+                JOIN tags t ON pt.tag_id = t.id
+                WHERE pt.problem_id = p.id
+            ), ''),
+            COALESCE((
+                SELECT GROUP_CONCAT(a.notes, char(10))
+                FROM attempts a
+                WHERE a.problem_id = p.id
+            ), '')
+        FROM problems p
+        WHERE p.id IN ({ids})
+    """
+
+
+def _refresh_sql(ids: str) -> str:
+    return f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({ids}); {_insert_sql(ids)};"
+
+
+_TRIGGERS = {
+    "problems_search_insert": ("AFTER INSERT ON problems", _refresh_sql("new.id")),
+    "problems_search_update": ("AFTER UPDATE OF lc_num, title ON problems", _refresh_sql("new.id")),
+    "problems_search_delete": (
+        "AFTER DELETE ON problems",
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;",
+    ),
+    "attempts_search_insert": ("AFTER INSERT ON attempts", _refresh_sql("new.problem_id")),
+    "attempts_search_update": ("AFTER UPDATE OF notes, problem_id ON attempts", _refresh_sql("new.problem_id, old.problem_id")),
+    "attempts_search_delete": ("AFTER DELETE ON attempts", _refresh_sql("old.problem_id")),
+    "problem_tags_search_insert": ("AFTER INSERT ON problem_tags", _refresh_sql("new.problem_id")),
+    "problem_tags_search_delete": ("AFTER DELETE ON problem_tags", _refresh_sql("old.problem_id")),
+    "tags_search_update": (
+        "AFTER UPDATE OF name ON tags",
+        _refresh_sql("SELECT problem_id FROM problem_tags WHERE tag_id = new.id"),
+    ),
+}
+
+
+def _trigger_sql(name: str, event: str, body: str) -> str:
+    return (
+        f"CREATE TRIGGER {name} {event} "
+        f"WHEN (SELECT suspended FROM search_state WHERE id = 1) = 0 "
+        f"BEGIN {body} END"
+    )
+
+
+def create_search_index(cur: sqlite3.Cursor) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,))
+    created = cur.fetchone() is None
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            suspended INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute("INSERT OR IGNORE INTO search_state (id, suspended) VALUES (1, 0)")
+    cur.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            lc_num,
+            title,
+            tags,
+            notes,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """
+    )
+    cur.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    existing = {row[0]: row[1] for row in cur.fetchall()}
+    for name, (event, body) in _TRIGGERS.items():
+        sql = _trigger_sql(name, event, body)
+        if existing.get(name) == sql:
+            continue
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(sql)
+    if created:
+        rebuild_search_index(cur)
+    return created
+
+
+def rebuild_search_index(cur: sqlite3.Cursor) -> int:
+    cur.execute(f"DELETE FROM {SEARCH_TABLE}")
+    cur.execute(_insert_sql("SELECT id FROM problems"))
+    cur.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    cur.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+    return int(cur.fetchone()[0])
+
+
+def suspend_search_triggers(cur: sqlite3.Cursor) -> None:
+    cur.execute("UPDATE search_state SET suspended = 1 WHERE id = 1")
+
+
+def resume_search_triggers(cur: sqlite3.Cursor, problem_ids: Iterable[int]) -> None:
+    ids: List[int] = sorted({int(problem_id) for problem_id in problem_ids})
+    for start in range(0, len(ids), REFRESH_BATCH):
+        id_list = ", ".join(str(problem_id) for problem_id in ids[start : start + REFRESH_BATCH])
+        cur.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({id_list})")
+        cur.execute(_insert_sql(id_list))
+    cur.execute("UPDATE search_state SET suspended = 0 WHERE id = 1")
+
+
+def fts_query(text: str) -> Optional[str]:
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
@@ -11,6 +11,7 @@ const searchInput = document.getElementById('search-input');
 const searchTagsContainer = document.getElementById('search-tags');
 const searchButton = document.getElementById('search-button');
 const sortSelect = document.getElementById('sort-select');
+const tagMatchSelect = document.getElementById('tag-match-select');
 const libraryList = document.getElementById('library-list');
 const libraryDetail = document.getElementById('library-detail');
 const dashboardContainer = document.getElementById('dashboard');
@@ -23,24 +24,37 @@ const SORT_STORAGE_KEY = 'lc_tracker_sort';
 const PIN_STORAGE_KEY = 'lc_tracker_pins';
 const REVIEW_PROGRESS_KEY = 'lc_tracker_review_progress';
 const DAILY_REVIEW_LIMIT = 1;
-const REVIEW_INTERVALS = {
-  Low: [4, 8, 15, 30, 60, 120, 180],
-  Medium: [2, 4, 7, 15, 30, 60, 90],
-  High: [1, 2, 4, 7, 15, 30, 60],
+const LIBRARY_PAGE_SIZE = 100;
+const SORT_OPTIONS = ['last_attempt', 'created', 'importance', 'review_count', 'lc_num', 'review_due', 'relevance'];
+const SORT_FIELDS = {
+  last_attempt: ['last_attempt_at', 'created_at'],
+  created: ['created_at'],
+  importance: ['importance'],
+  review_count: ['review_count'],
+  lc_num: ['lc_num'],
+  review_due: ['last_attempt_at', 'last_review_at', 'review_count', 'snooze_until', 'importance'],
 };
+const MAX_LIBRARY_RELOAD = 5000;
+const CHANGE_POLL_MS = 5000;
+const CHANGE_STREAM_RETRY_MS = 60000;
 
 const state = {
   tags: [],
   problems: [],
+  nextCursor: null,
   activeProblemId: null,
   searchTags: [],
   sortBy: 'last_attempt',
+  tagMatch: 'any',
   pinnedIds: new Set(),
   reviewNotes: new Map(),
   reviewAllowExtra: false,
   reviewDay: null,
   dashboardRange: 'month',
   dashboardTrends: {},
+  changeSeq: null,
+  changeStream: null,
+  changePoll: null,
 };
 
 state.sortBy = loadSortPreference();
@@ -331,7 +345,7 @@ function typesetMath(container) {
 function loadSortPreference() {
   try {
     const stored = localStorage.getItem(SORT_STORAGE_KEY);
-    if (stored === 'importance' || stored === 'review_due' || stored === 'last_attempt') {
+    if (SORT_OPTIONS.includes(stored)) {
       return stored;
     }
     return 'last_attempt';
@@ -399,28 +413,6 @@ function getDaysSince(value) {
   return Math.floor(diff / 86400000);
 }
 
-function getImportanceRank(importance) {
-  if (importance === 'High') return 2;
-  if (importance === 'Medium') return 1;
-  if (importance === 'Low') return 0;
-  return 1;
-}
-
-function getDueScore(item) {
-  if (item.snooze_until) {
-    const snoozeDays = getDaysSince(item.snooze_until);
-    if (snoozeDays < 0) {
-      return -9999;
-    }
-  }
-  const intervals = REVIEW_INTERVALS[item.importance] || REVIEW_INTERVALS.Medium;
-  const stage = Math.min(item.review_count || 0, intervals.length - 1);
-  const requiredDays = intervals[stage];
-  const baseDate = item.last_review_at || item.last_attempt_at || item.created_at;
-  const deltaDays = getDaysSince(baseDate);
-  return deltaDays - requiredDays;
-}
-
 function getBaseDateInfo(item) {
   if (item.last_review_at) {
     return { label: 'last review', date: item.last_review_at };
@@ -537,25 +529,7 @@ function renderReviewComplete() {
 
 function getSortedProblems() {
   const items = [...state.problems];
-  items.sort((a, b) => {
-    const pinnedDiff = (isPinned(b.id) ? 1 : 0) - (isPinned(a.id) ? 1 : 0);
-    if (pinnedDiff) return pinnedDiff;
-
-    if (state.sortBy === 'importance') {
-      const diff = getImportanceRank(b.importance) - getImportanceRank(a.importance);
-      if (diff) return diff;
-    } else if (state.sortBy === 'review_due') {
-      const diff = getDueScore(b) - getDueScore(a);
-      if (diff) return diff;
-    } else {
-      const diff =
-        parseDateValue(b.last_attempt_at || b.created_at) -
-        parseDateValue(a.last_attempt_at || a.created_at);
-      if (diff) return diff;
-    }
-
-    return parseDateValue(b.last_attempt_at || b.created_at) - parseDateValue(a.last_attempt_at || a.created_at);
-  });
+  items.sort((a, b) => (isPinned(b.id) ? 1 : 0) - (isPinned(a.id) ? 1 : 0));
   return items;
 }
 
@@ -1003,6 +977,7 @@ function renderLibraryList(problems) {
         </button>
       </div>
       <p>${tagText} | Attempts ${item.attempt_count} | Reviews ${item.review_count} | Days since ${days}</p>
+      ${item.snippet_html ? `<p class="list-item__snippet">${item.snippet_html}</p>` : ''}
     `;
     const pinButton = row.querySelector('.pin-toggle');
     pinButton.addEventListener('click', (event) => {
@@ -1012,6 +987,14 @@ function renderLibraryList(problems) {
     row.addEventListener('click', () => loadProblemDetail(item.id));
     libraryList.appendChild(row);
   });
+  if (state.nextCursor) {
+    const more = document.createElement('button');
+    more.className = 'ghost small list-more';
+    more.type = 'button';
+    more.textContent = 'Load more';
+    more.addEventListener('click', () => loadLibrary({ append: true }));
+    libraryList.appendChild(more);
+  }
 }
 
 function renderProblemDetail(detail, attempts) {
@@ -1110,14 +1093,53 @@ function getSelectedTags(container) {
     .map((input) => input.value);
 }
 
-function loadLibrary() {
+function ordinalToDate(value) {
+  if (value === null || value === undefined) return null;
+  return new Date(value * 86400000).toISOString().slice(0, 10);
+}
+
+function decodeProblemColumns(data) {
+  const { columns, dictionaries, today } = data;
+  return columns.id.map((id, index) => {
+    const lastAttempt = columns.last_attempt_at[index];
+    const item = {
+      id,
+      lc_num: columns.lc_num[index],
+      title: columns.title[index],
+      tags: columns.tags[index].map((tagId) => dictionaries.tags[tagId]).filter(Boolean),
+      importance: dictionaries.importance[columns.importance[index]],
+      created_at: ordinalToDate(columns.created_at[index]),
+      last_attempt_at: ordinalToDate(lastAttempt),
+      last_review_at: ordinalToDate(columns.last_review_at[index]),
+      snooze_until: ordinalToDate(columns.snooze_until[index]),
+      review_count: columns.review_count[index],
+      attempt_count: columns.attempt_count[index],
+      days_since: lastAttempt === null ? null : today - lastAttempt,
+    };
+    if (columns.snippet_html) {
+      item.snippet_html = columns.snippet_html[index];
+    }
+    return item;
+  });
+}
+
+function loadLibrary({ append = false, limit = LIBRARY_PAGE_SIZE } = {}) {
   state.searchTags = getSelectedTags(searchTagsContainer);
   const params = new URLSearchParams({
     search: searchInput.value.trim(),
     tags: state.searchTags.join(','),
+    match: state.tagMatch,
+    sort: state.sortBy,
+    limit: String(limit),
+    format: 'columns',
   });
+  if (append && state.nextCursor) {
+    params.set('cursor', state.nextCursor);
+  }
   return api(`/api/problems?${params.toString()}`).then((data) => {
-    state.problems = data.problems || [];
+    const page = decodeProblemColumns(data);
+    state.problems = append ? state.problems.concat(page) : page;
+    state.nextCursor = data.next_cursor || null;
     const sorted = getSortedProblems();
     const hasActive = sorted.some((item) => item.id === state.activeProblemId);
     if (!hasActive) {
@@ -1138,6 +1160,84 @@ function loadProblemDetail(problemId) {
   });
 }
 
+function applyChanges(data) {
+  const previous = state.changeSeq;
+  state.changeSeq = data.seq;
+  if (data.reset) {
+    if (previous !== null) {
+      loadTags();
+      loadReview();
+      loadLibrary();
+    }
+    return;
+  }
+  if (data.tags.length || data.deleted.tags.length) {
+    loadTags();
+  }
+  if (!data.problems.length && !data.deleted.problems.length) return;
+  if (changesReorderLibrary(data.problems)) {
+    loadLibrary({ limit: Math.min(MAX_LIBRARY_RELOAD, Math.max(LIBRARY_PAGE_SIZE, state.problems.length)) });
+    return;
+  }
+  const changed = new Map(data.problems.map((item) => [item.id, item]));
+  const deleted = new Set(data.deleted.problems);
+  state.problems = state.problems
+    .filter((item) => !deleted.has(item.id))
+    .map((item) => changed.get(item.id) || item);
+  if (deleted.has(state.activeProblemId)) {
+    state.activeProblemId = getSortedProblems()[0]?.id || null;
+  }
+  renderLibraryList(getSortedProblems());
+  if (state.activeProblemId && (changed.has(state.activeProblemId) || deleted.size)) {
+    loadProblemDetail(state.activeProblemId);
+  }
+}
+
+function changesReorderLibrary(problems) {
+  if (!problems.length) return false;
+  const fields = SORT_FIELDS[state.sortBy];
+  if (!fields || searchInput.value.trim() || state.searchTags.length) return true;
+  const loaded = new Map(state.problems.map((item) => [item.id, item]));
+  return problems.some((item) => {
+    const current = loaded.get(item.id);
+    return !current || fields.some((field) => current[field] !== item[field]);
+  });
+}
+
+function syncChanges() {
+  if (state.changeSeq === null) return Promise.resolve();
+  return api(`/api/changes?since=${state.changeSeq}`).then((data) => {
+    applyChanges(data);
+    if (data.more) return syncChanges();
+    return null;
+  });
+}
+
+function watchChanges() {
+  if (!window.EventSource || state.changeStream || state.changeSeq === null) return;
+  const stream = new EventSource(`/api/changes/stream?since=${state.changeSeq}`);
+  state.changeStream = stream;
+  stream.addEventListener('open', stopPollingChanges);
+  stream.addEventListener('changes', (event) => applyChanges(JSON.parse(event.data)));
+  stream.addEventListener('error', () => {
+    if (stream.readyState !== EventSource.CLOSED) return;
+    state.changeStream = null;
+    pollChanges();
+    window.setTimeout(watchChanges, CHANGE_STREAM_RETRY_MS);
+  });
+}
+
+function pollChanges() {
+  if (state.changePoll) return;
+  state.changePoll = window.setInterval(() => syncChanges().catch(() => null), CHANGE_POLL_MS);
+}
+
+function stopPollingChanges() {
+  if (!state.changePoll) return;
+  window.clearInterval(state.changePoll);
+  state.changePoll = null;
+}
+
 function markReviewed(problemId, grade = 'good') {
   return api(`/api/reviews/${problemId}`, {
     method: 'POST',
@@ -1194,23 +1294,22 @@ function addEntry(formData) {
 function renameTag(oldName, newName) {
   if (!newName.trim()) return;
   api('/api/tags/rename', { method: 'POST', body: JSON.stringify({ old: oldName, new: newName }) })
-    .then(loadTags)
-    .then(loadLibrary);
+    .then(syncChanges);
 }
 
 function updateAttempt(id, notes) {
   api(`/api/attempts/${id}`, { method: 'PATCH', body: JSON.stringify({ notes }) })
-    .then(() => loadProblemDetail(state.activeProblemId));
+    .then(syncChanges);
 }
 
 function deleteAttempt(id) {
   api(`/api/attempts/${id}`, { method: 'DELETE' })
-    .then(() => loadProblemDetail(state.activeProblemId));
+    .then(syncChanges);
 }
 
 function deleteProblem(id) {
   api(`/api/problems/${id}`, { method: 'DELETE' })
-    .then(() => loadLibrary());
+    .then(syncChanges);
 }
 
 navButtons.forEach((btn) => {
@@ -1218,7 +1317,7 @@ navButtons.forEach((btn) => {
 });
 
 reviewRefresh.addEventListener('click', loadReview);
-searchButton.addEventListener('click', loadLibrary);
+searchButton.addEventListener('click', () => loadLibrary());
 if (searchTagsContainer) {
   searchTagsContainer.addEventListener('change', (event) => {
     if (event.target && event.target.matches('input[type="checkbox"]')) {
@@ -1226,12 +1325,18 @@ if (searchTagsContainer) {
     }
   });
 }
+if (tagMatchSelect) {
+  tagMatchSelect.addEventListener('change', () => {
+    state.tagMatch = tagMatchSelect.value;
+    loadLibrary();
+  });
+}
 if (sortSelect) {
   sortSelect.value = state.sortBy;
   sortSelect.addEventListener('change', () => {
     state.sortBy = sortSelect.value;
     saveSortPreference(state.sortBy);
-    renderLibraryList(getSortedProblems());
+    loadLibrary();
   });
 }
 
@@ -1246,12 +1351,16 @@ tagAdd.addEventListener('click', () => {
   api('/api/tags', { method: 'POST', body: JSON.stringify({ name: tagNew.value }) })
     .then(() => {
       tagNew.value = '';
-      loadTags();
-      loadLibrary();
+      syncChanges();
     });
 });
 
-loadTags().then(() => {
-  loadReview();
-  loadLibrary();
-});
+api('/api/changes')
+  .then(applyChanges)
+  .catch(() => null)
+  .then(() => loadTags())
+  .then(() => {
+    loadReview();
+    loadLibrary();
+    watchChanges();
+  });
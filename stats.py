@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+IMPORTANCE_LEVELS = ("Low", "Medium", "High")
+
+RollupKey = Tuple[str, str]
+RollupRow = Tuple[int, int, int, int]
+Normalizer = Callable[[Optional[str]], str]
+
+
+def create_stats_tables(cur: sqlite3.Cursor, normalize: Normalizer) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stat_counters'")
+    created = cur.fetchone() is None
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS activity_rollup (
+            granularity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            attempt_problems INTEGER NOT NULL DEFAULT 0,
+            review_problems INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, period)
+        )
+        """
+    )
+    if created:
+        rebuild_stats(cur, normalize)
+    return created
+
+
+def bump_counter(cur: sqlite3.Cursor, name: str, delta: int) -> None:
+    if not delta:
+        return
+    cur.execute(
+        """
+        INSERT INTO stat_counters (name, value) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value
+        """,
+        (name, delta),
+    )
+
+
+def _bump_rollup(
+    cur: sqlite3.Cursor,
+    granularity: str,
+    period: str,
+    attempts: int = 0,
+    reviews: int = 0,
+    attempt_problems: int = 0,
+    review_problems: int = 0,
+) -> None:
+    cur.execute(
+        """
+        INSERT INTO activity_rollup (granularity, period, attempts, reviews, attempt_problems, review_problems)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (granularity, period) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            reviews = reviews + excluded.reviews,
+            attempt_problems = attempt_problems + excluded.attempt_problems,
+            review_problems = review_problems + excluded.review_problems
+        """,
+        (granularity, period, attempts, reviews, attempt_problems, review_problems),
+    )
+
+
+def _periods(day: str) -> Tuple[Tuple[str, str, str], ...]:
+    return (("day", day, "{column} = ?"), ("month", day[:7], "substr({column}, 1, 7) = ?"))
+
+
+def record_attempt(cur: sqlite3.Cursor, problem_id: int, day: str, delta: int) -> None:
+    bump_counter(cur, "attempts", delta)
+    for granularity, period, condition in _periods(day):
+        cur.execute(
+            f"SELECT COUNT(*) FROM attempts WHERE problem_id = ? AND {condition.format(column='attempt_at')}",
+            (problem_id, period),
+        )
+        remaining = int(cur.fetchone()[0])
+        first_or_last = remaining == (1 if delta > 0 else 0)
+        _bump_rollup(cur, granularity, period, attempts=delta, attempt_problems=delta if first_or_last else 0)
+
+
+def record_review(cur: sqlite3.Cursor, problem_id: int, day: str, review_count_delta: int) -> None:
+    bump_counter(cur, "reviews", review_count_delta)
+    for granularity, period, condition in _periods(day):
+        cur.execute(
+            f"SELECT COUNT(*) FROM review_logs WHERE problem_id = ? AND {condition.format(column='reviewed_at')}",
+            (problem_id, period),
+        )
+        first = int(cur.fetchone()[0]) == 1
+        _bump_rollup(cur, granularity, period, reviews=1, review_problems=1 if first else 0)
+
+
+def refresh_attempt_periods(cur: sqlite3.Cursor, days: Iterable[str]) -> None:
+    day_set = sorted(set(days))
+    months = sorted({day[:7] for day in day_set})
+    for granularity, periods, condition, bounds in (
+        ("day", day_set, "attempt_at = ?", lambda period: (period,)),
+        ("month", months, "attempt_at >= ? AND attempt_at < ?", lambda period: (period, period + "~")),
+    ):
+        for period in periods:
+            cur.execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT problem_id) FROM attempts WHERE {condition}",
+                bounds(period),
+            )
+            count, distinct = cur.fetchone()
+            cur.execute(
+                """
+                INSERT INTO activity_rollup (granularity, period, attempts, attempt_problems)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (granularity, period) DO UPDATE SET
+                    attempts = excluded.attempts,
+                    attempt_problems = excluded.attempt_problems
+                """,
+                (granularity, period, int(count), int(distinct)),
+            )
+
+
+def record_importance(cur: sqlite3.Cursor, old: str | None, new: str | None) -> None:
+    if old == new:
+        return
+    if old:
+        bump_counter(cur, f"importance:{old}", -1)
+    if new:
+        bump_counter(cur, f"importance:{new}", 1)
+
+
+def forget_problem(cur: sqlite3.Cursor, problem_id: int, importance: str, review_count: int) -> None:
+    bump_counter(cur, "problems", -1)
+    bump_counter(cur, "reviews", -int(review_count or 0))
+    record_importance(cur, importance, None)
+    cur.execute("SELECT COUNT(*) FROM attempts WHERE problem_id = ?", (problem_id,))
+    bump_counter(cur, "attempts", -int(cur.fetchone()[0]))
+    for table, column, count_field, distinct_field in (
+        ("attempts", "attempt_at", "attempts", "attempt_problems"),
+        ("review_logs", "reviewed_at", "reviews", "review_problems"),
+    ):
+        for granularity, expression in (("day", column), ("month", f"substr({column}, 1, 7)")):
+            cur.execute(
+                f"SELECT {expression} AS period, COUNT(*) AS count FROM {table} WHERE problem_id = ? GROUP BY period",
+                (problem_id,),
+            )
+            for row in cur.fetchall():
+                _bump_rollup(
+                    cur,
+                    granularity,
+                    row[0],
+                    **{count_field: -int(row[1]), distinct_field: -1},
+                )
+
+
+def _expected_counters(cur: sqlite3.Cursor, normalize: Normalizer) -> Dict[str, int]:
+    counters = {"problems": 0, "attempts": 0, "reviews": 0}
+    counters.update({f"importance:{level}": 0 for level in IMPORTANCE_LEVELS})
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(review_count), 0) FROM problems")
+    counters["problems"], counters["reviews"] = (int(value) for value in cur.fetchone())
+    cur.execute("SELECT COUNT(*) FROM attempts")
+    counters["attempts"] = int(cur.fetchone()[0])
+    cur.execute("SELECT frequency, COUNT(*) FROM problems GROUP BY frequency")
+    for frequency, count in cur.fetchall():
+        counters[f"importance:{normalize(frequency)}"] += int(count)
+    return counters
+
+
+def _expected_rollup(cur: sqlite3.Cursor) -> Dict[RollupKey, RollupRow]:
+    rollup: Dict[RollupKey, List[int]] = {}
+    for table, column, offset in (("attempts", "attempt_at", 0), ("review_logs", "reviewed_at", 1)):
+        for granularity, expression in (("day", column), ("month", f"substr({column}, 1, 7)")):
+            cur.execute(
+                f"""
+                SELECT {expression} AS period, COUNT(*), COUNT(DISTINCT problem_id)
+                FROM {table}
+                GROUP BY period
+                """
+            )
+            for period, count, distinct in cur.fetchall():
+                values = rollup.setdefault((granularity, period), [0, 0, 0, 0])
+                values[offset] = int(count)
+                values[offset + 2] = int(distinct)
+    return {key: tuple(values) for key, values in rollup.items()}
+
+
+def _stored_rollup(cur: sqlite3.Cursor) -> Dict[RollupKey, RollupRow]:
+    cur.execute(
+        """
+        SELECT granularity, period, attempts, reviews, attempt_problems, review_problems
+        FROM activity_rollup
+        WHERE attempts != 0 OR reviews != 0 OR attempt_problems != 0 OR review_problems != 0
+        """
+    )
+    return {(row[0], row[1]): (int(row[2]), int(row[3]), int(row[4]), int(row[5])) for row in cur.fetchall()}
+
+
+def rebuild_stats(cur: sqlite3.Cursor, normalize: Normalizer) -> None:
+    cur.execute("DELETE FROM stat_counters")
+    cur.executemany(
+        "INSERT INTO stat_counters (name, value) VALUES (?, ?)",
+        list(_expected_counters(cur, normalize).items()),
+    )
+    cur.execute("DELETE FROM activity_rollup")
+    cur.executemany(
+        """
+        INSERT INTO activity_rollup (granularity, period, attempts, reviews, attempt_problems, review_problems)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [key + values for key, values in _expected_rollup(cur).items()],
+    )
+
+
+def check_stats(cur: sqlite3.Cursor, normalize: Normalizer) -> List[str]:
+    problems = []
+    cur.execute("SELECT name, value FROM stat_counters")
+    stored_counters = {row[0]: int(row[1]) for row in cur.fetchall()}
+    for name, expected in _expected_counters(cur, normalize).items():
+        actual = stored_counters.get(name, 0)
+        if actual != expected:
+            problems.append(f"counter {name}: stored {actual}, expected {expected}")
+    stored = _stored_rollup(cur)
+    expected_rollup = _expected_rollup(cur)
+    for key in sorted(set(stored) | set(expected_rollup)):
+        actual_row = stored.get(key, (0, 0, 0, 0))
+        expected_row = expected_rollup.get(key, (0, 0, 0, 0))
+        if actual_row != expected_row:
+            problems.append(f"rollup {key[0]} {key[1]}: stored {actual_row}, expected {expected_row}")
+    return problems
+
+
+def read_counters(cur: sqlite3.Cursor) -> Dict[str, int]:
+    cur.execute("SELECT name, value FROM stat_counters")
+    return {row[0]: int(row[1]) for row in cur.fetchall()}
+
+
+def read_rollup(cur: sqlite3.Cursor, granularity: str, start: str, end: str) -> Dict[str, sqlite3.Row]:
+    cur.execute(
+        """
+        SELECT period, attempts, reviews, attempt_problems, review_problems
+        FROM activity_rollup
+        WHERE granularity = ? AND period >= ? AND period <= ?
+        """,
+        (granularity, start, end),
+    )
+    return {row[0]: row for row in cur.fetchall()}
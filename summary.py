@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Iterable, List
+
+SUMMARY_COLUMNS = {
+    "attempt_count": "INTEGER NOT NULL DEFAULT 0",
+    "tag_names": "TEXT",
+    "tag_ids": "TEXT NOT NULL DEFAULT '[]'",
+}
+REFRESH_BATCH = 500
+
+
+def _problem_tags_sql(column: str) -> str:
+    return (
+        f"SELECT {column} FROM problem_tags pt JOIN tags t ON t.id = pt.tag_id "
+        f"WHERE pt.problem_id = p.id ORDER BY t.name"
+    )
+
+
+_SUMMARY_SQL = f"""
+    SELECT
+        p.id,
+        (SELECT COUNT(*) FROM attempts a WHERE a.problem_id = p.id) AS attempt_count,
+        (SELECT GROUP_CONCAT(name) FROM ({_problem_tags_sql("t.name")})) AS tag_names,
+        (SELECT json_group_array(tag_id) FROM ({_problem_tags_sql("pt.tag_id")})) AS tag_ids
+    FROM problems p
+"""
+_STALE = (
+    "problems.attempt_count <> s.attempt_count "
+    "OR problems.tag_names IS NOT s.tag_names "
+    "OR problems.tag_ids <> s.tag_ids"
+)
+
+
+def _update_sql(where: str) -> str:
+    return f"""
+        UPDATE problems
+        SET attempt_count = s.attempt_count, tag_names = s.tag_names, tag_ids = s.tag_ids
+        FROM ({_SUMMARY_SQL} {where}) AS s
+        WHERE problems.id = s.id AND ({_STALE})
+    """
+
+
+def create_problem_summary(cur: sqlite3.Cursor) -> bool:
+    cur.execute("PRAGMA table_info(problems)")
+    existing = {row[1] for row in cur.fetchall()}
+    missing = [name for name in SUMMARY_COLUMNS if name not in existing]
+    for name in missing:
+        cur.execute(f"ALTER TABLE problems ADD COLUMN {name} {SUMMARY_COLUMNS[name]}")
+    if missing:
+        rebuild_problem_summary(cur)
+    return bool(missing)
+
+
+def refresh_problem_summary(cur: sqlite3.Cursor, problem_ids: Iterable[int]) -> int:
+    ids = sorted({int(problem_id) for problem_id in problem_ids})
+    updated = 0
+    for start in range(0, len(ids), REFRESH_BATCH):
+        cur.execute(
+            _update_sql("WHERE p.id IN (SELECT value FROM json_each(?))"),
+            (json.dumps(ids[start : start + REFRESH_BATCH]),),
+        )
+        updated += cur.rowcount
+    return updated
+
+
+def rebuild_problem_summary(cur: sqlite3.Cursor) -> int:
+    cur.execute(_update_sql(""))
+    return cur.rowcount
+
+
+def check_problem_summary(cur: sqlite3.Cursor) -> List[str]:
+    cur.execute(
+        f"SELECT problems.id FROM problems JOIN ({_SUMMARY_SQL}) AS s ON s.id = problems.id "
+        f"WHERE {_STALE} ORDER BY problems.id"
+    )
+    stale = [int(row[0]) for row in cur.fetchall()]
+    if not stale:
+        return []
+    sample = ", ".join(str(problem_id) for problem_id in stale[:10])
+    return [f"problem summary: {len(stale)} stale rows (ids {sample})"]
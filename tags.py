@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+TAG_SEPARATOR = " > "
+TAG_MATCHES = ("any", "all")
+REFRESH_BATCH = 500
+RELATED_LIMIT = 5
+ID_LIST_SQL = "SELECT value FROM json_each(?)"
+
+CoverRow = Tuple[int, int, int, int, Optional[str]]
+
+
+def normalize_tag_name(name: str) -> str:
+    return TAG_SEPARATOR.join(part.strip() for part in name.split(">") if part.strip())
+
+
+def parent_name(name: str) -> Optional[str]:
+    parts = name.split(TAG_SEPARATOR)
+    return TAG_SEPARATOR.join(parts[:-1]) if len(parts) > 1 else None
+
+
+def create_tag_index(cur: sqlite3.Cursor) -> bool:
+    cur.execute("PRAGMA table_info(tags)")
+    if "parent_id" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE tags ADD COLUMN parent_id INTEGER REFERENCES tags (id)")
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tag_closure'")
+    created = cur.fetchone() is None
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tag_closure (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tag_closure_descendant ON tag_closure (descendant_id, ancestor_id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS problem_tag_cover (
+            tag_id INTEGER NOT NULL,
+            problem_id INTEGER NOT NULL,
+            direct INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            next_due_at TEXT,
+            PRIMARY KEY (tag_id, problem_id)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_problem_tag_cover_problem ON problem_tag_cover (problem_id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tag_stats (
+            tag_id INTEGER PRIMARY KEY,
+            problems INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tag_due (
+            tag_id INTEGER NOT NULL,
+            due_at TEXT NOT NULL,
+            problems INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tag_id, due_at)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tag_pairs (
+            tag_id INTEGER NOT NULL,
+            other_id INTEGER NOT NULL,
+            problems INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tag_id, other_id)
+        ) WITHOUT ROWID
+        """
+    )
+    if created:
+        rebuild_tag_index(cur)
+    return created
+
+
+def ensure_tag(cur: sqlite3.Cursor, name: str) -> Optional[int]:
+    name = normalize_tag_name(name)
+    if not name:
+        return None
+    cur.execute("SELECT id FROM tags WHERE name = ?", (name,))
+    row = cur.fetchone()
+    if row:
+        return int(row[0])
+    parent = parent_name(name)
+    parent_id = ensure_tag(cur, parent) if parent else None
+    cur.execute("INSERT INTO tags (name, parent_id) VALUES (?, ?)", (name, parent_id))
+    tag_id = int(cur.lastrowid)
+    cur.execute(
+        """
+        INSERT INTO tag_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, ?, depth + 1 FROM tag_closure WHERE descendant_id = ?
+        UNION ALL
+        SELECT ?, ?, 0
+        """,
+        (tag_id, parent_id, tag_id, tag_id),
+    )
+    return tag_id
+
+
+def rename_tag(cur: sqlite3.Cursor, old: str, new: str) -> Optional[List[int]]:
+    old = normalize_tag_name(old)
+    new = normalize_tag_name(new)
+    if not old or not new or old == new:
+        return None
+    cur.execute("SELECT id FROM tags WHERE name = ?", (old,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    tag_id = int(row[0])
+    cur.execute(
+        """
+        SELECT t.id, t.name
+        FROM tag_closure c
+        JOIN tags t ON t.id = c.descendant_id
+        WHERE c.ancestor_id = ?
+        ORDER BY c.depth
+        """,
+        (tag_id,),
+    )
+    subtree = [(int(row[0]), row[1]) for row in cur.fetchall()]
+    renamed = [(descendant_id, new + name[len(old):]) for descendant_id, name in subtree]
+    names = [name for _, name in renamed]
+    cur.execute(f"SELECT 1 FROM tags WHERE name IN ({', '.join(['?'] * len(names))}) LIMIT 1", names)
+    if cur.fetchone():
+        return None
+    parent = parent_name(new)
+    if parent is not None and any(parent == name or parent.startswith(name + TAG_SEPARATOR) for _, name in subtree):
+        return None
+    parent_id = ensure_tag(cur, parent) if parent else None
+    cur.executemany("UPDATE tags SET name = ? WHERE id = ?", [(name, descendant_id) for descendant_id, name in renamed])
+    cur.execute("SELECT parent_id FROM tags WHERE id = ?", (tag_id,))
+    if cur.fetchone()[0] == parent_id:
+        return []
+    _move_subtree(cur, tag_id, parent_id)
+    return _subtree_problems(cur, tag_id)
+
+
+def _subtree_problems(cur: sqlite3.Cursor, tag_id: int) -> List[int]:
+    cur.execute(
+        """
+        SELECT DISTINCT pt.problem_id
+        FROM tag_closure c
+        JOIN problem_tags pt ON pt.tag_id = c.descendant_id
+        WHERE c.ancestor_id = ?
+        """,
+        (tag_id,),
+    )
+    return [int(row[0]) for row in cur.fetchall()]
+
+
+def tagged_problem_ids(cur: sqlite3.Cursor, name: str) -> List[int]:
+    cur.execute("SELECT id FROM tags WHERE name = ?", (normalize_tag_name(name),))
+    row = cur.fetchone()
+    return _subtree_problems(cur, int(row[0])) if row else []
+
+
+def _move_subtree(cur: sqlite3.Cursor, tag_id: int, parent_id: Optional[int]) -> None:
+    cur.execute("UPDATE tags SET parent_id = ? WHERE id = ?", (parent_id, tag_id))
+    cur.execute(
+        """
+        DELETE FROM tag_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM tag_closure WHERE ancestor_id = ?)
+          AND ancestor_id NOT IN (SELECT descendant_id FROM tag_closure WHERE ancestor_id = ?)
+        """,
+        (tag_id, tag_id),
+    )
+    if parent_id is None:
+        return
+    cur.execute(
+        """
+        INSERT INTO tag_closure (ancestor_id, descendant_id, depth)
+        SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+        FROM tag_closure above, tag_closure below
+        WHERE above.descendant_id = ? AND below.ancestor_id = ?
+        """,
+        (parent_id, tag_id),
+    )
+
+
+_REBUILD_SQL = (
+    """
+    INSERT INTO tag_stats (tag_id, problems, attempts)
+    SELECT tag_id, COUNT(*), SUM(attempts) FROM problem_tag_cover GROUP BY tag_id
+    """,
+    """
+    INSERT INTO tag_due (tag_id, due_at, problems)
+    SELECT tag_id, next_due_at, COUNT(*) FROM problem_tag_cover
+    WHERE next_due_at IS NOT NULL
+    GROUP BY tag_id, next_due_at
+    """,
+    """
+    INSERT INTO tag_pairs (tag_id, other_id, problems)
+    SELECT a.tag_id, b.tag_id, COUNT(*)
+    FROM problem_tag_cover a
+    JOIN problem_tag_cover b ON b.problem_id = a.problem_id AND b.tag_id != a.tag_id AND b.direct
+    WHERE a.direct
+    GROUP BY a.tag_id, b.tag_id
+    """,
+)
+
+
+def _cover_rows_sql(ids: str) -> str:
+    return f"""
+        SELECT
+            c.ancestor_id,
+            p.id,
+            MAX(c.depth = 0),
+            (SELECT COUNT(*) FROM attempts a WHERE a.problem_id = p.id),
+            p.next_due_at
+        FROM problems p
+        JOIN problem_tags pt ON pt.problem_id = p.id
+        JOIN tag_closure c ON c.descendant_id = pt.tag_id
+        WHERE p.id IN ({ids})
+        GROUP BY c.ancestor_id, p.id
+    """
+
+
+def _direct_tags(rows: Iterable[CoverRow]) -> Dict[int, List[int]]:
+    direct: Dict[int, List[int]] = {}
+    for tag_id, problem_id, is_direct, _, _ in rows:
+        if is_direct:
+            direct.setdefault(problem_id, []).append(tag_id)
+    return direct
+
+
+def _bump(deltas: Dict[Any, int], key: Any, delta: int) -> None:
+    deltas[key] = deltas.get(key, 0) + delta
+
+
+def refresh_tag_index(cur: sqlite3.Cursor, problem_ids: Iterable[int]) -> None:
+    ids: List[int] = sorted({int(problem_id) for problem_id in problem_ids})
+    for start in range(0, len(ids), REFRESH_BATCH):
+        params = (json.dumps(ids[start : start + REFRESH_BATCH]),)
+        cur.execute(
+            "SELECT tag_id, problem_id, direct, attempts, next_due_at FROM problem_tag_cover "
+            f"WHERE problem_id IN ({ID_LIST_SQL})",
+            params,
+        )
+        old = {tuple(row) for row in cur.fetchall()}
+        cur.execute(_cover_rows_sql(ID_LIST_SQL), params)
+        new = {tuple(row) for row in cur.fetchall()}
+        removed, added = old - new, new - old
+        if not removed and not added:
+            continue
+        cur.executemany(
+            "DELETE FROM problem_tag_cover WHERE tag_id = ? AND problem_id = ?",
+            [row[:2] for row in removed],
+        )
+        cur.executemany(
+            "INSERT INTO problem_tag_cover (tag_id, problem_id, direct, attempts, next_due_at) VALUES (?, ?, ?, ?, ?)",
+            list(added),
+        )
+
+        problems: Dict[int, int] = {}
+        attempts: Dict[int, int] = {}
+        due: Dict[Tuple[int, str], int] = {}
+        for sign, rows in ((-1, removed), (1, added)):
+            for tag_id, _, _, attempt_count, next_due_at in rows:
+                _bump(problems, tag_id, sign)
+                _bump(attempts, tag_id, sign * attempt_count)
+                if next_due_at is not None:
+                    _bump(due, (tag_id, next_due_at), sign)
+        pairs: Dict[Tuple[int, int], int] = {}
+        old_direct, new_direct = _direct_tags(old), _direct_tags(new)
+        for problem_id in old_direct.keys() | new_direct.keys():
+            before = sorted(old_direct.get(problem_id, []))
+            after = sorted(new_direct.get(problem_id, []))
+            if before == after:
+                continue
+            for sign, tag_ids in ((-1, before), (1, after)):
+                for tag_id in tag_ids:
+                    for other_id in tag_ids:
+                        if tag_id != other_id:
+                            _bump(pairs, (tag_id, other_id), sign)
+
+        cur.executemany(
+            """
+            INSERT INTO tag_stats (tag_id, problems, attempts) VALUES (?, ?, ?)
+            ON CONFLICT (tag_id) DO UPDATE SET
+                problems = problems + excluded.problems,
+                attempts = attempts + excluded.attempts
+            """,
+            [
+                (tag_id, problems[tag_id], attempts.get(tag_id, 0))
+                for tag_id in problems
+                if problems[tag_id] or attempts.get(tag_id, 0)
+            ],
+        )
+        cur.executemany(
+            """
+            INSERT INTO tag_due (tag_id, due_at, problems) VALUES (?, ?, ?)
+            ON CONFLICT (tag_id, due_at) DO UPDATE SET problems = problems + excluded.problems
+            """,
+            [(tag_id, day, delta) for (tag_id, day), delta in due.items() if delta],
+        )
+        cur.executemany(
+            """
+            INSERT INTO tag_pairs (tag_id, other_id, problems) VALUES (?, ?, ?)
+            ON CONFLICT (tag_id, other_id) DO UPDATE SET problems = problems + excluded.problems
+            """,
+            [(tag_id, other_id, delta) for (tag_id, other_id), delta in pairs.items() if delta],
+        )
+        cur.executemany(
+            "DELETE FROM tag_stats WHERE tag_id = ? AND problems = 0",
+            [(tag_id,) for tag_id, delta in problems.items() if delta < 0],
+        )
+        cur.executemany(
+            "DELETE FROM tag_due WHERE tag_id = ? AND due_at = ? AND problems = 0",
+            [key for key, delta in due.items() if delta < 0],
+        )
+        cur.executemany(
+            "DELETE FROM tag_pairs WHERE tag_id = ? AND other_id = ? AND problems = 0",
+            [key for key, delta in pairs.items() if delta < 0],
+        )
+
+
+def rebuild_tag_index(cur: sqlite3.Cursor) -> None:
+    cur.execute("SELECT id, name FROM tags ORDER BY id")
+    for tag_id, name in cur.fetchall():
+        normalized = normalize_tag_name(name)
+        parent = parent_name(normalized)
+        parent_id = ensure_tag(cur, parent) if parent else None
+        cur.execute("UPDATE tags SET parent_id = ? WHERE id = ? AND parent_id IS NOT ?", (parent_id, tag_id, parent_id))
+    cur.execute("DELETE FROM tag_closure")
+    cur.execute(
+        """
+        WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM tags
+            UNION ALL
+            SELECT closure.ancestor_id, tags.id, closure.depth + 1
+            FROM closure JOIN tags ON tags.parent_id = closure.descendant_id
+        )
+        INSERT INTO tag_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM closure
+        """
+    )
+    for table in ("problem_tag_cover", "tag_stats", "tag_due", "tag_pairs"):
+        cur.execute(f"DELETE FROM {table}")
+    cur.execute(
+        "INSERT INTO problem_tag_cover (tag_id, problem_id, direct, attempts, next_due_at) "
+        + _cover_rows_sql("SELECT id FROM problems")
+    )
+    for sql in _REBUILD_SQL:
+        cur.execute(sql)
+
+
+def check_tag_index(cur: sqlite3.Cursor) -> List[str]:
+    problems: List[str] = []
+    cur.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT t.id AS ancestor_id, t.id AS descendant_id, 0 AS depth FROM tags t
+            UNION
+            SELECT c.ancestor_id, t.id, c.depth + 1
+            FROM tags t JOIN tag_closure c ON c.descendant_id = t.parent_id
+            EXCEPT
+            SELECT ancestor_id, descendant_id, depth FROM tag_closure
+        )
+        """
+    )
+    missing = int(cur.fetchone()[0])
+    if missing:
+        problems.append(f"tag_closure: {missing} missing links")
+    checks = {
+        "problem_tag_cover": (
+            "SELECT tag_id, problem_id, direct, attempts, next_due_at FROM problem_tag_cover",
+            _cover_rows_sql("SELECT id FROM problems"),
+        ),
+        "tag_stats": (
+            "SELECT tag_id, problems, attempts FROM tag_stats",
+            "SELECT tag_id, COUNT(*), SUM(attempts) FROM problem_tag_cover GROUP BY tag_id",
+        ),
+        "tag_due": (
+            "SELECT tag_id, due_at, problems FROM tag_due",
+            "SELECT tag_id, next_due_at, COUNT(*) FROM problem_tag_cover WHERE next_due_at IS NOT NULL "
+            "GROUP BY tag_id, next_due_at",
+        ),
+        "tag_pairs": (
+            "SELECT tag_id, other_id, problems FROM tag_pairs",
+            "SELECT a.tag_id, b.tag_id, COUNT(*) FROM problem_tag_cover a "
+            "JOIN problem_tag_cover b ON b.problem_id = a.problem_id AND b.tag_id != a.tag_id AND b.direct "
+            "WHERE a.direct GROUP BY a.tag_id, b.tag_id",
+        ),
+    }
+    for table, (stored, expected) in checks.items():
+        cur.execute(f"SELECT COUNT(*) FROM ({stored} EXCEPT {expected})")
+        extra = int(cur.fetchone()[0])
+        cur.execute(f"SELECT COUNT(*) FROM ({expected} EXCEPT {stored})")
+        missing = int(cur.fetchone()[0])
+        if extra or missing:
+            problems.append(f"{table}: {extra} stale rows, {missing} missing rows")
+    return problems
+
+
+def tag_filter(tags: Sequence[str], match: str = "any") -> Tuple[Optional[str], List[Any]]:
+    names = sorted({normalize_tag_name(tag) for tag in tags if tag and tag != "All"} - {""})
+    if not names:
+        return None, []
+    if match not in TAG_MATCHES:
+        raise ValueError(f"Unknown tag match: {match}")
+    placeholders = ", ".join(["?"] * len(names))
+    condition = (
+        "p.id IN (SELECT c.problem_id FROM problem_tag_cover c JOIN tags t ON t.id = c.tag_id "
+        f"WHERE t.name IN ({placeholders})"
+    )
+    if match == "all" and len(names) > 1:
+        condition += " GROUP BY c.problem_id HAVING COUNT(*) = ?"
+        return condition + ")", [*names, len(names)]
+    return condition + ")", names
+
+
+def read_tag_stats(cur: sqlite3.Cursor, today: str, related: int = RELATED_LIMIT) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT
+            t.id,
+            t.name,
+            parent.name AS parent,
+            COALESCE(s.problems, 0) AS problems,
+            COALESCE(s.attempts, 0) AS attempts,
+            COALESCE((SELECT SUM(d.problems) FROM tag_due d WHERE d.tag_id = t.id AND d.due_at <= ?), 0) AS due
+        FROM tags t
+        LEFT JOIN tags parent ON parent.id = t.parent_id
+        LEFT JOIN tag_stats s ON s.tag_id = t.id
+        ORDER BY t.name COLLATE NOCASE
+        """,
+        (today,),
+    )
+    stats = [
+        {
+            "id": int(row[0]),
+            "name": row[1],
+            "parent": row[2],
+            "depth": row[1].count(TAG_SEPARATOR),
+            "problems": int(row[3]),
+            "attempts": int(row[4]),
+            "due": int(row[5]),
+            "related": [],
+        }
+        for row in cur.fetchall()
+    ]
+    if related > 0:
+        by_id = {entry["id"]: entry for entry in stats}
+        cur.execute(
+            """
+            SELECT tag_id, name, problems FROM (
+                SELECT
+                    p.tag_id,
+                    t.name,
+                    p.problems,
+                    ROW_NUMBER() OVER (PARTITION BY p.tag_id ORDER BY p.problems DESC, t.name) AS position
+                FROM tag_pairs p
+                JOIN tags t ON t.id = p.other_id
+            )
+            WHERE position <= ?
+            ORDER BY tag_id, position
+            """,
+            (related,),
+        )
+        for tag_id, name, count in cur.fetchall():
+            if tag_id in by_id:
+                by_id[tag_id]["related"].append({"name": name, "problems": int(count)})
+    return stats
+
+
+def top_tags(cur: sqlite3.Cursor, limit: int = 5) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT t.name, s.problems
+        FROM tag_stats s
+        JOIN tags t ON t.id = s.tag_id
+        WHERE s.problems > 0
+        ORDER BY s.problems DESC, t.name COLLATE NOCASE ASC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return [{"name": row[0], "count": int(row[1])} for row in cur.fetchall()]
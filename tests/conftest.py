@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+SESSION_DATA_DIR = tempfile.mkdtemp(prefix="lc-tracker-tests-")
+os.environ["LC_TRACKER_DATA_DIR"] = SESSION_DATA_DIR
+os.environ["LC_TRACKER_BACKUP_DEBOUNCE"] = "3600"
+os.environ.pop("LC_TRACKER_METRICS", None)
+os.environ.pop("LC_TRACKER_PROFILE", None)
+
+import db  # noqa: E402
+
+_names = itertools.count()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(SESSION_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(db, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def profile_name(data_dir) -> str:
+    return f"test-{next(_names)}"
+
+
+@pytest.fixture
+def database(profile_name):
+    db.create_profile(profile_name)
+    with db.use_profile(profile_name) as handle:
+        yield handle
+
+
+@pytest.fixture
+def client(database):
+    import web_app
+
+    web_app.response_cache.clear()
+    test_client = web_app.app.test_client()
+    test_client.environ_base["HTTP_X_LC_PROFILE"] = database.name
+    return test_client
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+
+import caching
+
+ATTEMPT = {"lc_num": "1", "title": "Two Sum", "tags": ["Array"], "importance": "High", "notes": "hash map"}
+
+
+@pytest.mark.parametrize("path", ["/api/problems", "/api/tags", "/api/dashboard", "/api/reviews/forecast"])
+def test_cached_get_answers_304_until_the_data_changes(client, path):
+    first = client.get(path)
+    etag = first.headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    assert client.post("/api/attempts", json=ATTEMPT).status_code == 200
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_etag_depends_on_the_query(client):
+    assert client.get("/api/problems?sort=lc_num").headers["ETag"] != client.get("/api/problems").headers["ETag"]
+
+
+def test_new_build_invalidates_etags(client, monkeypatch):
+    etag = client.get("/api/tags").headers["ETag"]
+    monkeypatch.setattr(caching, "build_version", lambda: "next-build")
+    response = client.get("/api/tags", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import threading
+
+import web_app
+
+ATTEMPT = {"lc_num": "1", "title": "Two Sum", "tags": ["Array"], "importance": "High", "notes": "hash map"}
+
+
+def test_feed_starts_with_a_reset(client):
+    body = client.get("/api/changes").get_json()
+    assert body["reset"] is True
+    assert body["seq"] >= 0
+
+
+def test_feed_reports_changed_and_deleted_problems(client):
+    seq = client.get("/api/changes").get_json()["seq"]
+    client.post("/api/attempts", json=ATTEMPT)
+    changes = client.get(f"/api/changes?since={seq}").get_json()
+    assert [item["lc_num"] for item in changes["problems"]] == ["1"]
+    assert changes["seq"] > seq
+    problem_id = changes["problems"][0]["id"]
+    client.delete(f"/api/problems/{problem_id}")
+    later = client.get(f"/api/changes?since={changes['seq']}").get_json()
+    assert later["problems"] == []
+    assert later["deleted"]["problems"] == [problem_id]
+
+
+def test_negative_since_answers_400(client):
+    assert client.get("/api/changes?since=-1").status_code == 400
+
+
+def test_streams_beyond_the_cap_answer_503(client, monkeypatch):
+    monkeypatch.setattr(web_app, "change_stream_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(web_app, "CHANGE_STREAM_SECONDS", 0.1)
+    first = client.get("/api/changes/stream?since=0", buffered=False)
+    assert first.status_code == 200
+    busy = client.get("/api/changes/stream?since=0")
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"]
+    first.close()
+    again = client.get("/api/changes/stream?since=0")
+    assert again.status_code == 200
+    assert "event: changes" in again.get_data(as_text=True)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+import db
+
+
+def test_forecast_counts_each_due_problem_once(client, database):
+    db.add_attempt("1", "Two Sum", ["Array"], "High", "hash map")
+    db.add_attempt("2", "Add Two Numbers", ["Linked List"], "Low", "carry")
+    body = client.get("/api/reviews/forecast?days=14").get_json()
+    assert len(body["dates"]) == len(body["total"]) == 14
+    assert sum(body["total"]) >= 2
+    assert set(body["by_importance"]) >= {"High", "Low"}
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/reviews?limit=x",
+        "/api/reviews?limit=50",
+        "/api/reviews/schedule?soon_days=soon",
+        "/api/reviews/forecast?days=abc",
+        "/api/reviews/forecast?days=0",
+        "/api/reviews/forecast?days=100000",
+        "/api/tags/stats?related=-1",
+    ],
+)
+def test_bad_query_parameters_answer_400(client, path):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+def test_batch_review_checks_limit_before_applying(client, database):
+    db.add_attempt("1", "Two Sum", [], "High", "hash map")
+    response = client.post("/api/reviews/batch?limit=many", json=[{"problem_id": 1}])
+    assert response.status_code == 400
+    assert db.get_problem_detail(1)["review_count"] == 0
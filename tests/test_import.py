@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+import db
+from importer import iter_records
+
+
+def _jsonl(*records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _import(text, fmt="jsonl"):
+    return db.import_attempts(iter_records(io.StringIO(text), fmt))
+
+
+VALID = {"lc_num": "1", "title": "Two Sum", "notes": "hash map", "tags": ["Array"], "importance": "High"}
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"importance": 3},
+        {"importance": ["High"]},
+        {"tags": {"a": 1}},
+        {"tags": 7},
+        {"tags": ["Array", 2]},
+        {"attempt_at": "yesterday"},
+        {"title": ""},
+    ],
+)
+def test_malformed_rows_are_reported_not_raised(database, bad):
+    result = _import(_jsonl(VALID, {**VALID, "lc_num": "2", **bad}) + "not json\n")
+    assert result["imported"] == 1
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    assert db.check_dashboard_stats() == []
+
+
+def test_csv_tags_and_importance_are_cleaned(database):
+    text = "lc_num,title,tags,importance,notes,attempt_at\n1,Two Sum,Array;hash/map,critical,notes,2024-01-02\n"
+    assert _import(text, "csv")["imported"] == 1
+    detail = db.get_problem_detail(1)
+    assert detail["frequency"] == "High"
+    assert sorted(detail["tags"].split(",")) == ["Array", "hash/map"]
+
+
+def test_import_is_one_transaction(database, monkeypatch):
+    def fail(cur, problem_ids):
+        raise RuntimeError("disk full")
+
+    records = [{**VALID, "lc_num": str(number)} for number in range(1, 2 * db.IMPORT_BATCH_SIZE + 2)]
+    monkeypatch.setattr(db, "refresh_problem_summary", fail)
+    with pytest.raises(RuntimeError):
+        _import(_jsonl(*records))
+    monkeypatch.undo()
+    assert db.get_problems_page()[0] == []
+    assert _import(_jsonl(*records))["imported"] == len(records)
+    assert db.check_dashboard_stats() == []
+
+
+def test_upload_with_bad_rows_still_answers_200(client):
+    body = _jsonl(VALID, {**VALID, "importance": 3}).encode()
+    response = client.post("/api/import?format=jsonl", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result["imported"], result["error_count"]) == (1, 1)
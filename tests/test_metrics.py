@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+METRICS_PROBE = """
+import web_app
+client = web_app.app.test_client()
+response = client.post("/api/attempts", json={"lc_num": "1", "title": "Two Sum", "notes": "hash map"})
+assert response.status_code == 200, response.status_code
+print(response.headers["Server-Timing"])
+print(client.get("/api/_metrics").status_code)
+print(client.get("/api/_metrics", environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code)
+"""
+
+
+def test_metrics_routes_are_absent_by_default(client):
+    assert client.get("/api/_metrics").status_code == 404
+    assert "Server-Timing" not in client.get("/api/tags").headers
+
+
+def test_post_reports_its_queries_with_metrics_enabled(tmp_path):
+    env = {**os.environ, "LC_TRACKER_METRICS": "1", "LC_TRACKER_DATA_DIR": str(tmp_path)}
+    result = subprocess.run(
+        [sys.executable, "-c", METRICS_PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    timing, local, remote = result.stdout.splitlines()[:3]
+    queries = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing)
+    assert queries and int(queries.group(1)) > 0, timing
+    assert (local, remote) == ("200", "404")
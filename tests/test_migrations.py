@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import sqlite3
+
+import db
+from migrations import latest_version, schema_version
+from profiles import profile_paths
+
+LEGACY_SCHEMA = """
+CREATE TABLE tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE problems (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lc_num TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    tag_id INTEGER,
+    frequency TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_attempt_at TEXT,
+    last_review_at TEXT,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (tag_id) REFERENCES tags (id)
+);
+CREATE TABLE problem_tags (
+    problem_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    PRIMARY KEY (problem_id, tag_id)
+);
+CREATE TABLE attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem_id INTEGER NOT NULL,
+    attempt_at TEXT NOT NULL,
+    notes TEXT NOT NULL
+);
+CREATE TABLE review_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem_id INTEGER NOT NULL,
+    reviewed_at TEXT NOT NULL,
+    grade TEXT
+);
+INSERT INTO tags (id, name) VALUES (1, 'Graph'), (2, 'DP');
+INSERT INTO problems (id, lc_num, title, tag_id, frequency, created_at, last_attempt_at, last_review_at, review_count)
+VALUES
+    (1, '200', 'Number of Islands', 1, 'Critical', '2024-01-01', '2024-01-03', '2024-01-05', 2),
+    (2, '70', 'Climbing Stairs', NULL, 'Low', '2024-02-01', '2024-02-01', '2024-02-01', 0);
+INSERT INTO problem_tags (problem_id, tag_id) VALUES (1, 1), (2, 2);
+INSERT INTO attempts (problem_id, attempt_at, notes)
+VALUES (1, '2024-01-01', 'BFS from each land cell'), (1, '2024-01-03', 'union find'), (2, '2024-02-01', 'fibonacci');
+INSERT INTO review_logs (problem_id, reviewed_at, grade) VALUES (1, '2024-01-04', 'good'), (1, '2024-01-05', NULL);
+"""
+
+
+def _legacy_database(data_dir, name):
+    db_path, _ = profile_paths(data_dir, name)
+    db_path.parent.mkdir(parents=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    return db_path
+
+
+def test_version_zero_database_migrates_to_latest(data_dir, profile_name):
+    db_path = _legacy_database(data_dir, profile_name)
+    with db.use_profile(profile_name):
+        assert db.get_readiness()["schema_version"] == 0
+        db.init_db()
+        latest = latest_version(db.MIGRATIONS)
+        assert db.get_readiness() == {"ready": True, "schema_version": latest, "latest": latest}
+        assert db.check_dashboard_stats() == []
+        assert db.get_problem_detail(1)["frequency"] == "High"
+        rows, _ = db.get_problems_page(sort="lc_num")
+        assert all(row["next_due_at"] for row in rows)
+        assert [row["notes"] for row in db.get_attempts(1)] == ["union find", "BFS from each land cell"]
+        rows, _ = db.get_problems_page(search="union", sort="relevance")
+        assert [row["lc_num"] for row in rows] == ["200"]
+        assert db.migrate() == []
+    conn = sqlite3.connect(db_path)
+    try:
+        assert schema_version(conn.cursor()) == latest_version(db.MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def test_dry_run_lists_steps_without_applying_them(data_dir, profile_name):
+    _legacy_database(data_dir, profile_name)
+    with db.use_profile(profile_name):
+        steps = db.migrate(dry_run=True)
+        assert len(steps) == len(db.MIGRATIONS)
+        assert db.get_readiness()["schema_version"] == 0
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def library(database):
+    for number in range(1, 31):
+        db.add_attempt(
+            str(number),
+            f"Problem {number}",
+            ["graph" if number % 2 else "dp"],
+            ("Low", "Medium", "High")[number % 3],
+            f"notes for problem {number}",
+            attempt_at=f"2024-01-{number % 4 + 1:02d}",
+        )
+    return database
+
+
+def _walk(sort, limit, cursor=None, **filters):
+    ids = []
+    while True:
+        rows, cursor = db.get_problems_page(sort=sort, limit=limit, cursor=cursor, **filters)
+        ids.extend(int(row["id"]) for row in rows)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", sorted(db.PROBLEM_SORTS))
+def test_pages_cover_the_library_once_in_order(library, sort):
+    everything, cursor = db.get_problems_page(sort=sort, limit=db.MAX_PAGE_SIZE)
+    assert cursor is None
+    assert _walk(sort, 7) == [int(row["id"]) for row in everything]
+
+
+def test_pages_respect_filters(library):
+    ids = _walk("lc_num", 4, tags=["graph"])
+    assert len(ids) == 15
+    assert ids == sorted(ids)
+
+
+def test_writes_between_pages_do_not_repeat_rows(library):
+    first, cursor = db.get_problems_page(sort="lc_num", limit=10)
+    db.add_attempt("0", "Problem 0", [], "Medium", "new")
+    rest = _walk("lc_num", 10, cursor)
+    seen = [int(row["id"]) for row in first] + rest
+    assert len(seen) == len(set(seen)) == 30
+
+
+def test_cursor_from_another_sort_is_rejected(library):
+    _, cursor = db.get_problems_page(sort="lc_num", limit=5)
+    with pytest.raises(ValueError):
+        db.get_problems_page(sort="created", limit=5, cursor=cursor)
+    with pytest.raises(ValueError):
+        db.get_problems_page(sort="lc_num", limit=5, cursor="not-a-cursor")
+
+
+@pytest.mark.parametrize("query", ["limit=ten", "sort=nope", "cursor=broken"])
+def test_bad_page_requests_answer_400(client, query):
+    response = client.get(f"/api/problems?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+def test_route_follows_next_cursor(client, library):
+    seen, cursor = [], ""
+    while cursor is not None:
+        body = client.get("/api/problems", query_string={"sort": "lc_num", "limit": 8, "cursor": cursor}).get_json()
+        seen.extend(item["lc_num"] for item in body["problems"])
+        cursor = body["next_cursor"]
+    assert seen == [str(number) for number in range(1, 31)]
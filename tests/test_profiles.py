@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+import db
+from profiles import ProfileRegistry, UnknownProfileError, normalize_profile_name
+
+
+def test_profiles_keep_separate_libraries(database):
+    db.add_attempt("1", "Two Sum", [], "High", "in the first profile")
+    other = f"{database.name}-other"
+    db.create_profile(other)
+    with db.use_profile(other) as handle:
+        assert db.current_database() is handle
+        assert db.get_problems_page()[0] == []
+        db.add_attempt("2", "Add Two Numbers", [], "Low", "in the second profile")
+    assert [row["lc_num"] for row in db.get_problems_page()[0]] == ["1"]
+    assert handle.db_path != database.db_path
+
+
+def test_unknown_and_invalid_profiles_are_refused(data_dir):
+    with pytest.raises(UnknownProfileError):
+        db.open_profile("missing")
+    with pytest.raises(ValueError):
+        normalize_profile_name("../escape")
+
+
+def _registry(max_open, pinned=()):
+    closed = []
+    lock = threading.Lock()
+
+    def close(handle):
+        with lock:
+            closed.append(handle)
+
+    return ProfileRegistry(lambda name: f"handle:{name}", close, max_open=max_open, pinned=pinned), closed
+
+
+def test_least_recently_used_profile_is_evicted_and_closed():
+    registry, closed = _registry(2, pinned=("default",))
+    registry.get("default")
+    registry.get("a")
+    registry.get("b")
+    assert registry.names() == ["default", "b"]
+    registry.get("c")
+    assert registry.names() == ["default", "c"]
+    registry.close_all()
+    assert closed[:2] == ["handle:a", "handle:b"]
+    assert sorted(closed[2:]) == ["handle:c", "handle:default"]
+    assert registry.evicted == 2
+
+
+def test_held_profiles_are_not_evicted_until_released():
+    registry, closed = _registry(1)
+    registry.get("a", hold=True)
+    registry.get("b")
+    assert registry.names() == ["a"]
+    registry.get("c", hold=True)
+    assert registry.names() == ["a", "c"]
+    registry.release("a")
+    assert registry.names() == ["c"]
+    registry.release("c")
+    registry.close_all()
+    assert sorted(closed) == ["handle:a", "handle:b", "handle:c"]
+
+
+def test_requests_are_served_from_the_selected_profile(client, database):
+    other = f"{database.name}-web"
+    db.create_profile(other)
+    assert client.post("/api/attempts", json={"lc_num": "1", "title": "Two Sum", "notes": "x"}).status_code == 200
+    first = client.get("/api/problems")
+    second = client.get("/api/problems", headers={"X-LC-Profile": other})
+    assert [item["lc_num"] for item in first.get_json()["problems"]] == ["1"]
+    assert second.get_json()["problems"] == []
+    assert first.headers["ETag"] != second.headers["ETag"]
+    assert client.get("/api/problems", headers={"X-LC-Profile": "missing"}).status_code == 404
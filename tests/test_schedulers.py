@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+
+from schedulers import GRADE_RATINGS, SCHEDULERS, MemoryState, StatefulScheduler, create_scheduler
+
+
+def test_only_stateful_schedulers_replay_reviews():
+    for name, cls in SCHEDULERS.items():
+        scheduler = create_scheduler(name)
+        assert scheduler.stateful == isinstance(scheduler, StatefulScheduler)
+        assert hasattr(scheduler, "replay") == scheduler.stateful
+
+
+def test_stateful_scheduler_must_implement_review():
+    class Incomplete(StatefulScheduler):
+        name = "incomplete"
+
+        def initial(self, rating, importance):
+            return MemoryState(1.0, 1.0, 1, 0, 1)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("name", [name for name, cls in SCHEDULERS.items() if issubclass(cls, StatefulScheduler)])
+def test_replay_grows_intervals_on_good_reviews(name):
+    scheduler = create_scheduler(name)
+    good = GRADE_RATINGS["good"]
+    state, last_day = scheduler.replay([(0, good), (3, good), (12, good)], "Medium")
+    assert last_day == 12
+    assert state.interval > 1
+    assert scheduler.replay([], "Medium") is None
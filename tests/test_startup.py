@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from bench import IMPORT_BUDGET_MS, READY_BUDGET_MS
+
+ROOT = Path(__file__).resolve().parent.parent
+RUNS = 3
+
+STARTUP_PROBE = """
+import sys, time
+started = time.perf_counter()
+import web_app
+imported = time.perf_counter()
+import db
+db.init_db()
+ready = time.perf_counter()
+print((imported - started) * 1000, (ready - started) * 1000, "markdown" in sys.modules)
+"""
+
+
+def _probe(data_dir, profile):
+    env = {**os.environ, "LC_TRACKER_DATA_DIR": str(data_dir), "LC_TRACKER_DEFAULT_PROFILE": profile}
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True, timeout=30
+    ).stdout.split()
+    return float(output[0]), float(output[1]), output[2] == "True"
+
+
+def test_import_and_init_stay_within_budget(data_dir, profile_name):
+    runs = [_probe(data_dir, profile_name) for _ in range(RUNS)]
+    assert not any(markdown for _, _, markdown in runs), "markdown is imported at startup"
+    assert statistics.median(imported for imported, _, _ in runs) <= IMPORT_BUDGET_MS
+    assert statistics.median(ready for _, ready, _ in runs) <= READY_BUDGET_MS
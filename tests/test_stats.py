@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, timedelta
+
+import db
+
+
+def _day(offset):
+    return (date.today() - timedelta(days=offset)).isoformat()
+
+
+def test_maintained_aggregates_match_a_recompute(database):
+    db.add_attempt("1", "Two Sum", ["Array", "hash/map"], "High", "hash map", attempt_at=_day(40))
+    db.add_attempt("1", "Two Sum", ["Array"], "Low", "again", attempt_at=_day(3))
+    db.add_attempt("2", "Add Two Numbers", ["linked list"], "Medium", "carry", attempt_at=_day(1))
+    db.add_attempt("3", "Longest Substring", [], "Critical", "window", attempt_at=_day(0))
+    assert db.check_dashboard_stats() == []
+
+    db.mark_review(1, "good")
+    db.mark_reviews([{"problem_id": 2, "grade": "again"}, {"problem_id": 3, "grade": "easy"}])
+    db.snooze_problem(2, _day(-3))
+    db.rename_tag("hash/map", "hashing")
+    assert db.check_dashboard_stats() == []
+
+    attempts = db.get_attempts(1)
+    db.update_attempt(int(attempts[0]["id"]), "edited")
+    db.delete_attempt(int(attempts[-1]["id"]))
+    db.delete_problem(3)
+    assert db.check_dashboard_stats() == []
+
+    result = db.import_attempts(
+        (row, {"lc_num": str(row % 7), "title": f"Imported {row}", "notes": "n", "attempt_at": _day(row % 20)})
+        for row in range(1, 2501)
+    )
+    assert result["imported"] == 2500
+    assert db.check_dashboard_stats() == []
+
+    totals = db.get_dashboard_summary()["totals"]
+    assert (totals["problems"], totals["attempts"], totals["reviews"]) == (7, 2502, 1)
+
+
+def test_repair_restores_drifted_counters(database):
+    db.add_attempt("1", "Two Sum", [], "High", "hash map")
+    conn = sqlite3.connect(database.db_path)
+    with conn:
+        conn.execute("UPDATE stat_counters SET value = value + 5")
+    conn.close()
+    assert db.check_dashboard_stats()
+    assert db.check_dashboard_stats(fix=True)
+    assert db.check_dashboard_stats() == []
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from writer import WriteQueue, writes
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FORK_PROBE = """
+import os, threading
+import wsgi
+import db
+
+print(threading.active_count(), flush=True)
+pid = os.fork()
+if pid == 0:
+    try:
+        db.add_tag.submit("Forked").result(timeout=10)
+        os._exit(0 if "Forked" in db.get_tags() else 2)
+    except BaseException:
+        os._exit(1)
+_, status = os.waitpid(pid, 0)
+print(os.waitstatus_to_exitcode(status))
+"""
+
+
+@pytest.fixture
+def queue(tmp_path):
+    path = tmp_path / "writer.db"
+    setup = sqlite3.connect(path)
+    setup.execute("CREATE TABLE items (name TEXT UNIQUE NOT NULL)")
+    setup.close()
+    commits = []
+    write_queue = WriteQueue(
+        lambda: sqlite3.connect(path, isolation_level=None),
+        window_seconds=0.2,
+        after_commit=lambda: commits.append(True),
+    )
+    write_queue.path = path
+    write_queue.commits = commits
+    yield write_queue
+    write_queue.close()
+
+
+def _names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM items"))
+    finally:
+        conn.close()
+
+
+def _insert(cur, name):
+    cur.execute("INSERT INTO items (name) VALUES (?)", (name,))
+    return name
+
+
+def _insert_then_fail(cur, name):
+    cur.execute("INSERT INTO items (name) VALUES (?)", (name,))
+    raise ValueError("rejected")
+
+
+def test_failed_job_rolls_back_only_its_savepoint(queue):
+    futures = [
+        queue.submit(_insert, "a"),
+        queue.submit(_insert_then_fail, "b"),
+        queue.submit(_insert, "a"),
+        queue.submit(_insert, "c"),
+    ]
+    assert futures[0].result() == "a"
+    with pytest.raises(ValueError):
+        futures[1].result()
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[2].result()
+    assert futures[3].result() == "c"
+    assert _names(queue.path) == ["a", "c"]
+    assert (queue.batches, queue.committed) == (1, 2)
+
+
+def test_concurrent_writes_share_one_commit(queue):
+    insert = writes(queue)(_insert)
+    start = threading.Barrier(8)
+
+    def write(index):
+        start.wait()
+        insert(f"item-{index}")
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(_names(queue.path)) == 8
+    assert queue.committed == 8
+    assert queue.batches < 8
+    assert len(queue.commits) == queue.batches
+
+
+def test_nested_write_runs_inline_on_the_writer(queue):
+    def outer(cur):
+        _insert(cur, "outer")
+        return queue.submit(_insert, "inner").result(timeout=1)
+
+    assert queue.submit(outer).result(timeout=5) == "inner"
+    assert _names(queue.path) == ["inner", "outer"]
+
+
+def test_closed_queue_rejects_jobs(queue):
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit(_insert, "late")
+
+
+def test_forked_worker_writes_after_preloaded_startup(tmp_path):
+    env = {**os.environ, "LC_TRACKER_DATA_DIR": str(tmp_path)}
+    result = subprocess.run(
+        [sys.executable, "-c", FORK_PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["1", "0"]
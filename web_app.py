@@ -1,30 +1,129 @@
 from __future__ import annotations
 
+import html
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
 from datetime import date, datetime
-from typing import Any, Dict, List
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List
 
-from flask import Flask, jsonify, render_template, request
-from markdown import markdown as md_to_html
+import click
+from flask import Flask, Response, g, jsonify, render_template, request
+from flask.json.provider import DefaultJSONProvider
 
+from backup import BackupError
+from caching import ResponseCache, versioned_get
+from changes import DEFAULT_CHANGE_LIMIT
 from db import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_PROFILE,
     add_attempt,
     add_tag,
+    backup_db,
+    bind_profile,
+    change_generation,
+    check_dashboard_stats,
+    close_profile,
+    create_profile,
+    current_database,
     delete_attempt,
     delete_problem,
+    ensure_ready,
+    export_snapshot,
     get_attempts,
+    get_changes,
+    get_data_version,
     get_due_reviews,
     get_dashboard_summary,
     get_problem_detail,
-    get_problems,
+    get_problems_page,
+    get_readiness,
+    get_review_forecast,
+    get_review_schedule,
+    get_schema_plan,
+    get_scheduler,
+    get_tag_names,
+    get_tag_stats,
     get_tags,
+    import_attempts,
     init_db,
+    iter_export,
+    list_backups,
+    list_profiles,
     mark_review,
+    mark_reviews,
+    migrate,
+    open_profile,
+    open_profile_names,
+    optimize_scheduler,
+    pin_connection,
+    rebuild_scheduler_state,
+    rebuild_search,
     rename_tag,
+    rerender_notes,
+    restore_backup,
     snooze_problem,
+    store_rendered_notes,
+    stream_in_profile,
+    unbind_profile,
+    unpin_connection,
     update_attempt,
+    wait_for_changes,
 )
+from export import EXPORT_FORMATS, EXPORT_MIMETYPES, EXPORT_TABLES, csv_chunks, file_chunks, jsonl_chunks, resolve_tables
+from importer import IMPORT_FORMATS, detect_format, iter_records
+import metrics
+from notes import render_key, render_notes
+from profiler import SamplingProfiler
+from schedule import DUE_SOON_DAYS, FORECAST_DAYS, MAX_FORECAST_DAYS
+from search import SNIPPET_END, SNIPPET_START
+from wire import (
+    COLUMNS_FORMAT,
+    COLUMNS_MIMETYPE,
+    DAY_EPOCH,
+    IMPORTANCE_LEVELS,
+    compress_response,
+    day_ordinal,
+    wants_columns,
+)
+
+
+def _profile_version() -> Hashable:
+    return current_database().name, get_data_version()
+
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+response_cache = ResponseCache()
+cached_get = versioned_get(response_cache, _profile_version)
+profiler = SamplingProfiler()
+
+PROFILE_PARAM = "profile"
+PROFILE_HEADER = "X-LC-Profile"
+PROFILE_COOKIE = "lc_profile"
+PROFILE_COOKIE_MAX_AGE = 365 * 24 * 3600
+MAX_RELATED_TAGS = 50
+MAX_DUE_REVIEWS = 5
+MAX_METRICS_LIMIT = 500
+UNPREPARED_ENDPOINTS = {"static", "api_ready"}
+PROFILE_AT_START = os.environ.get("LC_TRACKER_PROFILE", "").strip().lower() in {"1", "true", "yes", "on"}
+DIAGNOSTICS_ENABLED = metrics.ENABLED or PROFILE_AT_START
+LOOPBACK_ADDRESSES = {"127.0.0.1", "::1"}
+
+CHANGE_POLL_SECONDS = 1.0
+CHANGE_KEEPALIVE_SECONDS = 15.0
+CHANGE_STREAM_SECONDS = float(os.environ.get("LC_TRACKER_CHANGE_STREAM_SECONDS", "300"))
+CHANGE_RETRY_MS = 2000
+CHANGE_STREAM_LIMIT = int(
+    os.environ.get("LC_TRACKER_CHANGE_STREAMS", max(1, int(os.environ.get("LC_TRACKER_THREADS", "4")) // 2))
+)
+CHANGE_STREAM_BUSY_SECONDS = 60
+change_stream_slots = threading.BoundedSemaphore(max(1, CHANGE_STREAM_LIMIT))
 
 IMPORTANCE_ALIASES = {
     "critical": "High",
@@ -53,11 +152,18 @@ def _normalize_importance(value: str | None) -> str:
     return "Medium"
 
 
+def _snippet_html(value: str | None) -> str | None:
+    if not value:
+        return None
+    escaped = html.escape(value)
+    return escaped.replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+
 def _problem_payload(row) -> Dict[str, Any]:
     tags = []
     if row["tags"]:
         tags = [t.strip() for t in row["tags"].split(",") if t.strip()]
-    return {
+    payload = {
         "id": row["id"],
         "lc_num": row["lc_num"],
         "title": row["title"],
@@ -71,27 +177,241 @@ def _problem_payload(row) -> Dict[str, Any]:
         "attempt_count": row["attempt_count"],
         "days_since": _days_since(row["last_attempt_at"]),
     }
+    if "snippet" in row.keys():
+        payload["snippet_html"] = _snippet_html(row["snippet"])
+    return payload
+
+
+def _problem_columns(rows) -> Dict[str, Any]:
+    keys = rows[0].keys() if rows else ["frequency", "tags", "snippet"]
+    columns = dict(zip(keys, map(list, zip(*rows)))) if rows else {key: [] for key in keys}
+    tags = json.loads("[" + ",".join(columns["tags"]) + "]")
+    levels = {value: IMPORTANCE_LEVELS.index(_normalize_importance(value)) for value in set(columns["frequency"])}
+    payload = {
+        name: columns.get(name, [])
+        for name in (
+            "id",
+            "lc_num",
+            "title",
+            "created_at",
+            "last_attempt_at",
+            "last_review_at",
+            "snooze_until",
+            "review_count",
+            "attempt_count",
+        )
+    }
+    payload["tags"] = tags
+    payload["importance"] = [levels[value] for value in columns["frequency"]]
+    if any(columns["snippet"]):
+        payload["snippet_html"] = [_snippet_html(value) for value in columns["snippet"]]
+    return {
+        "format": COLUMNS_FORMAT,
+        "epoch": DAY_EPOCH.isoformat(),
+        "today": day_ordinal(date.today()),
+        "count": len(rows),
+        "dictionaries": {
+            "tags": {str(tag_id): name for tag_id, name in get_tag_names({i for ids in tags for i in ids}).items()},
+            "importance": list(IMPORTANCE_LEVELS),
+        },
+        "columns": payload,
+    }
 
 
-def _attempt_payload(row) -> Dict[str, Any]:
+def _changes_payload(changes: Dict[str, Any]) -> Dict[str, Any]:
     return {
-        "id": row["id"],
-        "attempt_at": row["attempt_at"],
-        "notes": row["notes"],
-        "notes_html": md_to_html(row["notes"], extensions=["extra", "sane_lists"]),
+        **changes,
+        "problems": [_problem_payload(row) for row in changes["problems"]],
+        "tags": [{"id": row["id"], "name": row["name"], "parent_id": row["parent_id"]} for row in changes["tags"]],
     }
 
 
+def _parse_since(value: str | None) -> int | None:
+    if value is None or not value.strip():
+        return None
+    since = int(value)
+    if since < 0:
+        raise ValueError("since must not be negative")
+    return since
+
+
+def _int_arg(name: str, default: int, minimum: int, maximum: int) -> int:
+    value = request.args.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if not minimum <= number <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return number
+
+
+def _change_events(since: int | None, limit: int) -> Iterator[str]:
+    yield f"retry: {CHANGE_RETRY_MS}\n\n"
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < CHANGE_STREAM_SECONDS:
+        generation = change_generation()
+        changes = get_changes(since, limit)
+        if changes["reset"] or changes["seq"] != since:
+            since = changes["seq"]
+            last_sent = time.monotonic()
+            data = json.dumps(_changes_payload(changes), separators=(",", ":"))
+            yield f"id: {since}\nevent: changes\ndata: {data}\n\n"
+            if changes["more"]:
+                continue
+        elif time.monotonic() - last_sent >= CHANGE_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        wait_for_changes(generation, CHANGE_POLL_SECONDS)
+
+
+def _attempt_payloads(rows) -> List[Dict[str, Any]]:
+    payloads = []
+    stale = []
+    for row in rows:
+        notes_html = row["notes_html"]
+        key = render_key(row["notes"])
+        if notes_html is None or row["notes_render_key"] != key:
+            notes_html = render_notes(row["notes"])
+            stale.append((row["id"], notes_html, key))
+        payloads.append(
+            {
+                "id": row["id"],
+                "attempt_at": row["attempt_at"],
+                "notes": row["notes"],
+                "notes_html": notes_html,
+            }
+        )
+    store_rendered_notes(stale)
+    return payloads
+
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    @metrics.instrument("json")
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        return super().response(*args, **kwargs)
+
+
+if metrics.ENABLED:
+    app.json = _TimedJSONProvider(app)
+
+    @app.before_request
+    def _begin_metrics():
+        metrics.begin_request()
+
+    @app.after_request
+    def _end_metrics(response: Response):
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        timings = metrics.end_request(f"{request.method} {rule}")
+        if timings is not None:
+            response.headers["Server-Timing"] = metrics.server_timing(timings)
+        return response
+
+
+if PROFILE_AT_START:
+    profiler.start()
+
+
+@app.after_request
+def _compress_response(response: Response):
+    return compress_response(response)
+
+
+def _requested_profile() -> str | None:
+    return (
+        request.args.get(PROFILE_PARAM)
+        or request.headers.get(PROFILE_HEADER)
+        or request.cookies.get(PROFILE_COOKIE)
+        or None
+    )
+
+
+@app.before_request
+def _select_profile():
+    try:
+        database = open_profile(_requested_profile())
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except LookupError as exc:
+        return jsonify({"error": str(exc)}), 404
+    g.profile = database
+    g.profile_token = bind_profile(database)
+    if request.endpoint not in UNPREPARED_ENDPOINTS:
+        ensure_ready()
+
+
+@app.after_request
+def _remember_profile(response: Response):
+    response.vary.update(("Cookie", PROFILE_HEADER))
+    database = g.get("profile")
+    if database is not None and request.args.get(PROFILE_PARAM) and response.status_code < 400:
+        response.set_cookie(
+            PROFILE_COOKIE, database.name, max_age=PROFILE_COOKIE_MAX_AGE, httponly=True, samesite="Lax"
+        )
+    return response
+
+
+@app.teardown_request
+def _release_profile(exc):
+    token = g.pop("profile_token", None)
+    if token is not None:
+        unbind_profile(token)
+    database = g.pop("profile", None)
+    if database is not None:
+        close_profile(database)
+
+
+@app.before_request
+def _pin_db_connection():
+    pin_connection()
+
+
+@app.teardown_request
+def _unpin_db_connection(exc):
+    unpin_connection()
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
+@app.get("/api/ready")
+def api_ready():
+    readiness = get_readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+
+@app.get("/api/profiles")
+def api_profiles():
+    return jsonify(
+        {
+            "current": g.profile.name,
+            "default": DEFAULT_PROFILE,
+            "profiles": list_profiles(),
+            "open": open_profile_names(),
+        }
+    )
+
+
 @app.get("/api/tags")
+@cached_get
 def api_tags():
     return jsonify({"tags": get_tags()})
 
 
+@app.get("/api/tags/stats")
+@cached_get
+def api_tag_stats():
+    try:
+        related = _int_arg("related", 5, 0, MAX_RELATED_TAGS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"tags": get_tag_stats(related)})
+
+
 @app.post("/api/tags")
 def api_add_tag():
     data = request.get_json(force=True)
@@ -114,15 +434,59 @@ def api_rename_tag():
 
 
 @app.get("/api/problems")
+@cached_get
 def api_problems():
     search = request.args.get("search", "")
     tags = request.args.get("tags", "")
     tag_list = [t for t in tags.split(",") if t.strip()]
-    rows = get_problems(search, tag_list)
-    return jsonify({"problems": [_problem_payload(r) for r in rows]})
+    tag_match = (request.args.get("match") or "any").strip().lower()
+    sort = request.args.get("sort", "last_attempt")
+    cursor = request.args.get("cursor") or None
+    try:
+        compact = wants_columns(request)
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        rows, next_cursor = get_problems_page(search, tag_list, sort, limit, cursor, tag_match, compact)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if compact:
+        body = json.dumps({**_problem_columns(rows), "next_cursor": next_cursor}, separators=(",", ":"))
+        return Response(body, mimetype=COLUMNS_MIMETYPE)
+    return jsonify({"problems": [_problem_payload(r) for r in rows], "next_cursor": next_cursor})
+
+
+@app.get("/api/changes")
+def api_changes():
+    try:
+        since = _parse_since(request.args.get("since"))
+        limit = int(request.args.get("limit", DEFAULT_CHANGE_LIMIT))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(_changes_payload(get_changes(since, limit)))
+
+
+@app.get("/api/changes/stream")
+def api_change_stream():
+    try:
+        since = _parse_since(request.headers.get("Last-Event-ID") or request.args.get("since"))
+        limit = int(request.args.get("limit", DEFAULT_CHANGE_LIMIT))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if not change_stream_slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many open change streams; poll /api/changes instead"})
+        response.headers["Retry-After"] = str(CHANGE_STREAM_BUSY_SECONDS)
+        return response, 503
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    try:
+        response = Response(stream_in_profile(_change_events(since, limit)), mimetype="text/event-stream", headers=headers)
+    except BaseException:
+        change_stream_slots.release()
+        raise
+    response.call_on_close(change_stream_slots.release)
+    return response
 
 
 @app.get("/api/problems/<int:problem_id>")
+@cached_get
 def api_problem_detail(problem_id: int):
     row = get_problem_detail(problem_id)
     if not row:
@@ -137,17 +501,42 @@ def api_problem_detail(problem_id: int):
         "days_since": _days_since(row["last_attempt_at"]),
     }
     attempts = get_attempts(problem_id)
-    return jsonify({"detail": detail, "attempts": [_attempt_payload(a) for a in attempts]})
+    return jsonify({"detail": detail, "attempts": _attempt_payloads(attempts)})
 
 
 @app.get("/api/reviews")
+@cached_get
 def api_reviews():
-    limit = int(request.args.get("limit", 3))
+    try:
+        limit = _int_arg("limit", 3, 1, MAX_DUE_REVIEWS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     rows = get_due_reviews(limit)
     return jsonify({"reviews": [_problem_payload(r) for r in rows]})
 
 
+@app.get("/api/reviews/schedule")
+@cached_get
+def api_review_schedule():
+    try:
+        soon_days = _int_arg("soon_days", DUE_SOON_DAYS, 1, MAX_FORECAST_DAYS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(get_review_schedule(soon_days))
+
+
+@app.get("/api/reviews/forecast")
+@cached_get
+def api_review_forecast():
+    try:
+        days = _int_arg("days", FORECAST_DAYS, 1, MAX_FORECAST_DAYS)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(get_review_forecast(days))
+
+
 @app.get("/api/dashboard")
+@cached_get
 def api_dashboard():
     return jsonify(get_dashboard_summary())
 
@@ -160,6 +549,21 @@ def api_mark_review(problem_id: int):
     return jsonify({"ok": True})
 
 
+@app.post("/api/reviews/batch")
+def api_mark_reviews():
+    data = request.get_json(force=True)
+    reviews = data.get("reviews") if isinstance(data, dict) else data
+    if not isinstance(reviews, list) or not all(isinstance(review, dict) for review in reviews):
+        return jsonify({"ok": False, "error": "Expected a list of reviews"}), 400
+    try:
+        limit = _int_arg("limit", 3, 1, MAX_DUE_REVIEWS)
+        applied = mark_reviews(reviews)
+    except ValueError as exc:
+        return jsonify({"ok": False, "error": str(exc)}), 400
+    rows = get_due_reviews(limit)
+    return jsonify({"ok": True, "applied": applied, "reviews": [_problem_payload(r) for r in rows]})
+
+
 @app.post("/api/reviews/<int:problem_id>/snooze")
 def api_snooze_review(problem_id: int):
     data = request.get_json(force=True)
@@ -190,6 +594,100 @@ def api_add_attempt():
     return jsonify({"ok": True})
 
 
+@app.post("/api/import")
+def api_import():
+    upload = request.files.get("file")
+    filename = upload.filename if upload else None
+    content_type = upload.mimetype if upload else request.content_type
+    fmt = (request.args.get("format") or "").strip().lower() or detect_format(filename, content_type)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"ok": False, "error": "Unknown import format; use format=csv or format=jsonl"}), 400
+    raw = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    result = import_attempts(iter_records(stream, fmt))
+    return jsonify({"ok": True, **result})
+
+
+def _export_chunks(fmt: str, tables: List[str]) -> Iterator[str]:
+    if fmt == "csv":
+        if len(tables) != 1:
+            raise ValueError("CSV export needs exactly one table")
+        return csv_chunks(tables[0], iter_export(tables))
+    return jsonl_chunks(iter_export(tables))
+
+
+def _snapshot_chunks(path: Path) -> Iterator[bytes]:
+    try:
+        yield from file_chunks(path)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+@app.get("/api/export")
+def api_export():
+    fmt = (request.args.get("format") or "jsonl").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown export format: {fmt}"}), 400
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if fmt == "sqlite":
+        handle, name = tempfile.mkstemp(prefix="lc_tracker_export_", suffix=".db")
+        os.close(handle)
+        path = export_snapshot(Path(name))
+        headers = {
+            "Content-Disposition": f'attachment; filename="lc_tracker_{stamp}.db"',
+            "Content-Length": str(path.stat().st_size),
+        }
+        return Response(_snapshot_chunks(path), mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
+    try:
+        tables = resolve_tables(request.args.get("tables", "").split(","))
+        chunks = stream_in_profile(_export_chunks(fmt, tables))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    suffix = f"{tables[0]}_{stamp}" if fmt == "csv" else stamp
+    headers = {"Content-Disposition": f'attachment; filename="lc_tracker_{suffix}.{fmt}"'}
+    return Response(chunks, mimetype=EXPORT_MIMETYPES[fmt], headers=headers)
+
+
+def _loopback_only(view: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if request.remote_addr not in LOOPBACK_ADDRESSES:
+            return jsonify({"error": "Not found"}), 404
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+if DIAGNOSTICS_ENABLED:
+
+    @app.get("/api/_metrics")
+    @_loopback_only
+    def api_metrics():
+        try:
+            limit = _int_arg("limit", 25, 1, MAX_METRICS_LIMIT)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({**metrics.snapshot(limit), "profile": profiler.report(limit)})
+
+    @app.delete("/api/_metrics")
+    @_loopback_only
+    def api_reset_metrics():
+        metrics.reset()
+        profiler.reset()
+        return jsonify({"ok": True})
+
+    @app.post("/api/_metrics/profile")
+    @_loopback_only
+    def api_toggle_profiler():
+        data = request.get_json(silent=True) or {}
+        if data.get("enabled", True):
+            interval_ms = data.get("interval_ms")
+            profiler.start(float(interval_ms) / 1000 if interval_ms else None)
+        else:
+            profiler.stop()
+        return jsonify({"ok": True, "running": profiler.running})
+
+
 @app.patch("/api/attempts/<int:attempt_id>")
 def api_update_attempt(attempt_id: int):
     data = request.get_json(force=True)
@@ -212,6 +710,216 @@ def api_delete_problem(problem_id: int):
     return jsonify({"ok": True})
 
 
+def _profile_command(command: Callable[..., Any]) -> Callable[..., Any]:
+    @click.option("--profile", "profile_name", help="Profile to use; defaults to LC_TRACKER_DEFAULT_PROFILE.")
+    @wraps(command)
+    def wrapper(*args: Any, profile_name: str | None = None, **kwargs: Any) -> Any:
+        try:
+            database = open_profile(profile_name)
+        except (LookupError, ValueError) as exc:
+            raise click.ClickException(str(exc)) from exc
+        token = bind_profile(database)
+        try:
+            return command(*args, **kwargs)
+        finally:
+            unbind_profile(token)
+            close_profile(database)
+
+    return wrapper
+
+
+@app.cli.command("create-profile")
+@click.argument("name")
+def cli_create_profile(name: str):
+    """Create an empty profile with its own database and backups."""
+    try:
+        database = create_profile(name)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(f"Profile {database.name} ready at {database.db_path}")
+
+
+@app.cli.command("list-profiles")
+def cli_list_profiles():
+    """List profiles; the default one is marked with an asterisk."""
+    for name in list_profiles():
+        click.echo(f"{'*' if name == DEFAULT_PROFILE else ' '} {name}")
+
+
+@app.cli.command("migrate")
+@_profile_command
+@click.option("--plan", is_flag=True, help="List pending migrations without running them.")
+@click.option("--dry-run", is_flag=True, help="Run pending migrations in a transaction, time them, then roll back.")
+def cli_migrate(plan: bool, dry_run: bool):
+    """Bring the database schema up to date."""
+    try:
+        schema = get_schema_plan()
+        if plan:
+            click.echo(f"Schema version {schema['version']} of {schema['latest']}.")
+            for step in schema["pending"]:
+                click.echo(f"  {step['version']:>3}  {step['name']}")
+            return
+        steps = migrate(dry_run=dry_run)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    for step in steps:
+        click.echo(f"  {step['version']:>3}  {step['name']:<40} {step['seconds'] * 1000:>9.1f} ms")
+    if not steps:
+        click.echo(f"Schema version {schema['version']} is up to date.")
+    elif dry_run:
+        click.echo(f"Dry run: {len(steps)} migrations rolled back; schema stays at version {schema['version']}.")
+    else:
+        click.echo(f"Migrated to schema version {steps[-1]['version']}.")
+
+
+@app.cli.command("rebuild-search")
+@_profile_command
+def cli_rebuild_search():
+    """Rebuild the full-text search index."""
+    init_db()
+    count = rebuild_search()
+    click.echo(f"Indexed {count} problems.")
+
+
+@app.cli.command("rerender-notes")
+@_profile_command
+@click.option("--force", is_flag=True, help="Re-render every note, not only stale ones.")
+def cli_rerender_notes(force: bool):
+    """Re-render cached note HTML after the Markdown setup changes."""
+    init_db()
+    count = rerender_notes(force=force)
+    click.echo(f"Rendered {count} notes.")
+
+
+@app.cli.command("check-stats")
+@_profile_command
+@click.option("--fix", is_flag=True, help="Rebuild the dashboard aggregates if they drifted.")
+def cli_check_stats(fix: bool):
+    """Compare dashboard aggregates with the base tables."""
+    init_db()
+    problems = check_dashboard_stats(fix=fix)
+    for problem in problems:
+        click.echo(problem)
+    if not problems:
+        click.echo("Dashboard aggregates are consistent.")
+    elif fix:
+        click.echo("Rebuilt dashboard aggregates.")
+    else:
+        raise SystemExit(1)
+
+
+@app.cli.command("import-attempts")
+@_profile_command
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--format", "fmt", type=click.Choice(IMPORT_FORMATS), help="Defaults to the file extension.")
+def cli_import_attempts(path: Path, fmt: str | None):
+    """Bulk import attempts from a CSV or JSONL file in one transaction."""
+    fmt = fmt or detect_format(path.name)
+    if fmt is None:
+        raise click.ClickException("Cannot tell the format from the file name; pass --format.")
+    init_db()
+    with path.open(encoding="utf-8-sig", newline="") as stream:
+        result = import_attempts(iter_records(stream, fmt))
+    for error in result["errors"]:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(
+        f"Imported {result['imported']} attempts ({result['problems_created']} new problems, "
+        f"{result['error_count']} rejected) in {result['seconds']}s, {result['rows_per_second']} rows/s."
+    )
+
+
+@app.cli.command("export")
+@_profile_command
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="jsonl", show_default=True)
+@click.option("--table", "tables", multiple=True, type=click.Choice(list(EXPORT_TABLES)), help="Repeat to pick tables; defaults to all.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, path_type=Path), help="Defaults to stdout.")
+def cli_export(fmt: str, tables: tuple, output: Path | None):
+    """Stream the library as JSONL or CSV, or write a point-in-time SQLite snapshot."""
+    init_db()
+    if fmt == "sqlite":
+        if output is None:
+            raise click.ClickException("A SQLite snapshot needs --output.")
+        export_snapshot(output)
+        click.echo(f"Snapshot written to {output}", err=True)
+        return
+    try:
+        chunks = _export_chunks(fmt, resolve_tables(tables))
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    handle = output.open("w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        for chunk in chunks:
+            handle.write(chunk)
+    finally:
+        if output:
+            handle.close()
+
+
+@app.cli.command("rebuild-scheduler-state")
+@_profile_command
+def cli_rebuild_scheduler_state():
+    """Replay the review history through the active scheduler and refresh due dates."""
+    init_db()
+    count = rebuild_scheduler_state()
+    click.echo(f"Scheduler {get_scheduler().name}: rebuilt state for {count} problems.")
+
+
+@app.cli.command("optimize-scheduler")
+@_profile_command
+@click.option("--max-seconds", type=float, default=10.0, show_default=True, help="Time budget for the fit.")
+@click.option("--apply/--dry-run", default=True, show_default=True, help="Save the fitted FSRS parameters.")
+@click.option("--seed", type=int, help="Seed the mini-batch sampler for a reproducible fit.")
+def cli_optimize_scheduler(max_seconds: float, apply: bool, seed: int | None):
+    """Fit FSRS parameters to the attempt and review history."""
+    init_db()
+    try:
+        result = optimize_scheduler(max_seconds, apply, seed)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(
+        f"{result['events']} events, {result['reviews']} reviews over {result['sequences']} problems "
+        f"(loaded in {result['load_seconds']}s, {result['iterations']} iterations, {result['seconds']}s total)."
+    )
+    click.echo(f"Log loss {result['loss_before']:.4f} -> {result['loss_after']:.4f}")
+    click.echo("Parameters: " + ", ".join(f"{value:.4f}" for value in result["params"]))
+    if result["applied"]:
+        click.echo("Saved the fitted parameters.")
+    elif not result["improved"]:
+        click.echo("The fit did not improve on the current parameters; nothing saved.")
+    else:
+        click.echo("Dry run; nothing saved.")
+
+
+@app.cli.command("backup")
+@_profile_command
+def cli_backup():
+    """Write a backup of the database now."""
+    path = backup_db(wait=True)
+    click.echo(f"Backup written to {path}" if path else "Nothing to back up.")
+
+
+@app.cli.command("list-backups")
+@_profile_command
+def cli_list_backups():
+    """List backups, newest first."""
+    for path in list_backups():
+        click.echo(str(path))
+
+
+@app.cli.command("restore-backup")
+@_profile_command
+@click.argument("backup_path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def cli_restore_backup(backup_path: Path):
+    """Verify a backup with PRAGMA integrity_check and restore it."""
+    try:
+        restore_backup(backup_path)
+    except BackupError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(f"Restored {backup_path}")
+
+
 if __name__ == "__main__":
     init_db()
-    app.run(host="127.0.0.1", port=5123, debug=True)
+    host, _, port = os.environ.get("LC_TRACKER_BIND", "127.0.0.1:5123").rpartition(":")
+    debug = os.environ.get("LC_TRACKER_DEBUG", "").strip().lower() in {"1", "true", "yes", "on"}
+    app.run(host=host or "127.0.0.1", port=int(port), debug=debug)
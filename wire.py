@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import gzip
+from datetime import date
+from typing import Optional
+
+from flask import Request, Response, request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNS_FORMAT = "columns"
+COLUMNS_MIMETYPE = "application/vnd.lc-tracker.columns+json"
+DAY_EPOCH = date(1970, 1, 1)
+IMPORTANCE_LEVELS = ("High", "Medium", "Low")
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/javascript", "image/svg+xml")
+
+
+def wants_columns(req: Request) -> bool:
+    requested = (req.args.get("format") or "").strip().lower()
+    if requested:
+        if requested not in {COLUMNS_FORMAT, "json"}:
+            raise ValueError(f"Unknown format: {requested}")
+        return requested == COLUMNS_FORMAT
+    return req.accept_mimetypes.best_match(["application/json", COLUMNS_MIMETYPE]) == COLUMNS_MIMETYPE
+
+
+def day_ordinal(value: date) -> int:
+    return (value - DAY_EPOCH).days
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES or mimetype.endswith("+json")
+
+
+def accepted_encoding() -> Optional[str]:
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+@metrics.instrument("compress")
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response: Response, encoding: Optional[str] = None) -> Response:
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not _compressible(response.mimetype or "")
+    ):
+        return response
+    encoding = encoding or accepted_encoding()
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import contextvars
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, Union
+
+from connection import retry_locked
+
+DEFAULT_WINDOW_SECONDS = 0.0
+DEFAULT_MAX_BATCH = 64
+
+
+class _Job(NamedTuple):
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    dirty: bool
+    future: Future
+    context: contextvars.Context
+    transaction: bool
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        before_commit: Optional[Callable[[sqlite3.Cursor], None]] = None,
+        after_commit: Optional[Callable[[], None]] = None,
+        retries: int = 5,
+        retry_delay: float = 0.05,
+    ) -> None:
+        self.connect = connect
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.max_batch = max(1, int(max_batch))
+        self.before_commit = before_commit
+        self.after_commit = after_commit
+        self._begin = retry_locked(retries, retry_delay)(self._begin_immediate)
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._closed = False
+        self.batches = 0
+        self.committed = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self.enqueue(fn, args, kwargs)
+
+    def enqueue(
+        self,
+        fn: Callable[..., Any],
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        dirty: bool = True,
+        transaction: bool = True,
+    ) -> Future:
+        kwargs = kwargs or {}
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            try:
+                future.set_result(fn(self._conn.cursor(), *args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed")
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="lc-tracker-writer", daemon=True)
+                self._thread.start()
+            self._jobs.put(_Job(fn, args, kwargs, dirty, future, contextvars.copy_context(), transaction))
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._jobs.put(None)
+            thread.join(timeout=30)
+
+    def _collect(self, first: _Job) -> Tuple[List[_Job], Optional[_Job]]:
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._jobs.put(None)
+                break
+            if not job.transaction:
+                return batch, job
+            batch.append(job)
+        return batch, None
+
+    def _worker(self) -> None:
+        pending: Optional[_Job] = None
+        try:
+            while True:
+                job = pending or self._jobs.get()
+                pending = None
+                if job is None:
+                    return
+                if not job.transaction:
+                    self._run_alone(job)
+                    continue
+                batch, pending = self._collect(job)
+                self._run(batch)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _run_alone(self, job: _Job) -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            if self._conn is None:
+                self._conn = self.connect()
+            result = job.context.run(job.fn, self._conn.cursor(), *job.args, **job.kwargs)
+        except Exception as exc:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            job.future.set_exception(exc)
+            return
+        job.future.set_result(result)
+        if job.dirty and self.after_commit is not None:
+            self.after_commit()
+
+    def _begin_immediate(self, conn: sqlite3.Connection) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+
+    def _run(self, batch: List[_Job]) -> None:
+        done = []
+        dirty = False
+        try:
+            if self._conn is None:
+                self._conn = self.connect()
+            conn = self._conn
+            self._begin(conn)
+            cur = conn.cursor()
+            for job in batch:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                cur.execute("SAVEPOINT write_job")
+                try:
+                    result = job.context.run(job.fn, cur, *job.args, **job.kwargs)
+                except Exception as exc:
+                    cur.execute("ROLLBACK TO write_job")
+                    cur.execute("RELEASE write_job")
+                    job.future.set_exception(exc)
+                    continue
+                cur.execute("RELEASE write_job")
+                done.append((job, result))
+                dirty = dirty or job.dirty
+            if dirty and self.before_commit is not None:
+                self.before_commit(cur)
+            conn.commit()
+        except Exception as exc:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            return
+        self.batches += 1
+        self.committed += len(done)
+        for job, result in done:
+            job.future.set_result(result)
+        if dirty and self.after_commit is not None:
+            self.after_commit()
+
+
+def writes(
+    write_queue: Union[WriteQueue, Callable[[], WriteQueue]],
+    dirty: bool = True,
+    transaction: bool = True,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    resolve = write_queue if callable(write_queue) else lambda: write_queue
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        def submit(*args: Any, **kwargs: Any) -> Future:
+            return resolve().enqueue(fn, args, kwargs, dirty, transaction)
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return submit(*args, **kwargs).result()
+
+        wrapper.submit = submit  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,5 @@
+from db import close_profiles, init_db
+from web_app import app
+
+init_db()
+close_profiles()